@@ -1,19 +1,36 @@
 import sys
 import os
+import json
+import time
+import asyncio
 from pathlib import Path
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException
+from typing import Dict, Any, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from agent.graph import get_agent
+# The agent graph (LangGraph, Gemini client, FAISS, MiniLM) is imported on first use or by the
+# startup warmup thread, so cold starts and /api/health don't pay for it
+from session import (SessionBusyError, SessionRecord, compact_message, create_session_coordinator,
+                     get_session_store, message_text)
+from session.history import ConversationHistory
+from utils.local_intent import intent_stats
+from utils.warmup import Warmup
+from rag.response_cache import get_response_cache
+from rag.retriever import loaded_retriever
+from rag.tenants import DEFAULT_TENANT, TenantError, get_tenant_registry
+from leads import loaded_lead_sink
+from utils.log import get_logger, log_event
+from utils.tracing import metrics as trace_metrics, render_gauges, start_trace
+from utils.llm_gateway import LLMUnavailableError, gateway_stats
+from utils.batch import read_jsonl, run_batch
 
 app = FastAPI(title="SocioLead Agent API")
 
@@ -28,25 +45,76 @@ app.add_middleware(
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = "default"
+    # Brand whose knowledge base answers; the X-Tenant-ID header works too
+    tenant_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     intent: Optional[str] = None
     lead_captured: bool = False
     session_id: str
+    trace: Optional[Dict[str, Any]] = None
 
 agent = None
+logger = get_logger("sociolead.api")
 
-# Manual state storage (in-memory)
-session_states = {}
+# Conversation state per session_id; backend chosen by SESSION_STORE (memory/sqlite/redis)
+session_store = get_session_store()
+# One turn at a time per session (across workers sharing the store), duplicate requests answered once
+coordinator = create_session_coordinator(session_store)
 
 def get_agent_instance():
     global agent
     if agent is None:
+        # get_agent builds under a lock, so racing callers all get the same graph
+        from agent.graph import get_agent
         agent = get_agent()
     return agent
 
 
+def _fast_path_stats() -> Optional[Dict[str, int]]:
+    # None until the agent is built, or when it runs the plain compiled graph (GRAPH_FAST_PATH=false)
+    stats = getattr(agent, "fast_path_stats", None)
+    return stats() if stats else None
+
+
+def _warm_retriever():
+    from rag.retriever import get_retriever
+    get_retriever()
+
+
+def _warm_embeddings():
+    from rag.retriever import get_retriever
+    get_retriever().load_embeddings()
+
+
+def _warm_intent_classifier():
+    from utils.local_intent import get_local_classifier
+    get_local_classifier()
+
+
+warmup = Warmup([
+    ("retriever", _warm_retriever, True),
+    ("embeddings", _warm_embeddings, False),
+    ("intent_classifier", _warm_intent_classifier, False),
+    ("agent", get_agent_instance, True)
+])
+
+
+@app.on_event("startup")
+async def start_warmup():
+    if os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true":
+        warmup.start()
+
+
+@app.on_event("shutdown")
+async def drain_lead_sink():
+    # Undelivered leads stay in the WAL either way; this just gives the worker a last flush
+    lead_sink = loaded_lead_sink()
+    if lead_sink is not None:
+        lead_sink.stop()
+
+
 @app.get("/")
 async def root():
     return {
@@ -56,74 +124,320 @@ async def root():
     }
 
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    try:
+def _request_tenant(tenant_id: Optional[str], http_request: Request) -> str:
+    header = http_request.headers.get("x-tenant-id")
+    if header and tenant_id and header != tenant_id:
+        raise TenantError("X-Tenant-ID header and tenant_id field disagree")
+    return get_tenant_registry().resolve(header or tenant_id)
+
+
+def _session_key(tenant_id: str, session_id: str) -> str:
+    # Multi-tenant deployments prefix every session with its tenant (tenant ids can't contain ':'),
+    # so one brand's session ids never reach another's conversations; single-tenant keys are unchanged
+    if not get_tenant_registry().multi_tenant:
+        return session_id
+    return f"{tenant_id}:{session_id}"
+
+
+def _build_input_state(session_id: str, message: str, tenant_id: str = DEFAULT_TENANT) -> Dict[str, Any]:
+    # Get existing state for this session (session_id is the store key, see _session_key)
+    record = session_store.get(session_id) or SessionRecord()
+    
+    # Session state only holds the recent window; the full transcript lives in the store's log
+    history = ConversationHistory(record.messages)
+    history.extend([compact_message("human", message)])
+    
+    input_state = {
+        **record.to_state(),
+        "messages": history.recent(),
+        "turns": record.turns + 1,
+        "context": None,
+        "session_id": session_id,
+        "tenant_id": tenant_id
+    }
+    
+    return input_state
+
+
+def _save_turn(session_id: str, input_state: Dict[str, Any], result: Dict[str, Any]) -> None:
+    messages = result.get("messages", [])
+    # The new human message is the last input message; everything after it came from this turn
+    new_messages = messages[len(input_state["messages"]) - 1:]
+    
+    history = ConversationHistory(messages)
+    session_store.set(session_id, SessionRecord.from_state(result, history.recent()))
+    session_store.append_log(session_id, new_messages)
+
+
+def _trace_requested(request: Request) -> bool:
+    # Per-request span breakdown in the response body; DEBUG_TRACE_ENABLED=false turns it off
+    return (request.headers.get("x-debug-trace", "").lower() in ("1", "true")
+            and os.getenv("DEBUG_TRACE_ENABLED", "true").lower() == "true")
+
+
+def _finish_turn(endpoint: str, session_id: str, result: Dict[str, Any], start: float) -> None:
+    seconds = time.perf_counter() - start
+    trace_metrics.observe("agent_request_seconds", seconds, endpoint=endpoint)
+    # Sampled; slots are logged as present/absent only, never their values
+    log_event(logger, "chat_turn", endpoint=endpoint, session_id=session_id, tenant_id=result.get("tenant_id"),
+              intent=result.get("intent"), lead_captured=result.get("lead_captured", False),
+              has_name=bool(result.get("user_name")), has_email=bool(result.get("user_email")),
+              has_platform=bool(result.get("user_platform")), duration_ms=round(seconds * 1000, 2))
+
+
+def _response_text(result: Dict[str, Any]) -> str:
+    messages = result.get("messages", [])
+    if messages:
+        return message_text(messages[-1])
+    return "I'm sorry, I couldn't process that. Could you try again?"
+
+
+def _turn_payload(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "response": _response_text(result),
+        "intent": result.get("intent"),
+        "lead_captured": result.get("lead_captured", False)
+    }
+
+
+async def run_turn(session_id: str, message: str, endpoint: str = "chat", tenant_id: Optional[str] = None,
+                   idempotency_key: Optional[str] = None, dedupe: bool = True) -> Tuple[Dict[str, Any], bool]:
+    # Returns ({"response", "intent", "lead_captured"}, replayed). Load, run and save happen under the
+    # session's lock, so concurrent messages on one session apply one after the other
+    tenant_id = get_tenant_registry().resolve(tenant_id)
+    key = _session_key(tenant_id, session_id)
+    
+    async def turn() -> Dict[str, Any]:
+        start = time.perf_counter()
         agent_app = get_agent_instance()
+        input_state = _build_input_state(key, message, tenant_id)
         
-        # Get existing state for this session
-        existing_state = session_states.get(request.session_id, {
-            "messages": [],
-            "intent": None,
-            "user_name": None,
-            "user_email": None,
-            "user_platform": None,
-            "lead_captured": False,
-            "context": None
-        })
-        
-        print(f"DEBUG - Retrieved state: name={existing_state.get('user_name')}, email={existing_state.get('user_email')}")
-        
-        # Prepare input - append new message to existing messages
-        input_state = {
-            "messages": existing_state.get("messages", []) + [HumanMessage(content=request.message)],
-            "intent": existing_state.get("intent"),
-            "user_name": existing_state.get("user_name"),
-            "user_email": existing_state.get("user_email"),
-            "user_platform": existing_state.get("user_platform"),
-            "lead_captured": existing_state.get("lead_captured", False),
-            "context": existing_state.get("context")
-        }
-        
-        print(f"DEBUG - Input state: name={input_state.get('user_name')}, email={input_state.get('user_email')}")
-        
-        # Invoke agent WITHOUT config (no checkpointer)
-        result = agent_app.invoke(input_state)
+        # Invoke agent WITHOUT config (no checkpointer); ainvoke keeps the worker free during LLM calls
+        result = await agent_app.ainvoke(input_state)
         
         # Save the updated state
-        session_states[request.session_id] = result
-        
-        print(f"DEBUG - Result state: name={result.get('user_name')}, email={result.get('user_email')}")
-        
-        messages = result.get("messages", [])
-        if messages:
-            last_message = messages[-1]
-            response_text = last_message.content if hasattr(last_message, 'content') else str(last_message)
-        else:
-            response_text = "I'm sorry, I couldn't process that. Could you try again?"
+        _save_turn(key, input_state, result)
+        _finish_turn(endpoint, session_id, result, start)
+        return _turn_payload(result)
+    
+    return await coordinator.run(key, message, turn, key=idempotency_key, dedupe=dedupe)
+
+
+async def batch_turn(session_id: str, message: str, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    # Batch lines are distinct comments by construction, so identical texts are not collapsed
+    try:
+        result, _ = await run_turn(session_id, message, endpoint="chat_batch", tenant_id=tenant_id, dedupe=False)
+    except (LLMUnavailableError, SessionBusyError) as e:
+        log_event(logger, "chat_rejected", sampled=False, endpoint="chat_batch", reason=str(e), retry_after=e.retry_after)
+        raise
+    except TenantError:
+        # Unknown/invalid tenant on this line: reported in its result, not an agent failure
+        raise
+    except Exception:
+        logger.exception("chat_error", extra={"fields": {"endpoint": "chat_batch", "session_id": session_id}})
+        raise
+    return result
+
+
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request, response: Response):
+    trace = start_trace() if _trace_requested(http_request) else None
+    try:
+        tenant_id = _request_tenant(request.tenant_id, http_request)
+        result, replayed = await run_turn(request.session_id, request.message, tenant_id=tenant_id,
+                                          idempotency_key=http_request.headers.get("idempotency-key"))
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
         
         return ChatResponse(
-            response=response_text,
-            intent=result.get("intent"),
-            lead_captured=result.get("lead_captured", False),
-            session_id=request.session_id
+            **result,
+            session_id=request.session_id,
+            trace=trace.to_dict() if trace else None
         )
     
+    except TenantError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    except (LLMUnavailableError, SessionBusyError) as e:
+        # Backpressure from the LLM gateway or a session stuck behind another message: tell the
+        # client when to come back instead of queueing forever
+        log_event(logger, "chat_rejected", sampled=False, endpoint="chat", reason=str(e), retry_after=e.retry_after)
+        raise HTTPException(status_code=e.status_code, detail=str(e),
+                            headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    
     except Exception as e:
-        import traceback
-        print(f"ERROR: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("chat_error", extra={"fields": {"endpoint": "chat", "session_id": request.session_id}})
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    with_trace = _trace_requested(http_request)
+    try:
+        tenant_id = _request_tenant(request.tenant_id, http_request)
+    except TenantError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    idempotency_key = http_request.headers.get("idempotency-key")
+    key = _session_key(tenant_id, request.session_id)
+    
+    from langchain_core.messages import AIMessageChunk
+    
+    async def event_stream():
+        # Started inside the generator so the trace lives in the streaming task's context
+        trace = start_trace() if with_trace else None
+        events: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        
+        async def turn() -> Dict[str, Any]:
+            # Runs under the session lock; its events are relayed below as they are produced
+            start = time.perf_counter()
+            agent_app = get_agent_instance()
+            input_state = _build_input_state(key, request.message, tenant_id)
+            result = input_state
+            async for mode, chunk in agent_app.astream(input_state, stream_mode=["updates", "messages", "values"]):
+                if mode == "updates":
+                    # Metadata goes out as soon as each node finishes, ahead of the reply tokens
+                    for node, update in chunk.items():
+                        update = update or {}
+                        if node in ("classify_intent", "analyze_turn") and "intent" in update:
+                            events.put_nowait(_sse("meta", {"intent": update["intent"]}))
+                        elif node == "capture_lead" and update.get("lead_captured"):
+                            events.put_nowait(_sse("meta", {"lead_captured": True}))
+                
+                elif mode == "messages":
+                    # Only token chunks from the respond node; classification/extraction calls stay internal
+                    message, metadata = chunk
+                    if (metadata.get("langgraph_node") == "respond"
+                            and isinstance(message, AIMessageChunk)
+                            and isinstance(message.content, str) and message.content):
+                        events.put_nowait(_sse("token", {"text": message.content}))
+                
+                else:
+                    result = chunk
+            
+            _save_turn(key, input_state, result)
+            _finish_turn("chat_stream", request.session_id, result, start)
+            return _turn_payload(result)
+        
+        # The turn finishes (and is saved) even if the client goes away mid-stream
+        task = asyncio.create_task(coordinator.run(key, request.message, turn, key=idempotency_key))
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        while (event := await events.get()) is not None:
+            yield event
+        
+        try:
+            result, replayed = await task
+            # A replayed duplicate streamed nothing: its answer arrives whole in "done"
+            done = {**result, "session_id": request.session_id}
+            if replayed:
+                done["replayed"] = True
+            if trace:
+                done["trace"] = trace.to_dict()
+            yield _sse("done", done)
+        
+        except (LLMUnavailableError, SessionBusyError) as e:
+            log_event(logger, "chat_rejected", sampled=False, endpoint="chat_stream", reason=str(e),
+                      retry_after=e.retry_after)
+            yield _sse("error", {"detail": str(e), "status": e.status_code,
+                                 "retry_after": max(1, round(e.retry_after))})
+        
+        except Exception as e:
+            logger.exception("chat_error", extra={"fields": {"endpoint": "chat_stream", "session_id": request.session_id}})
+            yield _sse("error", {"detail": f"Error processing request: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/chat/batch")
+async def chat_batch(http_request: Request, concurrency: Optional[int] = None):
+    # Body and response are JSONL: one {"session_id", "message", "tenant_id"?, "id"?} per line in, one
+    # result per line out as soon as it completes (tagged with the input line index). Sessions run
+    # concurrently, turns within a session stay in order. X-Tenant-ID sets the default tenant.
+    limit = int(os.getenv("BATCH_MAX_CONCURRENCY", "64"))
+    concurrency = min(concurrency or int(os.getenv("BATCH_CONCURRENCY", "16")), limit)
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be at least 1")
+    tenant_id = http_request.headers.get("x-tenant-id") or None
+    try:
+        get_tenant_registry().resolve(tenant_id)
+    except TenantError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    get_agent_instance()
+    # Read up front: once the StreamingResponse starts, Starlette's disconnect listener consumes receive()
+    body = await http_request.body()
+    
+    async def chunks():
+        yield body
+    
+    async def result_stream():
+        async for output in run_batch(read_jsonl(chunks()), batch_turn, concurrency=concurrency, tenant_id=tenant_id):
+            yield json.dumps(output) + "\n"
+    
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
 @app.get("/api/health")
 async def health():
     return {
         "status": "healthy",
         "gemini_api_configured": bool(os.getenv("GEMINI_API_KEY")),
-        "model": os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+        "model": os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+        "intent_classifier": intent_stats.snapshot(),
+        "session_store": session_store.stats()
+    }
+
+
+@app.get("/api/ready")
+async def ready():
+    # 503 until the retriever and agent graph are loaded, so load balancers hold traffic back
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@app.get("/api/metrics")
+async def metrics():
+    response_cache = get_response_cache()
+    retriever = loaded_retriever()
+    lead_sink = loaded_lead_sink()
+    return {
+        "response_cache": response_cache.stats() if response_cache else None,
+        "retriever": retriever.stats() if retriever else None,
+        "intent_classifier": intent_stats.snapshot(),
+        "session_store": session_store.stats(),
+        "lead_sink": lead_sink.stats() if lead_sink else None,
+        "session_coordinator": coordinator.stats(),
+        "fast_path": _fast_path_stats(),
+        "tenants": get_tenant_registry().stats(),
+        "llm_gateway": gateway_stats(),
+        "latency": trace_metrics.summary()
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Prometheus text exposition: latency histograms and counters, plus the component stats as gauges
+    response_cache = get_response_cache()
+    retriever = loaded_retriever()
+    lead_sink = loaded_lead_sink()
+    body = trace_metrics.render_prometheus()
+    body += render_gauges("response_cache", response_cache.stats() if response_cache else None)
+    body += render_gauges("retriever", retriever.stats() if retriever else None)
+    body += render_gauges("intent_classifier", intent_stats.snapshot())
+    body += render_gauges("session_store", session_store.stats())
+    body += render_gauges("lead_sink", lead_sink.stats() if lead_sink else None)
+    body += render_gauges("session_coordinator", coordinator.stats())
+    body += render_gauges("fast_path", _fast_path_stats())
+    body += render_gauges("tenants", get_tenant_registry().stats())
+    body += render_gauges("llm_gateway", gateway_stats(), label="model")
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
 from mangum import Mangum
 handler = Mangum(app)
@@ -0,0 +1,68 @@
+"""Concurrent-request load test for /api/chat against a local stub LLM.
+
+Every LLM call sleeps for --latency seconds, so throughput should scale
+with the number of in-flight requests once the endpoint no longer blocks
+the event loop:
+
+    python bench/async_load.py --requests 200 --concurrency 1 4 16 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+# Greetings and lead-funnel turns only, so no embedding model is needed
+os.environ.setdefault("LOCAL_INTENT_ENABLED", "false")
+
+import httpx
+
+from api import chat as chat_api
+from agent.graph import create_agent_graph
+from bench.stub_llm import StubChatModel
+
+SCRIPT = ["hi", "I want to try the Pro plan", "My name is Alex"]
+
+
+async def run_level(client: httpx.AsyncClient, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # Each conversation replays the script in order; conversations run side by side
+    async def conversation(i: int):
+        async with semaphore:
+            for message in SCRIPT:
+                response = await client.post("/api/chat", json={
+                    "message": message,
+                    "session_id": f"load-{concurrency}-{i}"
+                })
+                response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(total // len(SCRIPT))))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    chat_api.agent = create_agent_graph(llm=StubChatModel(latency=args.latency))
+
+    transport = httpx.ASGITransport(app=chat_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'in-flight':>10} {'seconds':>10} {'req/s':>10}")
+        for concurrency in args.concurrency:
+            elapsed = await run_level(client, args.requests, concurrency)
+            completed = args.requests // len(SCRIPT) * len(SCRIPT)
+            print(f"{concurrency:>10} {elapsed:>10.2f} {completed / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
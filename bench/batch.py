@@ -0,0 +1,166 @@
+"""Bulk ingestion: sequential /api/chat round trips vs /api/chat/batch.
+
+Builds a synthetic export from the benchmark corpus: every conversation's
+turns in order, interleaved across sessions the way comments and DMs arrive
+in a bulk export. The stub LLM stands in for Gemini (see bench/e2e.py).
+
+  sequential  one POST /api/chat per line, each waiting for the previous
+  batch       the whole file as one POST /api/chat/batch (JSONL in, JSONL out)
+
+Checks that every line gets a result, that each session's results come back
+in input order, and that every lead funnel ends with a captured lead; exits
+non-zero otherwise. --write saves the file for scripts/chat_batch.py:
+
+    python bench/batch.py --conversations 2000 --concurrency 8 32 64 --latency 0.05
+    python bench/batch.py --conversations 5000 --write comments.jsonl --modes batch
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+_TMP = tempfile.mkdtemp(prefix="batch-")
+os.environ.setdefault("LOCAL_INTENT_ENABLED", "false")
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+os.environ.setdefault("LEAD_SINK", "file")
+os.environ.setdefault("LEAD_SINK_PATH", os.path.join(_TMP, "leads.jsonl"))
+os.environ.setdefault("LEAD_QUEUE_PATH", os.path.join(_TMP, "leads.db"))
+os.environ.setdefault("SESSION_MAX_SESSIONS", "1000000")
+os.environ.setdefault("BATCH_MAX_CONCURRENCY", "1024")
+
+import httpx
+
+from agent.graph import create_agent_graph
+from api import chat as chat_api
+from bench.corpus import generate_corpus
+from bench.stub_llm import StubChatModel, install_fake_retriever
+
+
+def interleave(corpus: list, seed: int) -> list:
+    # Random merge of the conversations: order within a conversation is kept, across them it is not
+    rng = random.Random(seed)
+    cursors = [[c, 0] for c in corpus]
+    items = []
+    while cursors:
+        i = rng.randrange(len(cursors))
+        conversation, turn = cursors[i]
+        items.append({"session_id": conversation["id"], "message": conversation["turns"][turn],
+                      "id": f"{conversation['id']}#{turn}"})
+        cursors[i][1] += 1
+        if cursors[i][1] == len(conversation["turns"]):
+            cursors[i] = cursors[-1]
+            cursors.pop()
+    return items
+
+
+def with_prefix(items: list, prefix: str) -> list:
+    return [{**item, "session_id": f"{prefix}-{item['session_id']}"} for item in items]
+
+
+async def run_sequential(client: httpx.AsyncClient, items: list) -> list:
+    outputs = []
+    for index, item in enumerate(items):
+        response = await client.post("/api/chat", json={"message": item["message"], "session_id": item["session_id"]})
+        body = response.json() if response.status_code == 200 else {"error": response.text}
+        outputs.append({"index": index, "session_id": item["session_id"], **body})
+    return outputs
+
+
+async def run_batch(client: httpx.AsyncClient, items: list, concurrency: int) -> list:
+    body = "".join(json.dumps(item) + "\n" for item in items)
+    outputs = []
+    async with client.stream("POST", "/api/chat/batch", params={"concurrency": concurrency},
+                             content=body.encode("utf-8")) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.strip():
+                outputs.append(json.loads(line))
+    return outputs
+
+
+def check(items: list, outputs: list, corpus: list, prefix: str) -> list:
+    problems = []
+    if sorted(o.get("index", -1) for o in outputs) != list(range(len(items))):
+        problems.append(f"{len(outputs)} results for {len(items)} lines")
+    errors = [o for o in outputs if "error" in o]
+    if errors:
+        problems.append(f"{len(errors)} errors, first: {errors[0]['error']}")
+
+    last_index = {}
+    for output in outputs:
+        session_id = output.get("session_id")
+        if output.get("index", -1) < last_index.get(session_id, -1):
+            problems.append(f"session {session_id} answered out of order")
+            break
+        last_index[session_id] = output.get("index", -1)
+
+    captured = {o["session_id"] for o in outputs if o.get("lead_captured")}
+    missed = [c["id"] for c in corpus if c["expect_lead"] and f"{prefix}-{c['id']}" not in captured]
+    if missed:
+        problems.append(f"{len(missed)} lead funnels without a captured lead, first: {missed[0]}")
+    return problems
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--modes", nargs="+", default=["sequential", "batch"], choices=["sequential", "batch"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 64], help="batch concurrency levels")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM latency per call (s)")
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--write", help="also save the synthetic JSONL export here")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.conversations, args.seed)
+    items = interleave(corpus, args.seed)
+    if args.write:
+        with open(args.write, "w") as f:
+            f.writelines(json.dumps(item) + "\n" for item in items)
+        print(f"Wrote {len(items)} lines to {args.write}")
+
+    install_fake_retriever()
+    llm = StubChatModel(latency=args.latency, jitter=args.jitter)
+    chat_api.agent = create_agent_graph(llm=llm)
+
+    runs = [("sequential", 1)] if "sequential" in args.modes else []
+    runs += [("batch", c) for c in args.concurrency] if "batch" in args.modes else []
+
+    print(f"{len(corpus)} conversations, {len(items)} turns, stub latency {args.latency * 1000:.0f}ms")
+    print(f"{'mode':<12} {'concurrency':>11} {'seconds':>8} {'turns/s':>8} {'speedup':>8}")
+    failed = False
+    baseline = None
+    transport = httpx.ASGITransport(app=chat_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for mode, concurrency in runs:
+            prefix = f"{mode}-{concurrency}"
+            run_items = with_prefix(items, prefix)
+            start = time.perf_counter()
+            if mode == "sequential":
+                outputs = await run_sequential(client, run_items)
+            else:
+                outputs = await run_batch(client, run_items, concurrency)
+            elapsed = time.perf_counter() - start
+
+            rate = len(items) / elapsed
+            baseline = baseline or rate
+            print(f"{mode:<12} {concurrency:>11} {elapsed:>8.2f} {rate:>8.1f} {rate / baseline:>7.1f}x")
+            for problem in check(run_items, outputs, corpus, prefix):
+                print(f"  {problem}")
+                failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""Cold-start benchmark: prebuilt index vs. re-embedding the knowledge base.
+
+Each sample runs in a fresh interpreter so imports and model loading are
+included, which is what a Lambda cold start pays:
+
+    python bench/cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+from bench.stub_llm import require_embedding_model
+
+CHILD = """
+import sys, time, json
+sys.path.append({src!r})
+t0 = time.perf_counter()
+from rag.retriever import KnowledgeBaseRetriever
+t1 = time.perf_counter()
+r = KnowledgeBaseRetriever(index_dir={index_dir!r}, use_prebuilt={prebuilt!r})
+t2 = time.perf_counter()
+r.get_context("How much is the Pro plan?")
+t3 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "load": t2 - t1, "first_query": t3 - t2,
+                  "total": t3 - t0, "from_disk": r.loaded_from_disk}}))
+"""
+
+
+def run_once(index_dir: str, prebuilt: bool) -> dict:
+    code = CHILD.format(src=os.path.join(ROOT, "src"), index_dir=index_dir, prebuilt=prebuilt)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if out.returncode != 0:
+        sys.exit(f"{'prebuilt' if prebuilt else 're-embed'} run failed:\n{out.stderr.strip()}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(label: str, samples: list) -> None:
+    print(f"\n{label}")
+    for field in ("import", "load", "first_query", "total"):
+        values = [s[field] for s in samples]
+        print(f"  {field:<12} median={statistics.median(values) * 1000:8.1f}ms  "
+              f"min={min(values) * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    # The samples load the model in child interpreters; only check it can be loaded here
+    require_embedding_model(load=False)
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        # Warm the artifact once so every prebuilt sample hits the fresh index
+        run_once(index_dir, prebuilt=True)
+
+        rebuild = [run_once(index_dir, prebuilt=False) for _ in range(args.runs)]
+        prebuilt = [run_once(index_dir, prebuilt=True) for _ in range(args.runs)]
+
+    assert all(s["from_disk"] for s in prebuilt), "prebuilt runs did not load the artifact"
+
+    summarize("re-embed at startup (current path)", rebuild)
+    summarize("prebuilt index (mmap)", prebuilt)
+
+    saved = statistics.median(s["load"] for s in rebuild) - statistics.median(s["load"] for s in prebuilt)
+    print(f"\nmedian load time saved: {saved * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Respond-prompt size and answerability: fixed k=2 context vs the context assembler.
+
+For every question in bench/fixtures/retrieval_questions.json (and the
+inquiry turns of the benchmark corpus, for token statistics) builds the
+respond node's prompt twice:
+
+  before  format_context(retrieve(k=2)), the previous behaviour (CONTEXT_ASSEMBLY=false)
+  after   rag.context.ContextAssembler: inquiry token budget, relevance cutoff,
+          overlap stitching and list grouping
+
+and reports estimated prompt tokens per turn (the same estimate the respond
+node records in agent_prompt_tokens_total), context tokens and chunks per
+turn, and answerability: the share of fixture questions whose expected fact
+reaches the prompt, which bounds the answer accuracy any LLM can get.
+
+Also checks on a synthetic long leaf that split pieces are stitched back
+without the splitter's overlap. Exits non-zero if the assembler answers fewer
+fixture questions than k=2 did, or the stitching check fails:
+
+    python bench/context_assembly.py --modes lexical hybrid
+    python bench/context_assembly.py --model minilm --budget 200 --min-relevance 0.5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from agent.nodes import _build_response_prompt
+from bench.corpus import generate_corpus
+from rag.context import ContextAssembler, DEFAULT_TOKEN_BUDGETS, estimate_tokens
+from rag.retriever import KnowledgeBaseRetriever
+from session import compact_message
+
+GREETING = "Hi! Thanks for reaching out to AutoStream. How can I help you today?"
+
+
+class UnitFakeEmbedding(DeterministicFakeEmbedding):
+    # Hash vectors scaled to unit length, like the real backends, so cosine scores are defined
+
+    def embed_documents(self, texts):
+        return [self._unit(v) for v in super().embed_documents(texts)]
+
+    def embed_query(self, text):
+        return self._unit(super().embed_query(text))
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        return (vector / max(float(np.linalg.norm(vector)), 1e-12)).tolist()
+
+
+def prompt_tokens(question: str, context: str) -> int:
+    state = {"messages": [compact_message("ai", GREETING), compact_message("human", question)],
+             "intent": "inquiry", "context": context}
+    return sum(estimate_tokens(str(message.content)) for message in _build_response_prompt(state))
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def run(retriever: KnowledgeBaseRetriever, assembler: ContextAssembler, questions: list, queries: list) -> dict:
+    results = {}
+    for variant in ("before", "after"):
+        prompts, contexts, chunks, seconds = [], [], [], []
+        answerable = []
+        for query in [q["question"] for q in questions] + queries:
+            start = time.perf_counter()
+            if variant == "before":
+                docs = retriever.retrieve(query, k=2)
+                context = retriever.format_context(docs)
+                chunks.append(len(docs))
+            else:
+                assembled = assembler.assemble(retriever, query, "inquiry")
+                context = assembled.text
+                chunks.append(assembled.chunks)
+            seconds.append(time.perf_counter() - start)
+            prompts.append(prompt_tokens(query, context))
+            contexts.append(estimate_tokens(context))
+            if len(answerable) < len(questions):
+                expected = questions[len(answerable)]["expected"].lower()
+                answerable.append(expected in context.lower())
+        results[variant] = {
+            "answerable": sum(answerable) / len(answerable),
+            "misses": [q["question"] for q, ok in zip(questions, answerable) if not ok],
+            "prompt_mean": float(np.mean(prompts)),
+            "prompt_p50": percentile(prompts, 0.5),
+            "prompt_p95": percentile(prompts, 0.95),
+            "context_mean": float(np.mean(contexts)),
+            "chunks_mean": float(np.mean(chunks)),
+            "ms_mean": float(np.mean(seconds)) * 1000
+        }
+    return results
+
+
+def check_stitching(embeddings, workdir: str) -> list:
+    # One long answer with no sentence breaks, so the splitter falls back to words and overlaps them
+    answer = " ".join(f"step {i} of the export checklist covers codec bitrate and upload target" for i in range(12))
+    kb = {"faq": {"export_checklist": answer}, "plans": {"pro": {"features": ["4K export", "AI captions"]}}}
+    path = os.path.join(workdir, "long_kb.json")
+    with open(path, "w") as f:
+        json.dump(kb, f)
+    retriever = KnowledgeBaseRetriever(path, index_dir=os.path.join(workdir, "long_index"), embeddings=embeddings,
+                                       query_cache_size=0, batch_window_ms=0, mode="lexical")
+    pieces = [c for c in retriever.chunks if c.metadata["path"] == "/faq/export_checklist"]
+    assembler = ContextAssembler(budgets={"inquiry": 10000}, min_relevance=0.0, max_chunks=100, candidates=100)
+    context = assembler.assemble(retriever, "export checklist codec bitrate upload 4K AI captions", "inquiry").text
+    problems = []
+    if len(pieces) < 2:
+        problems.append(f"stitching: the long leaf was not split ({len(pieces)} piece)")
+    if f"faq > export_checklist: {answer}" not in context:
+        problems.append(f"stitching: {len(pieces)} pieces did not rebuild the leaf: {context[:200]!r}...")
+    grouped = [line for line in context.splitlines() if "plans > pro > features: " in line]
+    if len(grouped) != 1 or "4K export" not in grouped[0] or "AI captions" not in grouped[0]:
+        problems.append(f"grouping: list items under one key path were not collapsed: {context[-200:]!r}")
+    print(f"stitching: {len(pieces)} overlapping pieces of a {len(answer)}-char leaf -> "
+          f"{'rebuilt exactly' if not problems else 'FAILED'}; "
+          f"{sum(estimate_tokens(p.page_content) for p in pieces)} -> {estimate_tokens(answer)} tokens")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", default=["lexical", "hybrid"], choices=["lexical", "dense", "hybrid"])
+    parser.add_argument("--model", choices=["hash", "minilm"], default="hash")
+    parser.add_argument("--budget", type=int, default=DEFAULT_TOKEN_BUDGETS["inquiry"], help="inquiry token budget")
+    parser.add_argument("--min-relevance", type=float, default=0.6)
+    parser.add_argument("--max-chunks", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200, help="extra corpus inquiries for token statistics")
+    parser.add_argument("--fixture", default=os.path.join(ROOT, "bench", "fixtures", "retrieval_questions.json"))
+    args = parser.parse_args()
+
+    with open(args.fixture) as f:
+        questions = json.load(f)
+    corpus = generate_corpus(args.queries * 2, seed=5, mix={"inquiry": 1.0})
+    queries = list(dict.fromkeys(turn for c in corpus for turn in c["turns"]))[:args.queries]
+
+    if args.model == "minilm":
+        from rag.embedders import shared_embedder
+        embeddings = shared_embedder("torch", "sentence-transformers/all-MiniLM-L6-v2")
+    else:
+        embeddings = UnitFakeEmbedding(size=384)
+    assembler = ContextAssembler(budgets={"inquiry": args.budget}, min_relevance=args.min_relevance,
+                                 max_chunks=args.max_chunks)
+
+    workdir = tempfile.mkdtemp(prefix="context-")
+    print(f"{len(questions)} fixture questions + {len(queries)} corpus inquiries, {args.model} embeddings, "
+          f"budget {args.budget} tokens, min relevance {args.min_relevance}")
+    print(f"{'mode':<8} {'variant':<7} {'answerable':>10} {'prompt':>7} {'p50':>5} {'p95':>5} "
+          f"{'context':>8} {'chunks':>7} {'ms':>6}")
+    problems = []
+    for mode in args.modes:
+        retriever = KnowledgeBaseRetriever(index_dir=os.path.join(workdir, "index"), embeddings=embeddings,
+                                           query_cache_size=0, batch_window_ms=0, mode=mode)
+        results = run(retriever, assembler, questions, queries)
+        for variant, r in results.items():
+            print(f"{mode:<8} {variant:<7} {r['answerable'] * 100:>9.1f}% {r['prompt_mean']:>7.1f} "
+                  f"{r['prompt_p50']:>5} {r['prompt_p95']:>5} {r['context_mean']:>8.1f} {r['chunks_mean']:>7.2f} "
+                  f"{r['ms_mean']:>6.2f}")
+        before, after = results["before"], results["after"]
+        print(f"{'':<8} prompt tokens {after['prompt_mean'] / before['prompt_mean'] - 1:+.1%}, "
+              f"answerable {(after['answerable'] - before['answerable']) * 100:+.1f} pts")
+        for question in after["misses"]:
+            print(f"{'':<8} miss: {question}")
+        if after["answerable"] < before["answerable"]:
+            problems.append(f"{mode}: assembler answers {after['answerable']:.1%} of the fixture, "
+                            f"k=2 answered {before['answerable']:.1%}")
+
+    problems += check_stitching(embeddings, workdir)
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Deterministic conversation corpus for the end-to-end benchmarks.
+
+Three conversation kinds, mixed by weight:
+  greeting - a hello, optionally followed by a product question
+  inquiry  - one to three knowledge-base questions
+  lead     - greeting/question, sign-up intent, then name, email and platform
+             ending in a captured lead; "combined" funnels give all three in one
+             message, which EXTRACTION_MODE=legacy (one slot per turn) cannot finish
+
+    python bench/corpus.py --conversations 500 --seed 7 --out corpus.jsonl
+"""
+import argparse
+import json
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+GREETINGS = ["hi", "hello", "hey there", "Hi!", "hello, good morning", "hey"]
+SIGNUP = [
+    "I want to sign up for the Pro plan",
+    "I'd like to try AutoStream for my YouTube channel",
+    "Ready to subscribe, how do I get started?",
+    "I want to buy the basic plan",
+    "Sign me up, I'm interested",
+    "I need this for my channel, let's get started"
+]
+NAMES = ["Alex", "Priya", "Jordan", "Mateo", "Aisha", "Chen", "Sofia", "Liam", "Noah", "Emma"]
+PLATFORMS = ["YouTube", "Instagram", "TikTok", "Facebook", "Twitter", "LinkedIn", "Twitch"]
+NAME_FORMS = ["My name is {name}", "{name}", "I'm {name}", "call me {name}"]
+PLATFORM_FORMS = ["{platform}", "Mostly {platform}", "I post on {platform}"]
+
+DEFAULT_MIX = {"greeting": 0.2, "inquiry": 0.5, "lead": 0.3}
+
+
+def _questions() -> List[str]:
+    with open(os.path.join(FIXTURES, "retrieval_questions.json")) as f:
+        return [item["question"] for item in json.load(f)]
+
+
+def _lead_turns(rng: random.Random, i: int, questions: List[str]) -> Tuple[List[str], bool]:
+    name = rng.choice(NAMES)
+    email = f"{name.lower()}.{i}@example.com"
+    platform = rng.choice(PLATFORMS)
+
+    turns = [rng.choice(GREETINGS)] if rng.random() < 0.5 else [rng.choice(questions)]
+    turns.append(rng.choice(SIGNUP))
+    if rng.random() < 0.2:
+        # Everything in one message: only the structured extractor fills all three slots at once
+        turns.append(f"I'm {name}, {email}, and I'm on {platform}")
+        return turns, True
+    turns.append(rng.choice(NAME_FORMS).format(name=name))
+    turns.append(email)
+    turns.append(rng.choice(PLATFORM_FORMS).format(platform=platform))
+    return turns, False
+
+
+def generate_corpus(conversations: int, seed: int = 0, mix: Optional[Dict[str, float]] = None) -> List[Dict]:
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds, weights = zip(*mix.items())
+    questions = _questions()
+
+    corpus = []
+    for i in range(conversations):
+        kind = rng.choices(kinds, weights)[0]
+        combined = False
+        if kind == "greeting":
+            turns = [rng.choice(GREETINGS)]
+            if rng.random() < 0.5:
+                turns.append(rng.choice(questions))
+        elif kind == "inquiry":
+            turns = rng.sample(questions, rng.randint(1, 3))
+        else:
+            turns, combined = _lead_turns(rng, i, questions)
+        corpus.append({"id": f"{kind}-{i}", "kind": kind, "turns": turns,
+                       "expect_lead": kind == "lead", "combined": combined})
+    return corpus
+
+
+def load_corpus(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="-")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.conversations, args.seed)
+    lines = "".join(json.dumps(c) + "\n" for c in corpus)
+    if args.out == "-":
+        print(lines, end="")
+    else:
+        with open(args.out, "w") as f:
+            f.write(lines)
+        turns = sum(len(c["turns"]) for c in corpus)
+        print(f"Wrote {len(corpus)} conversations ({turns} turns) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
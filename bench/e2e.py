@@ -0,0 +1,226 @@
+"""Offline end-to-end benchmark: replays a generated conversation corpus
+through the agent and reports throughput, per-node latency and memory growth.
+
+Targets:
+  graph   create_agent_graph(...).ainvoke directly, state threaded per conversation
+  api     POST /api/chat through the FastAPI app over an in-process ASGI client
+  stream  POST /api/chat/stream (SSE) the same way
+
+Everything runs offline: the LLM is bench.stub_llm.StubChatModel, the
+retriever uses hash embeddings, and captured leads go to a temp file sink.
+Exits non-zero if any turn errors or a lead funnel does not capture its lead:
+
+    python bench/e2e.py --conversations 300 --concurrency 1 8 32 --latency 0.05
+    python bench/e2e.py --targets graph --extraction-mode legacy --report e2e.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+_TMP = tempfile.mkdtemp(prefix="e2e-")
+# Hash embeddings make the local classifier meaningless, so intent goes to keywords/stub LLM
+os.environ.setdefault("LOCAL_INTENT_ENABLED", "false")
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+os.environ.setdefault("LEAD_SINK", "file")
+os.environ.setdefault("LEAD_SINK_PATH", os.path.join(_TMP, "leads.jsonl"))
+os.environ.setdefault("LEAD_QUEUE_PATH", os.path.join(_TMP, "leads.db"))
+
+import httpx
+from agent.graph import create_agent_graph
+from api import chat as chat_api
+from bench.corpus import generate_corpus, load_corpus
+from bench.stub_llm import StubChatModel, install_fake_retriever
+from session import compact_message
+from session.history import ConversationHistory
+from utils.tracing import metrics as trace_metrics
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    values = sorted(values)
+
+    def at(q: float) -> float:
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+    return {"p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99)}
+
+
+async def replay_graph(graph, conversation: dict, prefix: str, latencies: list) -> bool:
+    session_id = f"{prefix}-{conversation['id']}"
+    state = {"messages": [], "lead_captured": False}
+    for text in conversation["turns"]:
+        # Same windowing as api/chat.py: only the recent messages travel with the turn
+        history = ConversationHistory(state.get("messages", []))
+        history.extend([compact_message("human", text)])
+        input_state = {**state, "messages": history.recent(), "cached_response": None, "session_id": session_id}
+        start = time.perf_counter()
+        state = await graph.ainvoke(input_state)
+        latencies.append(time.perf_counter() - start)
+    return bool(state.get("lead_captured"))
+
+
+async def replay_api(client: httpx.AsyncClient, conversation: dict, prefix: str, latencies: list,
+                     stream: bool) -> bool:
+    session_id = f"{prefix}-{conversation['id']}"
+    lead_captured = False
+    for text in conversation["turns"]:
+        start = time.perf_counter()
+        if stream:
+            response = await client.post("/api/chat/stream", json={"message": text, "session_id": session_id})
+            response.raise_for_status()
+            done = [line for line in response.text.splitlines() if line.startswith("data:")][-1]
+            body = json.loads(done[len("data:"):])
+            if "detail" in body:
+                raise RuntimeError(body["detail"])
+        else:
+            response = await client.post("/api/chat", json={"message": text, "session_id": session_id})
+            response.raise_for_status()
+            body = response.json()
+        latencies.append(time.perf_counter() - start)
+        lead_captured = body.get("lead_captured", False)
+    return lead_captured
+
+
+async def run_target(target: str, graph, client, corpus: list, concurrency: int, track_allocations: bool,
+                     extraction_mode: str) -> dict:
+    trace_metrics.reset()
+    gc.collect()
+    if track_allocations:
+        tracemalloc.start()
+    rss_before = rss_mb()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list = []
+    errors: list = []
+    missed_leads = 0
+    partial_leads = 0
+    prefix = f"{target}-{concurrency}"
+
+    async def conversation(c: dict):
+        nonlocal missed_leads, partial_leads
+        async with semaphore:
+            try:
+                if target == "graph":
+                    captured = await replay_graph(graph, c, prefix, latencies)
+                else:
+                    captured = await replay_api(client, c, prefix, latencies, stream=target == "stream")
+            except Exception as e:
+                errors.append(f"{c['id']}: {type(e).__name__}: {e}")
+                return
+            if c["expect_lead"] and not captured:
+                if c.get("combined") and extraction_mode == "legacy":
+                    partial_leads += 1
+                else:
+                    missed_leads += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(c) for c in corpus))
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    report = {
+        "target": target,
+        "concurrency": concurrency,
+        "conversations": len(corpus),
+        "turns": len(latencies),
+        "seconds": elapsed,
+        "turns_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "turn": percentiles(latencies),
+        "nodes": trace_metrics.summary().get("agent_node_seconds", {}),
+        "llm": trace_metrics.summary().get("agent_llm_seconds", {}),
+        "rss_growth_mb": rss_mb() - rss_before,
+        "errors": errors,
+        "missed_leads": missed_leads,
+        "partial_leads": partial_leads
+    }
+    if track_allocations:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report["retained_mb"] = current / (1024 * 1024)
+        report["peak_traced_mb"] = peak / (1024 * 1024)
+    return report
+
+
+def print_report(report: dict) -> None:
+    turn = report["turn"]
+    print(f"\n{report['target']} @ {report['concurrency']} in flight: {report['turns']} turns in "
+          f"{report['seconds']:.2f}s = {report['turns_per_s']:.1f} turns/s | turn p50={turn['p50_ms']:.1f}ms "
+          f"p95={turn['p95_ms']:.1f}ms p99={turn['p99_ms']:.1f}ms | RSS +{report['rss_growth_mb']:.1f}MB"
+          + (f" retained {report['retained_mb']:.1f}MB" if "retained_mb" in report else ""))
+    for section in ("nodes", "llm"):
+        for series, stats in sorted(report[section].items()):
+            label = series.split("=", 1)[-1] + (" (llm)" if section == "llm" else "")
+            print(f"  {label:<24} n={stats['count']:<6} p50={stats['p50_ms']:8.2f}ms "
+                  f"p95={stats['p95_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms")
+    if report["errors"]:
+        print(f"  {len(report['errors'])} errors, first: {report['errors'][0]}")
+    if report["missed_leads"]:
+        print(f"  {report['missed_leads']} lead funnels did not capture a lead")
+    if report["partial_leads"]:
+        print(f"  {report['partial_leads']} single-message funnels left incomplete (expected in legacy mode)")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--corpus", help="JSONL from bench/corpus.py instead of generating one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--targets", nargs="+", default=["graph", "api", "stream"], choices=["graph", "api", "stream"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM latency per call (s)")
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--extraction-mode", default=None, choices=["structured", "legacy"])
+    parser.add_argument("--tracemalloc", action="store_true", help="also report retained/peak Python allocations")
+    parser.add_argument("--report", help="write all results as JSON")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else generate_corpus(args.conversations, args.seed)
+    install_fake_retriever()
+    llm = StubChatModel(latency=args.latency, jitter=args.jitter)
+    extraction_mode = args.extraction_mode or os.getenv("EXTRACTION_MODE", "structured")
+    graph = create_agent_graph(llm=llm, extraction_mode=extraction_mode)
+    chat_api.agent = graph
+
+    reports = []
+    transport = httpx.ASGITransport(app=chat_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for target in args.targets:
+            for concurrency in args.concurrency:
+                report = await run_target(target, graph, client, corpus, concurrency, args.tracemalloc,
+                                          extraction_mode)
+                print_report(report)
+                reports.append(report)
+
+    print(f"\nstub LLM calls: {llm.calls}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"args": vars(args), "results": reports}, f, indent=2)
+        print(f"Wrote {args.report}")
+
+    if any(r["errors"] or r["missed_leads"] for r in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""Embedding backends: torch (sentence-transformers, fp32) vs ONNX Runtime (int8).
+
+Each backend runs in a fresh interpreter, so import cost and resident memory
+are not shared between them. Reports per backend:
+
+  load           import + model load + embedding the knowledge base into a fresh index
+  docs/s         embed_documents throughput on the KB chunks (--repeat copies)
+  query p50/p99  single embed_query latency, what a cache-missing /api/chat turn pays
+  rss            resident memory after the model is loaded and used
+  hit@k          dense retrieval hits on bench/fixtures/retrieval_questions.json
+
+and, when both backends run, recall@k of the ONNX top-k against the torch
+top-k over the same chunks and queries, plus the cosine between their chunk
+vectors. Exits non-zero if recall@k is below --min-recall. The ONNX model
+must be exported first (scripts/export_onnx.py):
+
+    python bench/embedding_backends.py --backends torch onnx --k 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+from bench.corpus import generate_corpus
+from bench.stub_llm import require_embedding_model
+
+CHILD = """
+import json, resource, sys, time
+import numpy as np
+sys.path.append({src!r})
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+t0 = time.perf_counter()
+from rag.retriever import KnowledgeBaseRetriever
+r = KnowledgeBaseRetriever(index_dir={index_dir!r}, use_prebuilt=False, backend={backend!r},
+                           query_cache_size=0, batch_window_ms=0, mode="dense")
+load = time.perf_counter() - t0
+
+texts = [c.page_content for c in r.chunks]
+docs = texts * {repeat}
+t = time.perf_counter()
+r.embeddings.embed_documents(docs)
+docs_per_s = len(docs) / (time.perf_counter() - t)
+
+queries = {queries!r}
+latencies = []
+for _ in range({query_rounds}):
+    for q in queries:
+        t = time.perf_counter()
+        r.embeddings.embed_query(q)
+        latencies.append(time.perf_counter() - t)
+latencies.sort()
+
+questions = {questions!r}
+hits = sum(any(q["expected"].lower() in c.lower() for c in r.retrieve(q["question"], k={k}))
+           for q in questions)
+
+np.savez({vectors!r}, docs=np.asarray(r.embeddings.embed_documents(texts), dtype=np.float32),
+         queries=np.asarray(r.embeddings.embed_documents(queries), dtype=np.float32))
+print(json.dumps({{"load": load, "docs_per_s": docs_per_s, "chunks": len(texts),
+                  "p50": latencies[len(latencies) // 2], "p99": latencies[int(len(latencies) * 0.99)],
+                  "rss_mb": rss_mb(), "hit_rate": hits / len(questions),
+                  "embedder": r.embedder_id}}))
+"""
+
+
+def run_backend(backend: str, workdir: str, queries: list, questions: list, args) -> dict:
+    vectors = os.path.join(workdir, f"{backend}.npz")
+    code = CHILD.format(src=os.path.join(ROOT, "src"), index_dir=os.path.join(workdir, backend), backend=backend,
+                        repeat=args.repeat, queries=queries, query_rounds=args.query_rounds,
+                        questions=questions, k=args.k, vectors=vectors)
+    env = {**os.environ, "EMBEDDING_BACKEND": backend}
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        sys.exit(f"{backend} backend failed:\n{out.stderr.strip()}")
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    with np.load(vectors) as data:
+        result["docs"], result["queries"] = data["docs"], data["queries"]
+    return result
+
+
+def top_k(docs: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    # Vectors are L2-normalised, so the L2 ranking FAISS uses is the inner-product ranking
+    return np.argsort(-(queries @ docs.T), axis=1)[:, :k]
+
+
+def recall_at_k(reference: dict, candidate: dict, k: int) -> float:
+    expected = top_k(reference["docs"], reference["queries"], k)
+    found = top_k(candidate["docs"], candidate["queries"], k)
+    return float(np.mean([len(set(e) & set(f)) / k for e, f in zip(expected, found)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=["torch", "onnx"])
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200, help="distinct queries from the benchmark corpus")
+    parser.add_argument("--query-rounds", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20, help="copies of the KB chunks for docs/s")
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    args = parser.parse_args()
+    for backend in args.backends:
+        require_embedding_model(backend, load=False)
+
+    with open(os.path.join(ROOT, "bench", "fixtures", "retrieval_questions.json")) as f:
+        questions = json.load(f)
+    turns = dict.fromkeys(turn for c in generate_corpus(args.queries * 4, seed=3) for turn in c["turns"])
+    queries = [q["question"] for q in questions] + list(turns)[:args.queries]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in args.backends:
+            results[backend] = run_backend(backend, workdir, queries, questions, args)
+
+    print(f"{len(queries)} queries, {next(iter(results.values()))['chunks']} chunks x {args.repeat}")
+    print(f"{'backend':<8} {'load s':>7} {'docs/s':>8} {'query p50':>10} {'query p99':>10} {'rss MB':>8} "
+          f"{'hit@' + str(args.k):>7}")
+    for backend, r in results.items():
+        print(f"{backend:<8} {r['load']:>7.2f} {r['docs_per_s']:>8.0f} {r['p50'] * 1000:>8.2f}ms "
+              f"{r['p99'] * 1000:>8.2f}ms {r['rss_mb']:>8.0f} {r['hit_rate'] * 100:>6.1f}%")
+
+    if "torch" in results and "onnx" in results:
+        torch_r, onnx_r = results["torch"], results["onnx"]
+        recall = recall_at_k(torch_r, onnx_r, args.k)
+        cosine = float(np.mean(np.sum(torch_r["docs"] * onnx_r["docs"], axis=1)))
+        print(f"onnx vs torch: recall@{args.k}={recall:.3f}  mean chunk cosine={cosine:.4f}  "
+              f"docs/s {onnx_r['docs_per_s'] / torch_r['docs_per_s']:.1f}x  "
+              f"query p50 {torch_r['p50'] / onnx_r['p50']:.1f}x  rss {onnx_r['rss_mb'] - torch_r['rss_mb']:+.0f} MB")
+        if recall < args.min_recall:
+            print(f"FAIL: recall@{args.k} {recall:.3f} below {args.min_recall}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
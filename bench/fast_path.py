@@ -0,0 +1,204 @@
+"""Per-turn framework overhead: the compiled LangGraph vs the fast path executor.
+
+Replays generated conversations (greeting / inquiry / lead funnels, see
+bench/corpus.py) through two agents built from the same nodes:
+
+  graph   create_agent_graph(fast_path=False), the compiled StateGraph
+  fast    create_agent_graph(fast_path=True), agent.fast_path.FastPathAgent
+
+with a zero-latency stub LLM, so what is left of a turn is node code plus
+the executor around it. Parity first: every turn's full result state and LLM
+call count must be identical on both, for each extraction mode and for
+invoke() and ainvoke(), and both must reject a node update with a key
+outside AgentState. Then reports microseconds per turn and the framework
+overhead the fast path removes. This is the fast path's parity gate: it
+exits non-zero on any mismatch:
+
+    python bench/fast_path.py --conversations 200
+    python bench/fast_path.py --extraction-modes legacy --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+_TMP = tempfile.mkdtemp(prefix="fast-path-")
+os.environ.setdefault("LOCAL_INTENT_ENABLED", "false")
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+os.environ.setdefault("LEAD_SINK", "file")
+os.environ.setdefault("LEAD_SINK_PATH", os.path.join(_TMP, "leads.jsonl"))
+os.environ.setdefault("LEAD_QUEUE_PATH", os.path.join(_TMP, "leads.db"))
+# Every turn runs its nodes; a cached answer would hide both the executor and any divergence
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+
+from langgraph.errors import InvalidUpdateError
+
+import agent.graph as agent_graph
+from agent.graph import create_agent_graph
+from bench.corpus import generate_corpus
+from bench.stub_llm import StubChatModel, install_fake_retriever
+from session import compact_message
+from session.history import ConversationHistory
+
+
+def turn_inputs(state: dict, text: str, session_id: str) -> dict:
+    # Same windowing as api/chat.py: only the recent messages travel with the turn
+    history = ConversationHistory(state.get("messages", []))
+    history.extend([compact_message("human", text)])
+    return {**state, "messages": history.recent(), "cached_response": None, "session_id": session_id}
+
+
+def build(mode: str, fast_path: bool):
+    llm = StubChatModel(latency=0)
+    return create_agent_graph(llm=llm, extraction_mode=mode, fast_path=fast_path), llm
+
+
+def check_parity(mode: str, corpus: list, use_async: bool) -> list:
+    (graph, graph_llm), (fast, fast_llm) = build(mode, False), build(mode, True)
+    problems = []
+    turns = 0
+    for conversation in corpus:
+        graph_state = fast_state = {"messages": [], "lead_captured": False}
+        for i, text in enumerate(conversation["turns"]):
+            session_id = f"parity-{conversation['id']}"
+            calls = (graph_llm.calls, fast_llm.calls)
+            if use_async:
+                graph_state = asyncio.run(graph.ainvoke(turn_inputs(graph_state, text, session_id)))
+                fast_state = asyncio.run(fast.ainvoke(turn_inputs(fast_state, text, session_id)))
+            else:
+                graph_state = graph.invoke(turn_inputs(graph_state, text, session_id))
+                fast_state = fast.invoke(turn_inputs(fast_state, text, session_id))
+            turns += 1
+            graph_calls, fast_calls = graph_llm.calls - calls[0], fast_llm.calls - calls[1]
+            where = f"{mode} {'ainvoke' if use_async else 'invoke'} {conversation['id']} turn {i}"
+            if fast_state != graph_state:
+                keys = sorted(k for k in set(graph_state) | set(fast_state)
+                              if graph_state.get(k, KeyError) != fast_state.get(k, KeyError))
+                problems.append(f"{where}: states differ in {keys}")
+            if fast_calls != graph_calls:
+                problems.append(f"{where}: {fast_calls} LLM calls, the graph made {graph_calls}")
+            if problems:
+                return problems
+    if fast.fast_path_stats()["fast_turns"] != turns:
+        problems.append(f"{mode}: only {fast.fast_path_stats()['fast_turns']} of {turns} turns took the fast path")
+    return problems
+
+
+def check_unknown_keys(mode: str) -> list:
+    # A typo in a node's return value must fail the turn on both executors, not vanish on one
+    problems = []
+    respond, arespond = agent_graph.generate_response_node, agent_graph.agenerate_response_node
+
+    def typo(state, **kwargs):
+        return {"mesages": []}
+
+    async def atypo(state, **kwargs):
+        return typo(state)
+
+    agent_graph.generate_response_node, agent_graph.agenerate_response_node = typo, atypo
+    try:
+        agents = {"graph": build(mode, False)[0], "fast": build(mode, True)[0]}
+    finally:
+        agent_graph.generate_response_node, agent_graph.agenerate_response_node = respond, arespond
+    for variant, agent in agents.items():
+        for use_async in (False, True):
+            inputs = turn_inputs({"messages": []}, "hi", "typo")
+            try:
+                if use_async:
+                    asyncio.run(agent.ainvoke(inputs))
+                else:
+                    agent.invoke(inputs)
+                problems.append(f"{mode} {variant} {'ainvoke' if use_async else 'invoke'}: "
+                                f"unknown key in a node update was accepted")
+            except InvalidUpdateError:
+                pass
+    return problems
+
+
+async def replay(agent, corpus: list) -> list:
+    # Seconds per turn, the agent call only
+    seconds = []
+    for conversation in corpus:
+        state = {"messages": [], "lead_captured": False}
+        for text in conversation["turns"]:
+            inputs = turn_inputs(state, text, f"bench-{conversation['id']}")
+            start = time.perf_counter()
+            state = await agent.ainvoke(inputs)
+            seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def measure(mode: str, corpus: list, rounds: int) -> dict:
+    results = {}
+    for variant, fast_path in (("graph", False), ("fast", True)):
+        agent, _ = build(mode, fast_path)
+        asyncio.run(replay(agent, corpus[:10]))
+        # Best round of each, so a GC pause or a noisy neighbour does not decide the comparison
+        best = None
+        for _ in range(rounds):
+            seconds = asyncio.run(replay(agent, corpus))
+            if best is None or sum(seconds) < sum(best):
+                best = seconds
+        results[variant] = {
+            "us_mean": sum(best) / len(best) * 1e6,    #type:ignore
+            "us_p50": percentile(best, 0.5) * 1e6,    #type:ignore
+            "us_p99": percentile(best, 0.99) * 1e6,    #type:ignore
+            "turns_per_s": len(best) / sum(best)    #type:ignore
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3, help="timed replays per variant, best one reported")
+    parser.add_argument("--extraction-modes", nargs="+", default=["structured", "legacy"],
+                        choices=["structured", "legacy"])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    install_fake_retriever()
+    corpus = generate_corpus(args.conversations, seed=args.seed)
+    turns = sum(len(c["turns"]) for c in corpus)
+    print(f"{len(corpus)} conversations, {turns} turns, zero-latency stub LLM")
+
+    problems = []
+    for mode in args.extraction_modes:
+        for use_async in (False, True):
+            found = check_parity(mode, corpus, use_async)
+            print(f"parity  {mode:<10} {'ainvoke' if use_async else 'invoke':<7} "
+                  f"{'identical' if not found else 'MISMATCH'} over {turns} turns")
+            problems += found
+        found = check_unknown_keys(mode)
+        print(f"parity  {mode:<10} unknown update keys {'rejected by both' if not found else 'NOT REJECTED'}")
+        problems += found
+
+    print(f"{'mode':<10} {'variant':<7} {'us/turn':>8} {'p50':>7} {'p99':>7} {'turns/s':>8}")
+    for mode in args.extraction_modes:
+        results = measure(mode, corpus, args.rounds)
+        for variant, r in results.items():
+            print(f"{mode:<10} {variant:<7} {r['us_mean']:>8.0f} {r['us_p50']:>7.0f} {r['us_p99']:>7.0f} "
+                  f"{r['turns_per_s']:>8.0f}")
+        graph, fast = results["graph"], results["fast"]
+        print(f"{'':<10} framework overhead {graph['us_mean'] - fast['us_mean']:.0f}us/turn removed, "
+              f"{graph['us_mean'] / fast['us_mean']:.2f}x turns/s")
+
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-turn CPU and memory cost of conversation history for long sessions.
+
+"legacy" reproduces the previous bookkeeping: the whole message list is
+copied when the human message is appended and again when the reply is
+appended, and the full list is kept in session state. "windowed" keeps a
+bounded ring buffer in state and appends each turn to the store's log:
+
+    python bench/history.py --turns 1000 5000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from session import MemorySessionStore, SessionRecord, compact_message
+from session.history import ConversationHistory
+
+REPLY = "AutoStream's Pro plan is $79/month with unlimited videos and 4K exports."
+
+
+def legacy_session(turns: int, timings: list) -> dict:
+    sessions = {}
+    for i in range(turns):
+        start = time.perf_counter()
+        state = sessions.get("s", {"messages": []})
+        messages = state["messages"] + [HumanMessage(content=f"question {i}")]
+        messages = messages + [AIMessage(content=REPLY)]
+        sessions["s"] = {"messages": messages}
+        timings.append(time.perf_counter() - start)
+    return sessions
+
+
+def windowed_session(turns: int, timings: list) -> MemorySessionStore:
+    store = MemorySessionStore(max_bytes=1 << 40)
+    for i in range(turns):
+        start = time.perf_counter()
+        record = store.get("s") or SessionRecord()
+        history = ConversationHistory(record.messages)
+        new_messages = [compact_message("human", f"question {i}"), compact_message("ai", REPLY)]
+        history.extend(new_messages)
+        store.set("s", SessionRecord.from_state(record.to_state(), history.recent()))
+        store.append_log("s", new_messages)
+        timings.append(time.perf_counter() - start)
+    return store
+
+
+def measure(label: str, func, turns: int) -> None:
+    timings = []
+    tracemalloc.start()
+    keep = func(turns, timings)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+
+    last = timings[-100:]
+    print(f"{label:>9} turns={turns:<6} first100={sum(timings[:100]) / 100 * 1e6:8.1f}us "
+          f"last100={sum(last) / len(last) * 1e6:8.1f}us total={sum(timings) * 1000:8.1f}ms "
+          f"retained={current / 1024:9.1f}KiB peak={peak / 1024:9.1f}KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, nargs="+", default=[1000, 5000])
+    args = parser.parse_args()
+
+    for turns in args.turns:
+        measure("legacy", legacy_session, turns)
+        measure("windowed", windowed_session, turns)
+
+
+if __name__ == "__main__":
+    main()
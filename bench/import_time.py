@@ -0,0 +1,73 @@
+"""Import-time budget check for the API entry point.
+
+Runs `python -X importtime -c "import api.chat"` in fresh interpreters and
+fails (exit 1) when the median cumulative import time exceeds the budget or a
+heavy module from bench/import_budget.json is imported eagerly:
+
+    python bench/import_time.py --runs 5
+    python bench/import_time.py --top 15    # also list the slowest imports
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), "import_budget.json")
+
+
+def run_once(module: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([ROOT, os.path.join(ROOT, "src")]),
+           "WARMUP_ON_STARTUP": "false"}
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         capture_output=True, text=True, env=env, cwd=ROOT, check=True)
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(BUDGET_PATH) as f:
+        budget = json.load(f)
+    module = budget["module"]
+
+    samples = [run_once(module) for _ in range(args.runs)]
+    totals_ms = [s[module] / 1000 for s in samples]
+    median_ms = statistics.median(totals_ms)
+    loaded = set(samples[0])
+    eager = [m for m in budget["forbidden_modules"] if m in loaded]
+
+    print(f"import {module}: median={median_ms:.1f}ms min={min(totals_ms):.1f}ms "
+          f"(budget {budget['max_ms']}ms, {len(loaded)} modules)")
+    if args.top:
+        top = sorted(samples[0].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for name, us in top:
+            print(f"  {us / 1000:8.1f}ms  {name}")
+
+    failed = False
+    if median_ms > budget["max_ms"]:
+        print(f"FAIL: import time {median_ms:.1f}ms exceeds budget of {budget['max_ms']}ms")
+        failed = True
+    if eager:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(eager)}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Offline accuracy and latency benchmark for the tiered intent classifier.
+
+Replays a labelled fixture through the keyword tier and the local
+nearest-centroid tier at several confidence thresholds, reporting how many
+turns would skip Gemini, how accurate those local decisions are, and the
+per-message latency of the local path:
+
+    python bench/intent_classifier.py [--fixture bench/fixtures/intent_labelled.jsonl]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+from bench.stub_llm import require_embedding_model
+from rag.retriever import get_retriever
+from utils.intent import detect_high_intent_keywords
+from utils.local_intent import LocalIntentClassifier
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", default=os.path.join(ROOT, "bench", "fixtures", "intent_labelled.jsonl"))
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
+    args = parser.parse_args()
+
+    with open(args.fixture, 'r') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    require_embedding_model()
+    classifier = LocalIntentClassifier(get_retriever().load_embeddings())
+
+    # Score every fixture once; thresholds are applied afterwards
+    scored = []
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        keyword = detect_high_intent_keywords(row["text"])
+        label, confidence = classifier.scores(row["text"])
+        latencies.append(time.perf_counter() - start)
+        scored.append((row["label"], keyword, label, confidence))
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{len(rows)} labelled messages, local tier latency "
+          f"p50={statistics.median(latencies) * 1000:.2f}ms p99={p99 * 1000:.2f}ms\n")
+
+    print(f"{'threshold':>9} {'local %':>8} {'local acc':>9} {'to LLM':>7}")
+    for threshold in args.thresholds:
+        resolved = correct = 0
+        for expected, keyword, label, confidence in scored:
+            if keyword:
+                predicted = "high_intent_lead"
+            elif confidence >= threshold:
+                predicted = label
+            else:
+                continue
+            resolved += 1
+            correct += predicted == expected
+        accuracy = correct / resolved if resolved else 0.0
+        print(f"{threshold:>9.2f} {resolved / len(rows) * 100:>7.1f}% {accuracy * 100:>8.1f}% "
+              f"{len(rows) - resolved:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Knowledge base hot reload vs full rebuild on a scaled-up knowledge base.
+
+The KB is knowledge_base.json replicated --scale times under distinct top-level
+keys (so every chunk text is unique). After a full build, a few leaves are
+edited, added and removed and the file is reloaded incrementally. Reports:
+
+  full rebuild   parse + split + embed every chunk + build the FAISS index
+  reload         diff leaves by path/content hash, embed only new text,
+                 remove/add by id on a cloned index, swap the snapshot
+  retrieve p99   latency of retrieve() in reader threads while the reload runs
+
+Embeddings are hash-based; --embed-ms adds a per-chunk cost to stand in for
+MiniLM on CPU (--model minilm uses the real model if it is available).
+Exits non-zero if reloaded results differ from a fresh rebuild:
+
+    python bench/kb_reload.py --scale 100 --edits 10 --embed-ms 2
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from rag.retriever import KnowledgeBaseRetriever
+
+QUERIES = ["pro plan price", "refund policy", "4K resolution", "basic plan videos per month",
+           "AI captions", "support hours", "cancel subscription", "platforms supported"]
+
+
+class SlowEmbeddings(Embeddings):
+    # Hash embeddings plus a fixed per-text cost, so rebuild vs reload reflects embedding work
+
+    def __init__(self, size: int, ms_per_text: float):
+        self.inner = DeterministicFakeEmbedding(size=size)
+        self.ms_per_text = ms_per_text
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        time.sleep(len(texts) * self.ms_per_text / 1000)
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.inner.embed_query(text)
+
+
+def scaled_kb(scale: int) -> dict:
+    with open(os.path.join(ROOT, "src", "rag", "knowledge_base.json")) as f:
+        kb = json.load(f)
+    return {f"region_{i}": json.loads(json.dumps(kb)) for i in range(scale)}
+
+
+def leaves(data, path=()):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from leaves(value, path + (key,))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            yield from leaves(value, path + (i,))
+    else:
+        yield path
+
+
+def edit(kb: dict, edits: int, seed: int) -> None:
+    # Change `edits` leaf values, add `edits` new leaves and drop `edits` list items
+    rng = random.Random(seed)
+    paths = list(leaves(kb))
+    for path in rng.sample(paths, edits):
+        node = kb
+        for key in path[:-1]:
+            node = node[key]
+        node[path[-1]] = f"{node[path[-1]]} (updated)"
+    for i in range(edits):
+        kb[f"region_{rng.randrange(len(kb))}"].setdefault("announcements", {})[f"item_{i}"] = \
+            f"New promotion {i}: {rng.randint(10, 50)}% off annual plans"
+    lists = [(p[:-1]) for p in paths if isinstance(p[-1], int)]
+    for path in rng.sample(sorted(set(lists)), edits):
+        node = kb
+        for key in path:
+            node = node[key]
+        if len(node) > 1:
+            node.pop(rng.randrange(len(node)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--edits", type=int, default=10)
+    parser.add_argument("--embed-ms", type=float, default=2.0, help="simulated embedding cost per chunk")
+    parser.add_argument("--model", choices=["hash", "minilm"], default="hash")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="kb-reload-")
+    kb_path = os.path.join(workdir, "knowledge_base.json")
+    kb = scaled_kb(args.scale)
+    with open(kb_path, "w") as f:
+        json.dump(kb, f)
+
+    if args.model == "minilm":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    else:
+        embeddings = SlowEmbeddings(64, args.embed_ms)
+
+    try:
+        start = time.perf_counter()
+        retriever = KnowledgeBaseRetriever(kb_path, index_dir=os.path.join(workdir, "index"), embeddings=embeddings)
+        full_seconds = time.perf_counter() - start
+        print(f"scale {args.scale}x: {len(retriever.chunks)} chunks")
+        print(f"full rebuild   {full_seconds:8.3f}s")
+
+        edit(kb, args.edits, args.seed)
+        with open(kb_path, "w") as f:
+            json.dump(kb, f)
+
+        # Readers keep querying through the reload; retrieve never takes the reload lock
+        stop = threading.Event()
+        latencies, errors = [], []
+
+        def reader(i: int):
+            while not stop.is_set():
+                query = QUERIES[i % len(QUERIES)]
+                t = time.perf_counter()
+                try:
+                    retriever.retrieve(query, k=3)
+                except Exception as e:
+                    errors.append(repr(e))
+                latencies.append(time.perf_counter() - t)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        result = retriever.reload()
+        time.sleep(0.2)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        print(f"reload         {result['seconds']:8.3f}s  (+{result['added']} -{result['removed']} chunks, "
+              f"{result['embedded']} embedded, {result['kept']} kept)  {full_seconds / result['seconds']:.1f}x faster")
+        latencies.sort()
+        print(f"retrieve p99   {latencies[int(len(latencies) * 0.99)] * 1000:8.2f}ms over {len(latencies)} calls "
+              f"during reload, {len(errors)} errors")
+
+        fresh = KnowledgeBaseRetriever(kb_path, index_dir=os.path.join(workdir, "fresh"), embeddings=embeddings)
+        mismatched = [q for q in QUERIES if retriever.retrieve(q, k=3) != fresh.retrieve(q, k=3)]
+        if len(fresh.chunks) != len(retriever.chunks):
+            mismatched.append(f"{len(retriever.chunks)} chunks after reload vs {len(fresh.chunks)} rebuilt")
+        if mismatched or errors:
+            print(f"FAIL: reload differs from a full rebuild: {mismatched[:3]} {errors[:1]}")
+            sys.exit(1)
+        print("reloaded index matches a full rebuild")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Burst throughput of the lead sink: capture latency on the request path and
+time until the worker has delivered everything.
+
+Each scenario captures N leads from concurrent threads (every lead is
+captured twice to exercise idempotency), then waits for the queue to drain.
+Exits non-zero if any lead is lost or delivered twice to the receiver:
+
+    python bench/lead_sink.py --leads 1000 5000
+    python bench/lead_sink.py --leads 2000 --fail-rate 0.2 --latency 0.01
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+sys.path.append(ROOT)
+
+from bench.lead_stub_server import LeadStubServer
+from leads import FileLeadBackend, HttpLeadBackend, LeadQueue, LeadSink, WebhookLeadBackend
+
+
+def run(backend_name: str, leads: int, workers: int, batch_size: int,
+        latency: float, fail_rate: float, timeout: float) -> dict:
+    tmp = tempfile.mkdtemp()
+    server = None
+    if backend_name == "file":
+        backend = FileLeadBackend(os.path.join(tmp, "leads.jsonl"))
+    else:
+        server = LeadStubServer(latency=latency, fail_rate=fail_rate).start()
+        backend = HttpLeadBackend(server.url) if backend_name == "http" else WebhookLeadBackend(server.url, "s3cret")
+
+    sink = LeadSink(LeadQueue(os.path.join(tmp, "leads.db"), max_attempts=50), backend,
+                    batch_size=batch_size, flush_interval=0.05, backoff_seconds=0.02, max_backoff_seconds=0.5)
+
+    def capture(i: int) -> float:
+        start = time.perf_counter()
+        sink.capture(f"session-{i % (leads // 2 or 1)}-{i}", "Jordan", f"user{i}@example.com", "YouTube")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        latencies = list(pool.map(capture, list(range(leads)) * 2))
+    captured = time.perf_counter() - start
+
+    deadline = time.time() + timeout
+    while sink.queue.counts()["pending"] and time.time() < deadline:
+        time.sleep(0.01)
+    drained = time.perf_counter() - start
+    sink.stop()
+
+    if backend_name == "file":
+        with open(os.path.join(tmp, "leads.jsonl")) as f:
+            keys = [json.loads(line)["idempotency_key"] for line in f]
+        received, duplicates = len(set(keys)), len(keys) - len(set(keys))
+    else:
+        received, duplicates = len(server.leads), 0
+        server.shutdown()
+
+    latencies.sort()
+    return {
+        "backend": backend_name,
+        "leads": leads,
+        "capture_p50_ms": statistics.median(latencies) * 1000,
+        "capture_p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "captures_per_s": len(latencies) / captured,
+        "delivered_per_s": leads / drained,
+        "received": received,
+        "duplicates": duplicates,
+        **{k: v for k, v in sink.stats().items() if k in ("batches", "failures", "dead_letter")}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--backends", nargs="+", default=["file", "http", "webhook"])
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub server latency per request (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of stub requests answered 503")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    ok = True
+    print(f"{'backend':<8} {'leads':>6} {'p50 ms':>8} {'p99 ms':>8} {'capt/s':>9} {'deliv/s':>9} "
+          f"{'batches':>8} {'fails':>6} {'recv':>6} {'dup':>4}")
+    for leads in args.leads:
+        for backend in args.backends:
+            r = run(backend, leads, args.workers, args.batch_size, args.latency, args.fail_rate, args.timeout)
+            print(f"{r['backend']:<8} {r['leads']:>6} {r['capture_p50_ms']:>8.3f} {r['capture_p99_ms']:>8.3f} "
+                  f"{r['captures_per_s']:>9.0f} {r['delivered_per_s']:>9.0f} {r['batches']:>8} "
+                  f"{r['failures']:>6} {r['received']:>6} {r['duplicates']:>4}")
+            if r["received"] != leads or r["duplicates"] or r["dead_letter"]:
+                print(f"FAIL: {backend} delivered {r['received']}/{leads} leads "
+                      f"({r['duplicates']} duplicates, {r['dead_letter']} dead-lettered)")
+                ok = False
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Local stand-in for a CRM lead endpoint (LEAD_SINK=http / webhook).
+
+Accepts both the batched `{"leads": [...]}` body and single-lead webhook
+bodies, drops redeliveries by idempotency_key, and can inject latency and
+failures (HTTP 503) to exercise the sink's retry path:
+
+    python bench/lead_stub_server.py --port 8765 --fail-rate 0.2
+    LEAD_SINK=http LEAD_SINK_URL=http://127.0.0.1:8765/leads uvicorn api.chat:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LeadStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, fail_rate: float = 0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.leads = {}
+        self.requests = 0
+        self.failures = 0
+        self.redeliveries = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/leads"
+
+    def start(self) -> "LeadStubServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if server.latency:
+            time.sleep(server.latency)
+
+        with server.lock:
+            server.requests += 1
+            if random.random() < server.fail_rate:
+                server.failures += 1
+                status = 503
+            else:
+                for lead in body.get("leads", [body]):
+                    if lead["idempotency_key"] in server.leads:
+                        server.redeliveries += 1
+                    server.leads[lead["idempotency_key"]] = lead
+                status = 200
+
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = LeadStubServer(args.port, latency=args.latency, fail_rate=args.fail_rate)
+    print(f"Lead stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{len(server.leads)} unique leads, {server.requests} requests, "
+              f"{server.failures} injected failures, {server.redeliveries} redeliveries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""LLM calls and latency per turn: legacy three-call flow vs. structured extraction.
+
+Scripted conversations run directly through create_agent_graph against the
+stub model, so every Gemini round trip is counted:
+
+    python bench/llm_calls.py [--latency 0.2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+os.environ.setdefault("LOCAL_INTENT_ENABLED", "false")
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+
+from langchain_core.messages import HumanMessage
+
+from agent.graph import create_agent_graph
+from bench.stub_llm import StubChatModel, install_fake_retriever
+
+CONVERSATIONS = {
+    "greeting": ["hi", "hello again"],
+    "inquiry": ["hi", "what does the pro plan cost?", "do you have a refund policy?"],
+    "lead funnel": [
+        "hi",
+        "I want to sign up for my YouTube channel",
+        "My name is Alex",
+        "alex@example.com",
+        "sounds good",
+    ],
+    "direct signup": [
+        "hey",
+        "Can you set up an account? I'm Sam",
+        "sam@example.com",
+        "Instagram",
+    ],
+}
+
+
+async def run_mode(mode: str, latency: float) -> None:
+    llm = StubChatModel(latency=latency)
+    graph = create_agent_graph(llm=llm, extraction_mode=mode)
+
+    print(f"\n[{mode}]")
+    print(f"{'conversation':>14} {'turns':>6} {'llm calls':>10} {'calls/turn':>11} {'ms/turn':>9}")
+    for name, script in CONVERSATIONS.items():
+        state = {"messages": [], "lead_captured": False}
+        calls_before = llm.calls
+        start = time.perf_counter()
+        for message in script:
+            state = await graph.ainvoke({**state, "messages": state["messages"][-3:] + [HumanMessage(content=message)]})
+        elapsed = time.perf_counter() - start
+        calls = llm.calls - calls_before
+        print(f"{name:>14} {len(script):>6} {calls:>10} {calls / len(script):>11.2f} "
+              f"{elapsed / len(script) * 1000:>9.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per LLM call")
+    args = parser.parse_args()
+
+    install_fake_retriever()
+    for mode in ("legacy", "structured"):
+        await run_mode(mode, args.latency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,301 @@
+"""LLM gateway under a burst of near-identical prompts, against a local
+rate-limited stub endpoint.
+
+The stub server enforces its own token bucket (--provider-rate) and answers
+429 with Retry-After beyond it, like Gemini's quota errors. Each simulated
+turn sends the intent-classification prompt for a message drawn from a
+small pool of popular openers ("hi", "pricing?") plus some unique ones.
+
+  direct   the chat model is called as-is: every prompt is its own request
+  gateway  LLMGateway: single-flight + client-side token bucket just under the
+           provider rate (bounded queue, 429 + Retry-After when full)
+
+Both use the same keep-alive httpx pool; --fresh-clients opens a new
+connection per call for comparison.
+
+First checks that a half-open circuit recovers when its probe is rate
+limited or cancelled (the probe slot is released, the next call probes
+again), and that requests coalesced onto a cancelled call still get their
+answer; exits non-zero if either fails:
+
+    python bench/llm_gateway.py --turns 2000 --concurrency 200 --provider-rate 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+sys.path.append(ROOT)
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from bench.stub_llm import scripted_reply
+from utils.intent import _classification_messages
+from utils.llm_gateway import CircuitBreaker, LLMGateway, LLMRateLimitedError, LLMUnavailableError, TokenBucket
+
+POPULAR = ["hi", "hello", "pricing?", "how much is pro?", "hey", "what plans do you have?"]
+
+
+class RateLimitedServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, rate: float, latency: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.rate = rate
+        self.latency = latency
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.throttled = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/generate"
+
+    def admit(self) -> Optional[float]:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                self.throttled += 1
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+            self.accepted += 1
+            return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are separate writes; without this, Nagle + delayed ACK add ~40ms per reply
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        retry_after = self.server.admit()
+        if retry_after is not None:
+            payload, status = b'{"error":"RESOURCE_EXHAUSTED"}', 429
+        else:
+            time.sleep(self.server.latency)
+            payload, status = json.dumps({"text": body["reply"]}).encode(), 200
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", f"{retry_after:.3f}")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpStubChatModel(BaseChatModel):
+    # Calls the stub endpoint over HTTP; replies are the same scripted ones as StubChatModel
+    url: str
+    client: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "http-stub"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("async only")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        body = {"reply": scripted_reply(messages)}
+        if self.client is not None:
+            response = await self.client.post(self.url, json=body)
+        else:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(self.url, json=body)
+        response.raise_for_status()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response.json()["text"]))])
+
+
+class _ProbeLLM:
+    # Answers at once (or after `delay`), or blocks until cancelled while `hang` is set
+    def __init__(self, delay: float = 0.0):
+        self.hang = False
+        self.delay = delay
+        self.calls = 0
+
+    async def ainvoke(self, *args, **kwargs):
+        self.calls += 1
+        if self.hang:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        return AIMessage(content="ok")
+
+
+def _half_open_gateway(limiter: Optional[TokenBucket] = None) -> LLMGateway:
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    return LLMGateway(_ProbeLLM(), "bench-probe", limiter=limiter, breaker=breaker, singleflight=False)
+
+
+async def check_probe_release() -> List[str]:
+    problems = []
+
+    # Probe rejected by the rate limiter: the circuit must still let the next call probe
+    limiter = TokenBucket(rate=1, burst=1, max_queue=0, max_wait=0)
+    limiter.reserve()
+    gateway = _half_open_gateway(limiter)
+    try:
+        await gateway.ainvoke("probe")
+        problems.append("rate-limited probe: the empty bucket did not reject the call")
+    except LLMRateLimitedError:
+        pass
+    gateway.limiter = None
+    try:
+        await gateway.ainvoke("probe")
+    except LLMUnavailableError as e:
+        problems.append(f"rate-limited probe: next call got {e!r}, circuit stuck {gateway.breaker.state}")
+
+    # Probe cancelled mid-call (client went away): same
+    gateway = _half_open_gateway()
+    gateway.llm.hang = True
+    task = asyncio.ensure_future(gateway.ainvoke("probe"))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    gateway.llm.hang = False
+    try:
+        await gateway.ainvoke("probe")
+    except LLMUnavailableError as e:
+        problems.append(f"cancelled probe: next call got {e!r}, circuit stuck {gateway.breaker.state}")
+    if gateway.breaker.state != "closed":
+        problems.append(f"cancelled probe: successful probe left the circuit {gateway.breaker.state}")
+
+    print(f"half-open probe release (rate limited, cancelled): {'OK' if not problems else 'FAILED'}")
+    return problems
+
+
+async def check_cancelled_leader() -> List[str]:
+    # Identical prompts share one call; its caller going away must not fail the others
+    llm = _ProbeLLM(delay=0.05)
+    gateway = LLMGateway(llm, "bench-leader", breaker=CircuitBreaker())
+    leader = asyncio.ensure_future(gateway.ainvoke("same prompt"))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.ensure_future(gateway.ainvoke("same prompt")) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    results = await asyncio.gather(*followers, return_exceptions=True)
+    failed = [r for r in results if not isinstance(r, AIMessage)]
+    print(f"cancelled single-flight leader: {len(results) - len(failed)}/{len(results)} followers answered, "
+          f"{llm.calls} upstream calls")
+    if failed:
+        return [f"cancelled leader: {len(failed)} followers failed with {failed[0]!r}"]
+    if llm.calls != 2:
+        return [f"cancelled leader: {llm.calls} upstream calls, expected 2 (cancelled + one takeover)"]
+    return []
+
+
+async def run(mode: str, args, messages: List[str]) -> dict:
+    server = RateLimitedServer(args.provider_rate, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    limits = httpx.Limits(max_connections=args.pool, max_keepalive_connections=args.pool)
+    client = None if args.fresh_clients else httpx.AsyncClient(limits=limits, timeout=30)
+    llm = HttpStubChatModel(url=server.url, client=client)
+    if mode == "gateway":
+        limiter = TokenBucket(rate=args.provider_rate * 0.9, burst=int(args.provider_rate * 0.9),
+                              max_queue=args.max_queue, max_wait=args.max_wait)
+        llm = LLMGateway(llm, f"bench-{mode}", limiter=limiter,
+                         breaker=CircuitBreaker(failure_threshold=1000, reset_seconds=1))
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, outcomes = [], {"ok": 0, "provider_429": 0, "gateway_429": 0, "error": 0}
+
+    async def turn(text: str):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await llm.ainvoke(_classification_messages(text))
+                outcomes["ok"] += 1
+                latencies.append(time.perf_counter() - start)
+            except LLMUnavailableError:
+                outcomes["gateway_429"] += 1
+            except httpx.HTTPStatusError as e:
+                outcomes["provider_429" if e.response.status_code == 429 else "error"] += 1
+            except Exception:
+                outcomes["error"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(m) for m in messages))
+    elapsed = time.perf_counter() - start
+    if client is not None:
+        await client.aclose()
+    server.shutdown()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "seconds": elapsed,
+        "ok_per_s": outcomes["ok"] / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        "upstream": server.accepted + server.throttled,
+        "coalesced": llm.coalesced if mode == "gateway" else 0,
+        **outcomes
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--popular-share", type=float, default=0.7, help="fraction of turns from POPULAR")
+    parser.add_argument("--provider-rate", type=float, default=50.0, help="stub endpoint requests/s")
+    parser.add_argument("--latency", type=float, default=0.1, help="stub endpoint latency per request (s)")
+    parser.add_argument("--max-queue", type=int, default=200)
+    parser.add_argument("--max-wait", type=float, default=5.0)
+    parser.add_argument("--pool", type=int, default=32)
+    parser.add_argument("--fresh-clients", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    problems = await check_probe_release()
+    problems += await check_cancelled_leader()
+
+    rng = random.Random(args.seed)
+    messages = [rng.choice(POPULAR) if rng.random() < args.popular_share else f"question number {i} about plans"
+                for i in range(args.turns)]
+
+    print(f"{'mode':<8} {'seconds':>8} {'ok/s':>8} {'ok':>6} {'prov429':>8} {'gw429':>6} {'err':>5} "
+          f"{'upstream':>9} {'coalesced':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode in ("direct", "gateway"):
+        r = await run(mode, args, messages)
+        print(f"{r['mode']:<8} {r['seconds']:>8.2f} {r['ok_per_s']:>8.1f} {r['ok']:>6} {r['provider_429']:>8} "
+              f"{r['gateway_429']:>6} {r['error']:>5} {r['upstream']:>9} {r['coalesced']:>10} "
+              f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""Microbenchmark for keyword intent and platform detection.
+
+Compares the previous per-phrase `in` checks plus the full-history
+platform scan against the compiled matcher scanning only the newest
+message, at 10, 100 and 1000-message histories:
+
+    python bench/matcher.py [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+
+from utils.matcher import HIGH_INTENT_KEYWORDS, PLATFORMS, find_platform, has_high_intent
+
+FILLER = [
+    "what does the pro plan include?",
+    "is there a refund if I cancel?",
+    "do you support 4k exports for long videos?",
+    "thanks, that helps a lot",
+    "how fast is rendering on the basic plan?",
+]
+
+
+def legacy_turn(history):
+    message_lower = history[-1].lower()
+    any(keyword in message_lower for keyword in HIGH_INTENT_KEYWORDS)
+    for msg in history:
+        msg_lower = msg.lower()
+        for platform in PLATFORMS:
+            if platform in msg_lower:
+                return platform.capitalize()
+    return None
+
+
+def compiled_turn(history):
+    has_high_intent(history[-1])
+    return find_platform(history[-1])
+
+
+def time_turn(func, history, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(history)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'history':>8} {'legacy us':>10} {'compiled us':>12} {'speedup':>8}")
+    for size in (10, 100, 1000):
+        # Worst case for the legacy scan: no platform anywhere in the history
+        history = [rng.choice(FILLER) for _ in range(size)]
+        legacy = time_turn(legacy_turn, history, args.repeat)
+        compiled = time_turn(compiled_turn, history, args.repeat)
+        print(f"{size:>8} {legacy * 1e6:>10.1f} {compiled * 1e6:>12.2f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
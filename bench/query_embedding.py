@@ -0,0 +1,106 @@
+"""Retrieval throughput with and without the query-embedding cache and micro-batching.
+
+Worker threads issue retrieve() calls drawn from a small set of popular
+questions (with some unique long-tail queries), as the async API does via
+asyncio.to_thread. Reports QPS and p50/p99 latency for each configuration:
+
+    python bench/query_embedding.py --threads 16 --queries 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+from bench.stub_llm import require_embedding_model
+from rag.retriever import KnowledgeBaseRetriever
+
+POPULAR = [
+    "How much is the Pro plan?",
+    "what is the refund policy",
+    "Do you support 4K?",
+    "What does the basic plan include?",
+    "is there 24/7 support",
+    "Do you have AI captions?",
+]
+
+CONFIGS = [
+    ("baseline", 0, 0),
+    ("cache", 1024, 0),
+    ("batching", 0, 5),
+    ("cache+batching", 1024, 5),
+]
+
+
+def workload(total: int, unique_fraction: float, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    queries = []
+    for i in range(total):
+        if rng.random() < unique_fraction:
+            queries.append(f"question number {i} about exporting {rng.randint(1, 10_000)} videos")
+        else:
+            queries.append(rng.choice(POPULAR))
+    return queries
+
+
+def run(retriever, queries: list, threads: int) -> tuple:
+    latencies = []
+    lock = threading.Lock()
+    position = iter(range(len(queries)))
+
+    def worker():
+        local = []
+        while True:
+            with lock:
+                i = next(position, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            retriever.retrieve(queries[i], k=2)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(queries) / elapsed, p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--unique", type=float, default=0.3, help="fraction of never-repeated queries")
+    args = parser.parse_args()
+
+    queries = workload(args.queries, args.unique)
+    index_dir = tempfile.mkdtemp()
+    shared = KnowledgeBaseRetriever(index_dir=index_dir, embeddings=require_embedding_model(),
+                                    query_cache_size=0, batch_window_ms=0)
+
+    print(f"{'config':>15} {'QPS':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, cache_size, window_ms in CONFIGS:
+        # Same embedding model and index for every configuration
+        retriever = KnowledgeBaseRetriever(index_dir=index_dir, embeddings=shared.embeddings,
+                                           query_cache_size=cache_size, batch_window_ms=window_ms)
+        qps, p50, p99 = run(retriever, queries, args.threads)
+        print(f"{label:>15} {qps:>9.1f} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
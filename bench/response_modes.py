@@ -0,0 +1,62 @@
+"""Per-turn latency of the lead funnel with template vs. LLM-generated replies.
+
+    python bench/response_modes.py [--latency 0.4] [--conversations 20]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+os.environ.setdefault("LOCAL_INTENT_ENABLED", "false")
+
+from langchain_core.messages import HumanMessage
+
+from agent.graph import create_agent_graph
+from bench.stub_llm import StubChatModel, install_fake_retriever
+
+FUNNEL = [
+    "hello",
+    "I want to sign up for my YouTube channel",
+    "My name is Alex",
+    "alex@example.com",
+]
+
+
+async def run_mode(mode: str, latency: float, conversations: int) -> None:
+    llm = StubChatModel(latency=latency)
+    graph = create_agent_graph(llm=llm, response_mode=mode)
+
+    per_turn = [[] for _ in FUNNEL]
+    for _ in range(conversations):
+        state = {"messages": [], "lead_captured": False}
+        for i, message in enumerate(FUNNEL):
+            start = time.perf_counter()
+            state = await graph.ainvoke({**state, "messages": state["messages"][-3:] + [HumanMessage(content=message)]})
+            per_turn[i].append(time.perf_counter() - start)
+
+    print(f"\n[{mode}] LLM calls per conversation: {llm.calls / conversations:.1f}")
+    for message, timings in zip(FUNNEL, per_turn):
+        print(f"  {message[:38]:<40} median={statistics.median(timings) * 1000:7.1f}ms")
+    total = sum(statistics.median(t) for t in per_turn)
+    print(f"  {'funnel total':<40} median={total * 1000:7.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.4, help="simulated seconds per LLM call")
+    parser.add_argument("--conversations", type=int, default=20)
+    args = parser.parse_args()
+
+    install_fake_retriever()
+    for mode in ("llm", "template"):
+        await run_mode(mode, args.latency, args.conversations)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
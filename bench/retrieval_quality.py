@@ -0,0 +1,58 @@
+"""Retrieval quality and latency: dense FAISS vs. BM25 vs. hybrid (RRF).
+
+A question counts as a hit when any of the top-k chunks contains the
+expected fact from the fixture:
+
+    python bench/retrieval_quality.py [--k 2]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+from bench.stub_llm import require_embedding_model
+from rag.retriever import KnowledgeBaseRetriever
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--fixture", default=os.path.join(ROOT, "bench", "fixtures", "retrieval_questions.json"))
+    args = parser.parse_args()
+
+    with open(args.fixture, 'r') as f:
+        questions = json.load(f)
+
+    index_dir = tempfile.mkdtemp()
+    base = KnowledgeBaseRetriever(index_dir=index_dir, embeddings=require_embedding_model(),
+                                  query_cache_size=0, batch_window_ms=0)
+
+    print(f"{'mode':>8} {'hit@' + str(args.k):>7} {'mean ms':>8} {'max ms':>8}")
+    for mode in ("dense", "lexical", "hybrid"):
+        retriever = KnowledgeBaseRetriever(index_dir=index_dir, embeddings=base.embeddings,
+                                           query_cache_size=0, batch_window_ms=0, mode=mode)
+        hits = 0
+        timings = []
+        misses = []
+        for item in questions:
+            start = time.perf_counter()
+            chunks = retriever.retrieve(item["question"], k=args.k)
+            timings.append(time.perf_counter() - start)
+            if any(item["expected"].lower() in chunk.lower() for chunk in chunks):
+                hits += 1
+            else:
+                misses.append(item["question"])
+        print(f"{mode:>8} {hits / len(questions) * 100:>6.1f}% {sum(timings) / len(timings) * 1000:>8.2f} "
+              f"{max(timings) * 1000:>8.2f}")
+        for question in misses:
+            print(f"{'':>10}miss: {question}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""Concurrent requests on one session: ordering, lost updates and duplicates.
+
+Fires traffic at /api/chat over an in-process ASGI client (stub LLM, hash
+embeddings, see bench/e2e.py) and checks the stored sessions afterwards:
+
+  same-session   every turn of a lead funnel sent at once (1ms apart), for
+                 --sessions sessions in parallel: each session must end with
+                 every turn in its log and the lead captured
+  duplicates     the same message --duplicates times at once per session (a
+                 double-send): one turn in the log, one set of LLM calls, the
+                 same answer for every copy; a retry with an Idempotency-Key
+                 after the fact is replayed, not re-run, while the same text
+                 without a key after the fact is a new turn; a copy waiting
+                 on a cancelled first request runs the turn itself
+  cross-session  one turn on each of --sessions sessions at once: unrelated
+                 sessions must not wait on each other (--min-speedup over
+                 running them back to back)
+  workers        with --workers N, N processes sharing one SQLite session
+                 store send distinct messages to the same sessions; no turn
+                 may be lost across processes
+  stores         the same operations on the memory, SQLite and Redis stores:
+                 record and log round trips, ids shaped like other keys
+                 ("abc:log"), size, lease compare-and-set and expiry (the
+                 Redis Lua scripts), result and session TTLs. Redis runs on
+                 fakeredis (optional: pip install "fakeredis[lua]") and is
+                 skipped with a note when it is not installed
+
+--store picks the backend the API phases run on (redis: fakeredis). Exits
+non-zero on any inconsistency. --no-lock turns the coordinator off to show
+the lost turns and lead fields it prevents (expect FAIL):
+
+    python bench/session_concurrency.py --sessions 50 --duplicates 4 --workers 4
+    python bench/session_concurrency.py --store redis
+    python bench/session_concurrency.py --no-lock
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+_TMP = tempfile.mkdtemp(prefix="session-concurrency-")
+os.environ.setdefault("LOCAL_INTENT_ENABLED", "false")
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+os.environ.setdefault("LEAD_SINK", "file")
+os.environ.setdefault("LEAD_SINK_PATH", os.path.join(_TMP, "leads.jsonl"))
+os.environ.setdefault("LEAD_QUEUE_PATH", os.path.join(_TMP, "leads.db"))
+# Whole conversations stay in the session log, so every lost turn is visible
+os.environ.setdefault("HISTORY_WINDOW", "1000")
+# Every turn reaches the stub LLM, so its call count shows what deduplication saved
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+if "--no-lock" in sys.argv:
+    os.environ["SESSION_LOCK_ENABLED"] = "false"
+    os.environ["DEDUPE_IN_FLIGHT"] = "false"
+
+import httpx
+
+from agent.graph import create_agent_graph
+from api import chat as chat_api
+from bench.corpus import generate_corpus
+from bench.stub_llm import StubChatModel, install_fake_retriever
+from session import MemorySessionStore, RedisSessionStore, SQLiteSessionStore, SessionRecord, compact_message
+
+
+def funnels(count: int) -> list:
+    # Separate name / email / platform turns, so a lost update shows up as a missing field
+    corpus = generate_corpus(count * 4, seed=11, mix={"lead": 1.0})
+    return [c for c in corpus if not c["combined"]][:count]
+
+
+async def post(client: httpx.AsyncClient, session_id: str, message: str, delay: float = 0.0,
+               headers: dict = None) -> httpx.Response:    #type:ignore
+    await asyncio.sleep(delay)
+    return await client.post("/api/chat", json={"message": message, "session_id": session_id}, headers=headers)
+
+
+def failed_responses(responses: list) -> list:
+    return [f"HTTP {r.status_code} {r.text[:120]}" for r in responses if r.status_code != 200]
+
+
+async def same_session(client: httpx.AsyncClient, sessions: int) -> list:
+    problems = []
+    conversations = funnels(sessions)
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(
+        post(client, f"same-{c['id']}", turn, delay=i * 0.001)
+        for c in conversations for i, turn in enumerate(c["turns"])
+    ))
+    seconds = time.perf_counter() - start
+    problems += failed_responses(responses)[:3]
+
+    lost, missing = 0, []
+    for c in conversations:
+        record = chat_api.session_store.get(f"same-{c['id']}")
+        logged = len(record.messages) if record else 0
+        lost += 2 * len(c["turns"]) - logged
+        if record is None or not (record.user_name and record.user_email and record.user_platform
+                                  and record.lead_captured):
+            missing.append(c["id"])
+    turns = sum(len(c["turns"]) for c in conversations)
+    print(f"same-session   {len(conversations)} sessions x {turns // max(len(conversations), 1)} turns at once: "
+          f"{seconds:.2f}s, {lost} lost messages, {len(missing)} sessions missing lead fields")
+    if lost:
+        problems.append(f"same-session: {lost} messages lost from the session logs")
+    if missing:
+        problems.append(f"same-session: lead incomplete for {len(missing)} sessions, e.g. {missing[0]}")
+    return problems
+
+
+async def duplicates(client: httpx.AsyncClient, llm: StubChatModel, sessions: int, copies: int) -> list:
+    problems = []
+    # Distinct per session, so only deduplication (not a cache) can save LLM calls
+    message = "What does the pro plan cost for order {}?"
+
+    # LLM calls for one turn of such a message, with nothing to deduplicate
+    calls = llm.calls
+    await post(client, "dup-probe", message.format("probe"))
+    per_turn = llm.calls - calls
+
+    calls = llm.calls
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(
+        post(client, f"dup-{s}", message.format(s)) for s in range(sessions) for _ in range(copies)
+    ))
+    seconds = time.perf_counter() - start
+    problems += failed_responses(responses)[:3]
+    spent = llm.calls - calls
+
+    extra = 0
+    for s in range(sessions):
+        record = chat_api.session_store.get(f"dup-{s}")
+        extra += (len(record.messages) if record else 0) - 2
+        answers = {r.json().get("response") for r in responses[s * copies:(s + 1) * copies] if r.status_code == 200}
+        if len(answers) > 1:
+            problems.append(f"duplicates: dup-{s} got {len(answers)} different answers")
+
+    # A client retry after the first request completed: same Idempotency-Key, replayed
+    headers = {"Idempotency-Key": "retry-1"}
+    first = await post(client, "dup-retry", message.format("retry"), headers=headers)
+    calls = llm.calls
+    retry = await post(client, "dup-retry", message.format("retry"), headers=headers)
+    record = chat_api.session_store.get("dup-retry")
+    replayed = retry.headers.get("idempotent-replayed") == "true" and llm.calls == calls
+    if retry.status_code != 200 or retry.json().get("response") != first.json().get("response"):
+        problems.append(f"duplicates: keyed retry answered HTTP {retry.status_code} {retry.text[:120]}")
+    if not replayed or record is None or len(record.messages) != 2:
+        problems.append("duplicates: keyed retry ran the turn again")
+
+    # The same short reply again once the first has been answered: a new turn, not a replay
+    await post(client, "dup-repeat", "yes")
+    calls = llm.calls
+    repeat = await post(client, "dup-repeat", "yes")
+    record = chat_api.session_store.get("dup-repeat")
+    if repeat.headers.get("idempotent-replayed") == "true" or llm.calls == calls:
+        problems.append("duplicates: a repeated message after the first finished was replayed")
+    if record is None or len(record.messages) != 4:
+        problems.append(f"duplicates: repeated message left {len(record.messages) if record else 0} logged messages, expected 4")
+
+    problems += await cancelled_leader()
+
+    print(f"duplicates     {sessions} sessions x {copies} copies at once: {seconds:.2f}s, "
+          f"{spent} LLM calls for {sessions} turns ({per_turn}/turn), {extra} extra logged turns, "
+          f"keyed retry {'replayed' if replayed else 'RE-RUN'}")
+    if spent > per_turn * sessions:
+        problems.append(f"duplicates: {spent} LLM calls, expected {per_turn * sessions}")
+    if extra:
+        problems.append(f"duplicates: {extra // 2} duplicate turns logged")
+    return problems
+
+
+async def cancelled_leader() -> list:
+    # First copy cancelled mid-turn (client disconnected): the waiting copy must run the turn itself
+    coordinator = chat_api.coordinator
+    started, runs = asyncio.Event(), []
+
+    async def turn():
+        runs.append(1)
+        if len(runs) == 1:
+            started.set()
+            await asyncio.sleep(60)
+        return {"response": "ok"}
+
+    leader = asyncio.ensure_future(coordinator.run("dup-cancel", "hello", turn))
+    await started.wait()
+    follower = asyncio.ensure_future(coordinator.run("dup-cancel", "hello", turn))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    try:
+        result, _ = await asyncio.wait_for(follower, 5)
+    except BaseException as e:
+        return [f"duplicates: copy of a cancelled request failed with {e!r}"]
+    if result != {"response": "ok"} or len(runs) != 2:
+        return [f"duplicates: copy of a cancelled request got {result} after {len(runs)} runs"]
+    return []
+
+
+async def cross_session(client: httpx.AsyncClient, sessions: int, min_speedup: float) -> list:
+    message = "How many videos per month on the basic plan?"
+    start = time.perf_counter()
+    for s in range(min(sessions, 10)):
+        await post(client, f"serial-{s}", message)
+    serial = (time.perf_counter() - start) / min(sessions, 10)
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(post(client, f"cross-{s}", message) for s in range(sessions)))
+    seconds = time.perf_counter() - start
+    speedup = serial * sessions / seconds
+    print(f"cross-session  {sessions} sessions at once: {seconds:.2f}s = {sessions / seconds:.0f} turns/s, "
+          f"{speedup:.1f}x over back to back ({serial * 1000:.0f}ms/turn), "
+          f"coordinator {json.dumps(chat_api.coordinator.stats())}")
+    problems = failed_responses(responses)[:3]
+    if speedup < min_speedup:
+        problems.append(f"cross-session: {speedup:.1f}x speedup, sessions are being serialized")
+    return problems
+
+
+def fake_redis_client():
+    # None when fakeredis (or its Lua support, needed by the lease scripts) is not installed
+    try:
+        import fakeredis
+        import lupa    # noqa: F401
+    except ImportError:
+        return None
+    return fakeredis.FakeRedis()
+
+
+def make_store(backend: str, ttl_seconds: float = 86400):
+    if backend == "sqlite":
+        return SQLiteSessionStore(tempfile.mktemp(prefix="sessions-", suffix=".db", dir=_TMP), ttl_seconds=ttl_seconds)
+    if backend == "redis":
+        client = fake_redis_client()
+        return RedisSessionStore(client=client, ttl_seconds=ttl_seconds) if client is not None else None
+    return MemorySessionStore(ttl_seconds=ttl_seconds)
+
+
+def check_store(backend: str) -> list:
+    store = make_store(backend)
+    if store is None:
+        print(f"stores         {backend}: skipped, pip install \"fakeredis[lua]\" to check it")
+        return []
+    problems = []
+
+    def expect(ok: bool, what: str) -> None:
+        if not ok:
+            problems.append(f"stores: {backend}: {what}")
+
+    messages = (compact_message("human", "hi"), compact_message("ai", "hello, how can I help?"))
+    record = SessionRecord(intent=None, user_name="Ana", user_email="ana@example.com", user_platform="YouTube",
+                           lead_captured=True, turns=3, messages=messages)
+    store.set("abc", record)
+    expect(store.get("abc") == record, "record does not round-trip")
+    for message in messages:
+        store.append_log("abc", [message])
+    expect(store.get_log("abc") == list(messages), "log does not round-trip in order")
+
+    # Client-chosen ids shaped like other key kinds are just other sessions
+    other = SessionRecord(user_name="Bo", messages=(compact_message("human", "yo"),))
+    store.set("abc:log", other)
+    store.append_log("abc:log", list(other.messages))
+    expect(store.get("abc") == record and store.get("abc:log") == other, "\"abc:log\" reached session abc")
+    expect(store.get_log("abc") == list(messages), "\"abc:log\" changed session abc's log")
+    expect(store.size() == 2, f"size {store.size()} for 2 sessions")
+
+    # Leases: compare-and-set on the owner, expiry
+    expect(store.try_lock("abc", "w1", 30), "free lease not acquired")
+    expect(not store.try_lock("abc", "w2", 30), "held lease taken by another owner")
+    expect(store.try_lock("abc", "w1", 30), "holder cannot renew its lease")
+    store.unlock("abc", "w2")
+    expect(not store.try_lock("abc", "w2", 30), "unlock by a non-owner released the lease")
+    store.unlock("abc", "w1")
+    expect(store.try_lock("abc", "w2", 0.2), "released lease not acquired")
+    time.sleep(0.3)
+    expect(store.try_lock("abc", "w3", 30), "expired lease not acquired")
+
+    # Stored turn results expire on their own TTL
+    store.set_result("key", b'{"response": "ok"}', 0.2)
+    expect(store.get_result("key") == b'{"response": "ok"}', "result does not round-trip")
+    time.sleep(0.3)
+    expect(store.get_result("key") is None, "result outlived its TTL")
+
+    store.delete("abc")
+    expect(store.get("abc") is None and store.get_log("abc") == [], "delete left the session or its log")
+    expect(store.size() == 1, f"size {store.size()} after deleting 1 of 2 sessions")
+
+    # Sessions expire after the store's TTL
+    short = make_store(backend, ttl_seconds=0.2)
+    short.set("ttl", record)
+    expect(short.get("ttl") == record, "record does not round-trip with a short TTL")
+    time.sleep(0.3)
+    expect(short.get("ttl") is None, "session outlived the store TTL")
+    expect(short.size() == 0, f"size {short.size()} after the only session expired")
+
+    print(f"stores         {backend}: {'OK' if not problems else f'{len(problems)} problems'}")
+    return problems
+
+
+async def worker(index: int, sessions: int, turns: int) -> list:
+    transport = httpx.ASGITransport(app=chat_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        responses = await asyncio.gather(*(
+            post(client, f"shared-{s}", f"Question {t} from worker {index}: what does the pro plan include?")
+            for s in range(sessions) for t in range(turns)
+        ))
+    return failed_responses(responses)
+
+
+def run_workers(args) -> list:
+    from session import SQLiteSessionStore
+
+    env = {**os.environ, "SESSION_STORE": "sqlite", "SESSION_DB_PATH": os.path.join(_TMP, "sessions.db")}
+    start = time.perf_counter()
+    children = [
+        subprocess.Popen([sys.executable, __file__, "--child", str(index), "--sessions", str(args.sessions),
+                          "--worker-turns", str(args.worker_turns), "--latency", str(args.latency)]
+                         + (["--no-lock"] if args.no_lock else []),
+                         env=env, stdout=subprocess.PIPE, text=True)
+        for index in range(args.workers)
+    ]
+    problems = []
+    for child in children:
+        out, _ = child.communicate()
+        problems += json.loads(out.strip().splitlines()[-1]) if child.returncode == 0 else [f"worker exited {child.returncode}"]
+    seconds = time.perf_counter() - start
+
+    store = SQLiteSessionStore(env["SESSION_DB_PATH"])
+    expected = 2 * args.workers * args.worker_turns
+    lost = sum(expected - len(record.messages) if record else expected
+               for record in (store.get(f"shared-{s}") for s in range(args.sessions)))
+    print(f"workers        {args.workers} processes x {args.sessions} sessions x {args.worker_turns} turns on one "
+          f"SQLite store: {seconds:.2f}s, {lost} lost messages")
+    if lost:
+        problems.append(f"workers: {lost} messages lost across processes")
+    return problems[:3] if len(problems) > 3 else problems
+
+
+async def run(args, llm: StubChatModel) -> list:
+    transport = httpx.ASGITransport(app=chat_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        problems = await same_session(client, args.sessions)
+        problems += await duplicates(client, llm, args.sessions, args.duplicates)
+        problems += await cross_session(client, args.sessions, args.min_speedup)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--duplicates", type=int, default=4, help="copies of each double-sent message")
+    parser.add_argument("--workers", type=int, default=0, help="processes sharing a SQLite session store")
+    parser.add_argument("--worker-turns", type=int, default=3, help="turns per session from each worker")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM latency per call, seconds")
+    parser.add_argument("--min-speedup", type=float, default=5.0)
+    parser.add_argument("--no-lock", action="store_true", help="disable the session coordinator (expect FAIL)")
+    parser.add_argument("--store", choices=["memory", "sqlite", "redis"], default="memory",
+                        help="session store for the API phases (redis: fakeredis)")
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    llm = StubChatModel(latency=args.latency, jitter=0.3)
+    install_fake_retriever()
+    chat_api.agent = create_agent_graph(llm=llm)
+
+    if args.child is not None:
+        print(json.dumps(asyncio.run(worker(args.child, args.sessions, args.worker_turns))))
+        return
+
+    if args.store != "memory":
+        store = make_store(args.store)
+        if store is None:
+            sys.exit("--store redis needs fakeredis with Lua support: pip install \"fakeredis[lua]\"")
+        chat_api.session_store = chat_api.coordinator.store = store
+
+    print(f"session lock {'off' if args.no_lock else 'on'}, {args.store} store, "
+          f"stub LLM {args.latency * 1000:.0f}ms/call")
+    problems = asyncio.run(run(args, llm))
+    for backend in ("memory", "sqlite", "redis"):
+        problems += check_store(backend)
+    if args.workers:
+        problems += run_workers(args)
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+    print("session consistency OK")
+
+
+if __name__ == "__main__":
+    main()
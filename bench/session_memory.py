@@ -0,0 +1,145 @@
+"""Bytes per live session in the in-memory session store.
+
+Fills a store with N sessions built from the benchmark corpus (last 4
+messages of each conversation, lead fields for lead funnels) and reports
+traced Python allocations per session for three layouts:
+
+  langchain  the LangGraph result dict as it used to be kept: HumanMessage/
+             AIMessage objects plus the last retrieval context string
+  blob       the previous MemorySessionStore entry: (expires_at, JSON blob) in
+             an OrderedDict, decoded into LangChain messages on every turn
+  record     MemorySessionStore holding SessionRecord objects (__slots__,
+             intent enum, role-code + UTF-8 messages)
+
+Also times one load + save round trip per layout:
+
+    python bench/session_memory.py --sessions 1000 10000 100000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+sys.path.append(ROOT)
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from bench.corpus import generate_corpus
+from session import MemorySessionStore, SessionRecord, compact_message, deserialize_record, serialize_record
+from session.record import to_langchain_messages
+
+REPLIES = [
+    "Hello! Welcome to AutoStream. What can I help you with?",
+    "The Pro plan is $79/month: unlimited videos, 4K resolution and AI captions.",
+    "Basic is $29/month for 10 videos at 720p. Refunds are not available after 7 days.",
+    "Awesome, let's get you set up! What's your name?",
+    "Nice to meet you! Which email should we use for your account?",
+    "Which platform do you create content for?"
+]
+CONTEXT = "Pro Plan: $79/month, unlimited videos, 4K resolution, AI captions, 24/7 support. " * 6
+
+
+def session_states(count: int) -> list:
+    states = []
+    for i, conversation in enumerate(generate_corpus(count, seed=1)):
+        messages = []
+        for j, text in enumerate(conversation["turns"]):
+            messages += [("human", text), ("ai", REPLIES[(i + j) % len(REPLIES)])]
+        lead = conversation["expect_lead"]
+        states.append({
+            "messages": messages[-4:],
+            "intent": "high_intent_lead" if lead else conversation["kind"],
+            "user_name": "Alex" if lead else None,
+            "user_email": f"alex.{i}@example.com" if lead else None,
+            "user_platform": "YouTube" if lead else None,
+            "platform_hint": "YouTube" if lead else None,
+            "lead_captured": lead
+        })
+    return states
+
+
+def build_langchain(states: list) -> dict:
+    sessions = {}
+    for i, state in enumerate(states):
+        messages = [(HumanMessage if role == "human" else AIMessage)(content=text) for role, text in state["messages"]]
+        sessions[f"session-{i}"] = {**state, "messages": messages, "context": f"{CONTEXT}[{i}]", "cached_response": None}
+    return sessions
+
+
+def _record(state: dict) -> SessionRecord:
+    return SessionRecord.from_state(state, [compact_message(role, text) for role, text in state["messages"]])
+
+
+def build_blob(states: list) -> OrderedDict:
+    expires_at = time.monotonic() + 86400
+    return OrderedDict((f"session-{i}", (expires_at + i, serialize_record(_record(state))))
+                       for i, state in enumerate(states))
+
+
+def build_record(states: list) -> MemorySessionStore:
+    store = MemorySessionStore(max_sessions=len(states) + 1, max_bytes=1 << 40)
+    for i, state in enumerate(states):
+        store.set(f"session-{i}", _record(state))
+    return store
+
+
+def measure(build, states: list):
+    # Input states are built before tracing starts, so only what the store retains is counted
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    sessions = build(states)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sessions, current, seconds
+
+
+def round_trip_us(layout: str, sessions, count: int, repeats: int = 2000) -> float:
+    keys = [f"session-{i % count}" for i in range(repeats)]
+    start = time.perf_counter()
+    for key in keys:
+        if layout == "langchain":
+            state = sessions[key]
+            sessions[key] = {**state, "messages": list(state["messages"])}
+        elif layout == "blob":
+            expires_at, blob = sessions[key]
+            record = deserialize_record(blob)
+            to_langchain_messages(record.messages)
+            sessions[key] = (expires_at, serialize_record(record))
+        else:
+            record = sessions.get(key)
+            sessions.set(key, SessionRecord.from_state(record.to_state()))
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--layouts", nargs="+", default=["langchain", "blob", "record"],
+                        choices=["langchain", "blob", "record"])
+    args = parser.parse_args()
+
+    builders = {"langchain": build_langchain, "blob": build_blob, "record": build_record}
+    print(f"{'layout':<10} {'sessions':>9} {'total MiB':>10} {'bytes/session':>14} {'build s':>8} "
+          f"{'load+save us':>13}")
+    for count in args.sessions:
+        states = session_states(count)
+        for layout in args.layouts:
+            sessions, traced, seconds = measure(builders[layout], states)
+            rtt = round_trip_us(layout, sessions, count)
+            extra = f"  (store accounts {sessions.stats()['bytes'] / count:.0f} B/session)" if layout == "record" else ""
+            print(f"{layout:<10} {count:>9} {traced / 1048576:>10.1f} {traced / count:>14.0f} {seconds:>8.2f} "
+                  f"{rtt:>13.1f}{extra}")
+            del sessions
+        del states
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Deterministic stand-in for ChatGoogleGenerativeAI used by the benchmarks.
+
+Replies are chosen from the prompt shape used by the agent nodes, so the
+LangGraph pipeline can be exercised end to end without a Gemini key.
+Latency (with optional jitter derived from the prompt, so runs repeat
+exactly), scripted reply overrides and usage metadata are configurable:
+
+    StubChatModel(latency=0.2, jitter=0.3, replies={"Extract platform": "NONE"})
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import re
+import sys
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+PLATFORMS = ["youtube", "instagram", "tiktok", "facebook", "twitter", "linkedin", "twitch"]
+_NAME_RE = re.compile(r"(?:name is|i am|i'm|call me)\s+([A-Za-z]+)", re.IGNORECASE)
+_BARE_NAME_RE = re.compile(r"^['\"]?([A-Z][a-z]+)['\"]?$")
+
+
+def _stub_name(text: str) -> Optional[str]:
+    # "My name is Alex" or a bare "Alex" answering the name question
+    match = _NAME_RE.search(text) or _BARE_NAME_RE.match(text.strip())
+    if match and match.group(1).lower() not in ("hi", "hello", "hey", "thanks") + tuple(PLATFORMS):
+        return match.group(1)
+    return None
+
+
+def _stub_platform(text: str) -> Optional[str]:
+    lowered = text.lower()
+    return next((p.capitalize() for p in PLATFORMS if p in lowered), None)
+
+
+def _stub_intent(text: str) -> str:
+    text = text.lower()
+    if re.search(r"\b(hi|hello|hey)\b", text):
+        return "greeting"
+    if re.search(r"set me up|account|name is|\bi'm\b|\bi am\b|@", text):
+        return "high_intent_lead"
+    return "inquiry"
+
+
+def scripted_reply(messages: List[BaseMessage]) -> str:
+    prompt = "\n".join(str(m.content) for m in messages)
+
+    if prompt.startswith("Classify as ONE word"):
+        return _stub_intent(prompt.rsplit("\n", 1)[-1])
+    if prompt.startswith("Extract JSON"):
+        text = prompt.rsplit("\n", 1)[-1]
+        name = _stub_name(text)
+        email = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", text)
+        return json.dumps({
+            "intent": "high_intent_lead" if name else _stub_intent(text),
+            "name": name,
+            "email": email.group(0) if email else None,
+            "platform": _stub_platform(text)
+        })
+    if prompt.startswith("Extract name from"):
+        quoted = re.search(r'Extract name from: "(.*)"', prompt)
+        return _stub_name(quoted.group(1) if quoted else prompt) or "NONE"
+    if prompt.startswith("Extract platform from"):
+        quoted = re.search(r'Extract platform from: "(.*)"', prompt)
+        return _stub_platform(quoted.group(1) if quoted else "") or "NONE"
+    return "Thanks for reaching out to AutoStream! How can I help you today?"
+
+
+class StubChatModel(BaseChatModel):
+    latency: float = 0.05
+    # Fractional spread around latency, e.g. 0.3 -> 0.7x..1.3x, seeded by the prompt text
+    jitter: float = 0.0
+    # Prompt substring -> reply, checked before the built-in scripted replies
+    replies: Dict[str, str] = {}
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(m.content) for m in messages)
+        for marker, reply in self.replies.items():
+            if marker in prompt:
+                return reply
+        return scripted_reply(messages)
+
+    def _delay(self, messages: List[BaseMessage]) -> float:
+        if not self.jitter:
+            return self.latency
+        seed = zlib.crc32("\n".join(str(m.content) for m in messages).encode("utf-8"))
+        return self.latency * random.Random(seed).uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        self.calls += 1
+        reply = self._reply(messages)
+        # Rough 4-chars-per-token estimate, so token counters have something to count
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4 + 1
+        completion_tokens = len(reply) // 4 + 1
+        message = AIMessage(content=reply, usage_metadata={
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._delay(messages))
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._delay(messages))
+        return self._result(messages)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.calls += 1
+        words = self._reply(messages).split(" ")
+        delay = self._delay(messages)
+        for i, word in enumerate(words):
+            time.sleep(delay / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        words = self._reply(messages).split(" ")
+        delay = self._delay(messages)
+        for i, word in enumerate(words):
+            await asyncio.sleep(delay / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def install_fake_retriever(size: int = 64):
+    """Swap the tenant registry for one backed by hash embeddings (no model download).
+
+    Returns the default tenant's retriever. TENANTS_DIR is honoured, so extra tenants
+    load from there with the same embeddings.
+    """
+    import tempfile
+
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    import rag.tenants
+    rag.tenants._registry_instance = rag.tenants.TenantRegistry(
+        tenants_dir=os.getenv("TENANTS_DIR") or None, index_dir=tempfile.mkdtemp(),
+        embeddings=DeterministicFakeEmbedding(size=size)
+    )
+    return rag.tenants._registry_instance.get().retriever
+
+
+def require_embedding_model(backend: str = None, load: bool = True):    #type:ignore
+    """Exit with a clear message when the real embedding model is not available.
+
+    For the benchmarks that measure the model itself and so cannot run on
+    install_fake_retriever(). load=True loads the model (shared with every retriever
+    in this process) and returns it; load=False only checks the packages and the
+    ONNX export, for benchmarks that load the model in child interpreters.
+    """
+    from rag.embedders import ONNX_MODEL_FILE, default_onnx_dir, embedding_backend, shared_embedder
+    from rag.retriever import DEFAULT_EMBEDDING_MODEL
+
+    script = os.path.relpath(sys.argv[0])
+    backend = backend or embedding_backend()
+    modules = ("onnxruntime", "tokenizers") if backend == "onnx" else ("sentence_transformers",)
+    missing = [module for module in modules if importlib.util.find_spec(module) is None]
+    if missing:
+        packages = " ".join(module.replace("_", "-") for module in missing)
+        sys.exit(f"{script} measures the real embedding model ({backend} backend), which needs "
+                 f"{', '.join(missing)} (pip install {packages}). The other benchmarks use hash embeddings and run without it.")
+    if backend == "onnx" and not (default_onnx_dir() / ONNX_MODEL_FILE).exists():
+        sys.exit(f"{script}: no ONNX embedding model in {default_onnx_dir()}; export one with "
+                 f"scripts/export_onnx.py")
+    if not load:
+        return None
+    try:
+        return shared_embedder(backend, DEFAULT_EMBEDDING_MODEL)
+    except Exception as e:
+        sys.exit(f"{script}: could not load {DEFAULT_EMBEDDING_MODEL} ({backend} backend): {e}. "
+                 f"The first run downloads it, so it needs network once.")
@@ -0,0 +1,217 @@
+"""Multi-tenant retrieval: 100 brands in one process.
+
+Writes --tenants knowledge bases (the bundled one, rebranded, with a unique
+promo code per brand and --scale copies of its content) and serves them
+through the tenant registry: one shared embedding model and query-embedding
+cache, a lazily loaded index and its own response and context caches per
+tenant, LRU eviction under --budget-mb.
+
+  build      first touch of every tenant: split + embed + write its index
+  cold load  first touch in a fresh registry: memory-map the prebuilt index
+  warm       retrieval node latency over skewed (Zipf) traffic across tenants
+  budget     the same traffic with a budget that holds only some tenants
+
+Reports RSS and the registry's estimate per tenant for each phase, and
+checks isolation: every tenant's context carries its own promo code and
+never another's, and the same session_id under two tenants (X-Tenant-ID
+on /api/chat) keeps separate conversations. Exits non-zero on a leak:
+
+    python bench/tenants.py --tenants 100 --requests 20000 --budget-mb 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+_TMP = tempfile.mkdtemp(prefix="tenants-")
+os.environ.setdefault("TENANTS_DIR", os.path.join(_TMP, "tenants"))
+os.environ.setdefault("LOCAL_INTENT_ENABLED", "false")
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+os.environ.setdefault("LEAD_SINK", "file")
+os.environ.setdefault("LEAD_SINK_PATH", os.path.join(_TMP, "leads.jsonl"))
+os.environ.setdefault("LEAD_QUEUE_PATH", os.path.join(_TMP, "leads.db"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from agent.nodes import rag_retrieval_node
+from rag.tenants import TenantRegistry
+from session import compact_message
+
+QUERIES = ["pro plan price", "refund policy", "4K resolution", "basic plan videos per month",
+           "AI captions", "support hours", "exclusive promo code", "cancel subscription"]
+
+
+def promo(i: int) -> str:
+    return f"PROMO{i:03d}X"
+
+
+def tenant_kb(base: dict, i: int, scale: int) -> dict:
+    brand = f"Brand{i:03d}"
+    kb = json.loads(json.dumps(base).replace("AutoStream", brand))
+    for copy in range(1, scale):
+        kb[f"region_{copy}"] = json.loads(json.dumps(base).replace("AutoStream", brand))
+    kb["promotions"] = {"code": f"{brand} exclusive promo code {promo(i)} for 20% off annual plans"}
+    return kb
+
+
+def write_tenants(count: int, scale: int) -> list:
+    with open(os.path.join(ROOT, "src", "rag", "knowledge_base.json")) as f:
+        base = json.load(f)
+    ids = [f"brand-{i:03d}" for i in range(count)]
+    for i, tenant_id in enumerate(ids):
+        path = os.path.join(os.environ["TENANTS_DIR"], tenant_id)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "knowledge_base.json"), "w") as f:
+            json.dump(tenant_kb(base, i, scale), f)
+    return ids
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def zipf_traffic(ids: list, requests: int, seed: int) -> list:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(ids))]
+    order = ids[:]
+    rng.shuffle(order)
+    return [(tenant, rng.choice(QUERIES)) for tenant in rng.choices(order, weights, k=requests)]
+
+
+def state(tenant_id: str, query: str) -> dict:
+    return {"messages": [compact_message("human", query)], "tenant_id": tenant_id}
+
+
+def serve(registry: TenantRegistry, traffic: list) -> dict:
+    import rag.tenants
+    rag.tenants._registry_instance = registry
+    warm, cold, leaks = [], [], []
+    for tenant_id, query in traffic:
+        was_loaded = registry.loaded(tenant_id) is not None
+        start = time.perf_counter()
+        context = rag_retrieval_node(state(tenant_id, query))["context"]
+        (warm if was_loaded else cold).append(time.perf_counter() - start)
+        if query == "exclusive promo code":
+            own = promo(int(tenant_id.split("-")[1]))
+            if own not in context or context.count("PROMO") != context.count(own):
+                leaks.append(f"{tenant_id}: {context!r}")
+    return {"warm": warm, "cold": cold, "leaks": leaks}
+
+
+def report(label: str, registry: TenantRegistry, result: dict, baseline: float, seconds: float) -> None:
+    stats = registry.stats()
+    warm, cold = result["warm"], result["cold"]
+    print(f"{label:<10} {seconds:>7.2f}s  loaded={stats['loaded']:>3} loads={stats['loads']:>4} "
+          f"evictions={stats['evictions']:>4}  est {stats['bytes'] / 1048576:6.1f} MiB "
+          f"({stats['bytes'] / max(stats['loaded'], 1) / 1024:5.0f} KiB/tenant)  "
+          f"rss +{rss_mb() - baseline:6.1f} MiB")
+    if warm:
+        print(f"{'':<10} warm p50={percentile(warm, 0.5) * 1000:6.2f}ms p99={percentile(warm, 0.99) * 1000:6.2f}ms "
+              f"(n={len(warm)})", end="")
+    if cold:
+        print(f"  cold p50={percentile(cold, 0.5) * 1000:7.2f}ms p99={percentile(cold, 0.99) * 1000:7.2f}ms "
+              f"(n={len(cold)})", end="")
+    print()
+
+
+async def check_sessions(ids: list) -> list:
+    # Same session_id under two tenants must not share a conversation
+    import httpx
+
+    from agent.graph import create_agent_graph
+    from api import chat as chat_api
+    from bench.stub_llm import StubChatModel
+
+    chat_api.agent = create_agent_graph(llm=StubChatModel(latency=0))
+    problems = []
+    transport = httpx.ASGITransport(app=chat_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        first, second = ids[0], ids[1]
+        for message in ["I want to sign up for the pro plan", "My name is Jordan"]:
+            response = await client.post("/api/chat", json={"message": message, "session_id": "shared"},
+                                         headers={"X-Tenant-ID": first})
+            if response.status_code != 200:
+                problems.append(f"{first}: HTTP {response.status_code} {response.text}")
+        response = await client.post("/api/chat", json={"message": "hi", "session_id": "shared", "tenant_id": second})
+        record = chat_api.session_store.get(f"{second}:shared")
+        if response.status_code != 200 or record is None or record.user_name is not None or len(record.messages) != 2:
+            problems.append(f"{second} saw {first}'s session: {record}")
+        response = await client.post("/api/chat", json={"message": "hi"}, headers={"X-Tenant-ID": "no-such-brand"})
+        if response.status_code != 404:
+            problems.append(f"unknown tenant answered HTTP {response.status_code}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", type=int, default=100)
+    parser.add_argument("--scale", type=int, default=1, help="copies of the bundled KB per tenant")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--budget-mb", type=float, default=8, help="budget for the eviction phase")
+    parser.add_argument("--model", choices=["hash", "minilm"], default="hash")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ids = write_tenants(args.tenants, args.scale)
+    traffic = zipf_traffic(ids, args.requests, args.seed)
+    index_dir = os.path.join(_TMP, "index")
+    if args.model == "minilm":
+        from rag.embedders import shared_embedder
+        embeddings = shared_embedder("torch", "sentence-transformers/all-MiniLM-L6-v2")
+    else:
+        embeddings = DeterministicFakeEmbedding(size=384)
+    baseline = rss_mb()
+    print(f"{args.tenants} tenants x {args.scale} KB copies, {args.requests} requests (Zipf), "
+          f"{args.model} embeddings, baseline rss {baseline:.0f} MiB (one shared model)")
+
+    unlimited = 1 << 40
+    failed = []
+    phases = [
+        ("build", unlimited, [(tenant_id, "exclusive promo code") for tenant_id in ids]),
+        ("cold load", unlimited, [(tenant_id, "exclusive promo code") for tenant_id in ids]),
+        ("warm", None, traffic),
+        ("budget", int(args.budget_mb * (1 << 20)), traffic)
+    ]
+    registry = None
+    for label, budget, phase_traffic in phases:
+        if budget is not None:
+            # A fresh registry; "build" leaves prebuilt indexes behind for the later phases
+            registry = TenantRegistry(tenants_dir=os.environ["TENANTS_DIR"], index_dir=index_dir,
+                                      embeddings=embeddings, memory_budget_bytes=budget)
+        start = time.perf_counter()
+        result = serve(registry, phase_traffic)
+        report(label, registry, result, baseline, time.perf_counter() - start)
+        failed += result["leaks"][:3]
+
+    failed += asyncio.run(check_sessions(ids))
+    if failed:
+        for problem in failed:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+    print("tenant isolation OK (contexts and sessions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 // Configuration
 const API_URL = 'http://localhost:8000/api/chat';
+const STREAM_URL = API_URL + '/stream';
 let sessionId = generateSessionId();
 
 // DOM Elements
@@ -58,11 +59,12 @@ async function sendMessage() {
     const typingId = addTypingIndicator();
 
     try {
-        // Send to API
-        const response = await fetch(API_URL, {
+        // Send to the streaming endpoint; tokens are rendered as they arrive
+        const response = await fetch(STREAM_URL, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
             },
             body: JSON.stringify({
                 message: message,
@@ -74,13 +76,28 @@ async function sendMessage() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
-
-        // Remove typing indicator
-        removeTypingIndicator(typingId);
-
-        // Add AI response with markdown rendering
-        addMessage(data.response, 'ai');
+        let replyText = '';
+        let replyContent = null;
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'token') {
+                if (!replyContent) {
+                    // First token replaces the typing indicator
+                    removeTypingIndicator(typingId);
+                    replyContent = addMessage('', 'ai');
+                }
+                replyText += data.text;
+                renderMarkdown(replyContent, replyText);
+            } else if (event === 'done') {
+                removeTypingIndicator(typingId);
+                if (!replyContent) {
+                    replyContent = addMessage('', 'ai');
+                }
+                renderMarkdown(replyContent, data.response);
+            } else if (event === 'error') {
+                throw new Error(data.detail);
+            }
+        });
 
     } catch (error) {
         console.error('Error:', error);
@@ -94,6 +111,45 @@ async function sendMessage() {
     }
 }
 
+// Read a Server-Sent Events body and dispatch each event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            }
+            if (data) {
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+}
+
+// Render markdown into an existing AI message bubble
+function renderMarkdown(content, text) {
+    content.innerHTML = marked.parse(text);
+    scrollToBottom();
+}
+
 // Add message to chat
 function addMessage(text, sender, isError = false) {
     const messageDiv = document.createElement('div');
@@ -123,6 +179,8 @@ function addMessage(text, sender, isError = false) {
 
     chatContainer.appendChild(messageDiv);
     scrollToBottom();
+
+    return content;
 }
 
 // Add typing indicator
@@ -0,0 +1,38 @@
+"""Offline build step for the knowledge base FAISS index.
+
+Run before packaging a deployment so cold starts load the prebuilt artifact
+instead of re-embedding knowledge_base.json:
+
+    python scripts/build_index.py [--kb path/to/knowledge_base.json] [--out dir]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag.retriever import KnowledgeBaseRetriever
+from rag.embedders import EMBEDDING_BACKENDS
+from rag.index_store import save_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the prebuilt knowledge base index")
+    parser.add_argument("--kb", default=None, help="Path to knowledge_base.json")
+    parser.add_argument("--out", default=None, help="Index output directory (default: KB_INDEX_DIR or src/rag/index)")
+    parser.add_argument("--backend", default=None, choices=EMBEDDING_BACKENDS,
+                        help="Embedding backend (default: EMBEDDING_BACKEND or torch); must match the deployment's")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    retriever = KnowledgeBaseRetriever(args.kb, index_dir=args.out, use_prebuilt=False, backend=args.backend)
+    save_index(retriever.index_dir, retriever.kb_hash, retriever.embedder_id, retriever.index, retriever.chunks)
+    elapsed = time.perf_counter() - start
+
+    print(f"Indexed {len(retriever.chunks)} chunks into {retriever.index_dir} in {elapsed:.2f}s")
+    print(f"kb_hash={retriever.kb_hash} embedder={retriever.embedder_id}")
+
+
+if __name__ == "__main__":
+    main()
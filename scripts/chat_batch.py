@@ -0,0 +1,79 @@
+"""Process a JSONL export of social comments/DMs through the agent in bulk.
+
+Each input line is {"session_id": ..., "message": ..., "tenant_id": ..., "id": ...}
+(tenant_id and id are optional; id is echoed back). Sessions run concurrently,
+turns within a session keep their input order, and one JSON result per line
+is written as soon as it completes. Runs in-process with the same session store and lead sink
+settings as the API; to use a running server instead, POST the file to
+/api/chat/batch.
+
+    python scripts/chat_batch.py comments.jsonl --out results.jsonl --concurrency 32
+    cat dms.jsonl | python scripts/chat_batch.py - > results.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+sys.path.append(ROOT)
+# Results may go to stdout, so the JSON logs go to stderr
+os.environ.setdefault("LOG_STREAM", "stderr")
+
+from api import chat as chat_api
+from utils.batch import read_jsonl, run_batch
+
+
+async def read_chunks(f, size: int = 1 << 16):
+    while True:
+        chunk = await asyncio.to_thread(f.read, size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL batch of conversation turns through the agent")
+    parser.add_argument("input", help="JSONL file, or - for stdin")
+    parser.add_argument("--out", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "16")))
+    parser.add_argument("--tenant", default=None, help="tenant for lines without a tenant_id (TENANTS_DIR)")
+    args = parser.parse_args()
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    sink = sys.stdout if args.out == "-" else open(args.out, "w")
+    chat_api.get_agent_instance()
+
+    start = time.perf_counter()
+    count = errors = 0
+    leads = set()
+    try:
+        outputs = run_batch(read_jsonl(read_chunks(source)), chat_api.batch_turn,
+                            concurrency=args.concurrency, tenant_id=args.tenant)
+        async for output in outputs:
+            sink.write(json.dumps(output) + "\n")
+            count += 1
+            errors += "error" in output
+            if output.get("lead_captured"):
+                leads.add(output["session_id"])
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+        lead_sink = chat_api.loaded_lead_sink()
+        if lead_sink is not None:
+            lead_sink.stop()
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {count} turns in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f}/s), "
+          f"{errors} errors, {len(leads)} sessions with a captured lead", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Export all-MiniLM-L6-v2 to an int8-quantized ONNX model for EMBEDDING_BACKEND=onnx.
+
+Build-time only: needs torch, transformers and onnxruntime. The deployment
+then only needs onnxruntime and tokenizers:
+
+    python scripts/export_onnx.py [--out src/rag/onnx] [--no-quantize]
+
+Writes model.onnx and tokenizer.json, then checks the exported embeddings
+against the sentence-transformers model.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import numpy as np
+
+from rag.embedders import ONNX_MODEL_FILE, OnnxEmbeddings, default_onnx_dir
+from rag.retriever import DEFAULT_EMBEDDING_MODEL
+
+CHECK_TEXTS = [
+    "How much is the Pro plan?",
+    "Pro Plan: $79/month, unlimited videos, 4K resolution, AI captions",
+    "Do you offer refunds after 7 days?",
+    "I want to sign up for my YouTube channel"
+]
+
+
+def export(model_name: str, path: Path) -> None:
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in names), str(path), input_names=names,
+                          output_names=["last_hidden_state"], dynamic_axes=axes, opset_version=14)
+    # tokenizer.json: the fast (Rust) tokenizer, loadable without transformers
+    tokenizer.backend_tokenizer.save(str(path.parent / "tokenizer.json"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (int8)")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--out", default=None, help="Output directory (default: EMBEDDING_ONNX_DIR or src/rag/onnx)")
+    parser.add_argument("--no-quantize", action="store_true", help="keep fp32 weights")
+    args = parser.parse_args()
+
+    out = Path(args.out) if args.out else default_onnx_dir()
+    out.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32_path = Path(tmp) / "model_fp32.onnx"
+        export(args.model, fp32_path)
+        os.replace(Path(tmp) / "tokenizer.json", out / "tokenizer.json")
+        if args.no_quantize:
+            os.replace(fp32_path, out / ONNX_MODEL_FILE)
+        else:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            # Dynamic quantization: int8 weights, activations quantized per batch at runtime
+            quantize_dynamic(str(fp32_path), str(out / ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+    size_mb = (out / ONNX_MODEL_FILE).stat().st_size / 1e6
+    print(f"Wrote {out / ONNX_MODEL_FILE} ({size_mb:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    reference = np.asarray(HuggingFaceEmbeddings(model_name=args.model).embed_documents(CHECK_TEXTS))
+    exported = np.asarray(OnnxEmbeddings(out).embed_documents(CHECK_TEXTS))
+    cosine = (reference * exported).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(exported, axis=1))
+    print(f"cosine vs {args.model}: min={cosine.min():.4f} mean={cosine.mean():.4f}")
+    if cosine.min() < 0.95:
+        print("FAIL: exported embeddings drift too far from the reference model")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,12 @@
-from .graph import create_agent_graph, get_agent
-from .state import AgentState
-
+# Graph construction imports LangGraph and the Gemini client; resolve names lazily
 __all__ = ['create_agent_graph', 'get_agent', 'AgentState']
+
+
+def __getattr__(name):
+    if name in ('create_agent_graph', 'get_agent'):
+        from . import graph
+        return getattr(graph, name)
+    if name == 'AgentState':
+        from .state import AgentState
+        return AgentState
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,128 @@
+import asyncio
+import os
+from typing import Annotated, Any, Callable, Dict, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+from langgraph.errors import InvalidUpdateError
+
+from agent.state import AgentState
+
+# (sync, async or None) node functions the StateGraph is built from
+NodeFuncs = Tuple[Callable, Optional[Callable]]
+# A fixed next node (None: END), or (router, {route: next node}) for a conditional edge
+Edge = Union[Optional[str], Tuple[Callable, Dict[str, Optional[str]]]]
+
+
+def _state_reducers() -> Dict[str, Optional[Callable]]:
+    # Channel per AgentState key: Annotated[..., reducer] keys merge updates, the rest overwrite
+    reducers = {}
+    for key, hint in get_type_hints(AgentState, include_extras=True).items():
+        reducers[key] = get_args(hint)[1] if get_origin(hint) is Annotated else None
+    return reducers
+
+
+STATE_REDUCERS = _state_reducers()
+
+
+def check_update(node: str, update: Optional[Dict[str, Any]]) -> None:
+    # LangGraph itself drops keys outside the schema, which hides a typo in a node's return value;
+    # both executors reject them instead
+    unknown = [key for key in (update or {}) if key not in STATE_REDUCERS]
+    if unknown:
+        raise InvalidUpdateError(f"Node {node} returned keys outside AgentState: {sorted(unknown)}")
+
+
+def checked_node(name: str, func: Callable, afunc: Optional[Callable] = None) -> NodeFuncs:
+    # Node functions as registered on the StateGraph, with check_update on their return values
+    def run(state):
+        update = func(state)
+        check_update(name, update)
+        return update
+
+    async def arun(state):
+        update = await afunc(state)
+        check_update(name, update)
+        return update
+
+    return run, arun if afunc else None
+
+
+def langsmith_tracing() -> bool:
+    return any(os.getenv(name, "").lower() == "true" for name in ("LANGCHAIN_TRACING_V2", "LANGSMITH_TRACING"))
+
+
+class FastPathAgent:
+    # Proxy over the compiled graph that runs plain invoke()/ainvoke() turns itself: the same
+    # (traced) node functions and routers the graph was built from, called in order from a routing
+    # table fixed at build time, with updates merged into one dict. No per-step channel versions,
+    # task scheduling or state copies, which is most of a turn when the LLM is fast or not called.
+    # Calls with a config or extra arguments, non-dict input, streaming and every other graph
+    # method go to the compiled graph, so callbacks, checkpointers and token streaming behave as
+    # before. bench/fast_path.py is the parity gate: it fails unless both give identical results.
+
+    def __init__(self, graph, entry: str, nodes: Dict[str, NodeFuncs], edges: Dict[str, Edge]):
+        self.graph = graph
+        self.entry = entry
+        self.nodes = nodes
+        self.edges = edges
+        self.fast_turns = 0
+        self.graph_turns = 0
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for names not found here; "graph" itself missing means a half-built copy
+        if name == "graph":
+            raise AttributeError(name)
+        return getattr(self.graph, name)
+
+    def invoke(self, input: Any, config: Any = None, **kwargs: Any) -> Dict[str, Any]:
+        if config is not None or kwargs or not isinstance(input, dict):
+            self.graph_turns += 1
+            return self.graph.invoke(input, config, **kwargs)
+        self.fast_turns += 1
+        state = self._initial_state(input)
+        node = self.entry
+        while node is not None:
+            self._apply(state, self.nodes[node][0](dict(state)), node)
+            node = self._next(node, state)
+        return state
+
+    async def ainvoke(self, input: Any, config: Any = None, **kwargs: Any) -> Dict[str, Any]:
+        if config is not None or kwargs or not isinstance(input, dict):
+            self.graph_turns += 1
+            return await self.graph.ainvoke(input, config, **kwargs)
+        self.fast_turns += 1
+        state = self._initial_state(input)
+        node = self.entry
+        while node is not None:
+            func, afunc = self.nodes[node]
+            if afunc is not None:
+                update = await afunc(dict(state))
+            else:
+                # Like the graph, sync-only nodes (lead capture's local enqueue) run off the event loop
+                update = await asyncio.to_thread(func, dict(state))
+            self._apply(state, update, node)
+            node = self._next(node, state)
+        return state
+
+    def fast_path_stats(self) -> Dict[str, int]:
+        return {"fast_turns": self.fast_turns, "graph_turns": self.graph_turns}
+
+    def _initial_state(self, input: Dict[str, Any]) -> Dict[str, Any]:
+        # Input is applied like a node update onto empty channels. As in the graph, input keys
+        # outside the schema (callers passing back a wider dict) are dropped
+        state: Dict[str, Any] = {key: [] for key, reducer in STATE_REDUCERS.items() if reducer is not None}
+        self._apply(state, {key: value for key, value in input.items() if key in STATE_REDUCERS})
+        return state
+
+    def _next(self, node: str, state: Dict[str, Any]) -> Optional[str]:
+        edge = self.edges[node]
+        if isinstance(edge, tuple):
+            router, targets = edge
+            return targets[router(dict(state))]
+        return edge
+
+    @staticmethod
+    def _apply(state: Dict[str, Any], update: Optional[Dict[str, Any]], node: str = "input") -> None:
+        check_update(node, update)
+        for key, value in (update or {}).items():
+            reducer = STATE_REDUCERS[key]
+            state[key] = reducer(state.get(key), value) if reducer is not None else value
@@ -1,82 +1,153 @@
 import os
+import threading
 from typing import Dict, Any
 from functools import partial
 
 from langgraph.graph import StateGraph, END
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.runnables import RunnableLambda
 
+from agent.fast_path import FastPathAgent, checked_node, langsmith_tracing
 from agent.state import AgentState
+from utils.tracing import TracedLLM, traced_node, traced_route
+from utils.llm_gateway import create_llm_gateway, pooled_client_args
+from agent.templates import get_response_templates
 from agent.nodes import (
     classify_intent_node,
+    aclassify_intent_node,
     rag_retrieval_node,
+    arag_retrieval_node,
     generate_response_node,
+    agenerate_response_node,
     extract_info_node,
+    aextract_info_node,
+    analyze_turn_node,
+    aanalyze_turn_node,
     lead_capture_node,
     route_by_intent,
-    route_after_extraction
+    route_after_extraction,
+    route_after_analysis
 )
 
 
-def create_agent_graph(gemini_api_key: str = None, model_name: str = None):
-    if gemini_api_key is None:
-        gemini_api_key = os.getenv("GEMINI_API_KEY")
-    if model_name is None:
-        model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-    
-    llm = ChatGoogleGenerativeAI(
-        google_api_key=gemini_api_key,
-        model=model_name,
-        temperature=0.7,
-        max_output_tokens=300
-    )
-    
-    classify_with_llm = partial(classify_intent_node, llm=llm)
-    generate_with_llm = partial(generate_response_node, llm=llm)
-    extract_with_llm = partial(extract_info_node, llm=llm)
-    
-    workflow = StateGraph(AgentState)
-    
-    workflow.add_node("classify_intent", classify_with_llm)
-    workflow.add_node("retrieve", rag_retrieval_node)
-    workflow.add_node("extract_info", extract_with_llm)
-    workflow.add_node("respond", generate_with_llm)
-    workflow.add_node("capture_lead", lead_capture_node)
+def _node(name, func, afunc=None, **bound):
+    # Same node under invoke() and ainvoke(); the async variant awaits the LLM instead of blocking
+    if bound:
+        func = partial(func, **bound)
+        afunc = partial(afunc, **bound) if afunc else None
+    # Every node is timed into agent_node_seconds and the per-request trace
+    func, traced_afunc = traced_node(name, func, afunc)
+    return func, traced_afunc if afunc else None
+
+
+def create_agent_graph(gemini_api_key: str = None, model_name: str = None, llm=None,
+                       extraction_mode: str = None, response_mode: str = None, fast_path: bool = None):
+    if llm is None:
+        if gemini_api_key is None:
+            gemini_api_key = os.getenv("GEMINI_API_KEY")
+        if model_name is None:
+            model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+        
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        client_kwargs = {}
+        if "client_args" in ChatGoogleGenerativeAI.model_fields:
+            client_kwargs["client_args"] = pooled_client_args()
+        llm = ChatGoogleGenerativeAI(
+            google_api_key=gemini_api_key,
+            model=model_name,
+            temperature=0.7,
+            max_output_tokens=300,
+            **client_kwargs
+        )
+    else:
+        model_name = model_name or getattr(llm, "model", None) or type(llm).__name__
     
-    workflow.set_entry_point("classify_intent")
+    # Single-flight, rate limiting and circuit breaking in front of the model (LLM_GATEWAY_ENABLED)
+    gateway = create_llm_gateway(llm, model_name)
+    if gateway is not None:
+        llm = gateway
+    # Times every LLM call (including gateway queueing) and records token usage against the calling node
+    llm = TracedLLM(llm)
     
-    workflow.add_conditional_edges(
-        "classify_intent",
-        route_by_intent,
-        {
-            "respond": "respond",
-            "retrieve": "retrieve",
-            "extract_info": "extract_info"
-        }
-    )
+    if extraction_mode is None:
+        extraction_mode = os.getenv("EXTRACTION_MODE", "structured")
+    templates = get_response_templates(response_mode)
     
-    workflow.add_edge("retrieve", "respond")
+    # Nodes and edges are built once and shared by the StateGraph and the fast path executor
+    nodes = {
+        "retrieve": _node("retrieve", rag_retrieval_node, arag_retrieval_node),
+        "respond": _node("respond", generate_response_node, agenerate_response_node, llm=llm, templates=templates),
+        "capture_lead": _node("capture_lead", lead_capture_node)
+    }
+    edges = {
+        "retrieve": "respond",
+        "capture_lead": "respond",
+        "respond": None
+    }
     
-    workflow.add_conditional_edges(
-        "extract_info",
-        route_after_extraction,
-        {
-            "capture_lead": "capture_lead",
-            "respond": "respond"
-        }
-    )
+    if extraction_mode == "structured":
+        # One node decides intent and fills lead slots, with at most one LLM call
+        entry = "analyze_turn"
+        nodes["analyze_turn"] = _node("analyze_turn", analyze_turn_node, aanalyze_turn_node, llm=llm)
+        edges["analyze_turn"] = (
+            traced_route("analyze_turn", route_after_analysis),
+            {
+                "respond": "respond",
+                "retrieve": "retrieve",
+                "capture_lead": "capture_lead"
+            }
+        )
+    else:
+        entry = "classify_intent"
+        nodes["classify_intent"] = _node("classify_intent", classify_intent_node, aclassify_intent_node, llm=llm)
+        nodes["extract_info"] = _node("extract_info", extract_info_node, aextract_info_node, llm=llm)
+        edges["classify_intent"] = (
+            traced_route("classify_intent", route_by_intent),
+            {
+                "respond": "respond",
+                "retrieve": "retrieve",
+                "extract_info": "extract_info"
+            }
+        )
+        edges["extract_info"] = (
+            traced_route("extract_info", route_after_extraction),
+            {
+                "capture_lead": "capture_lead",
+                "respond": "respond"
+            }
+        )
     
-    workflow.add_edge("capture_lead", "respond")
-    workflow.add_edge("respond", END)
+    workflow = StateGraph(AgentState)
+    for name, (func, afunc) in nodes.items():
+        # The fast path checks updates as it applies them; the graph needs the check on the node
+        func, afunc = checked_node(name, func, afunc)
+        workflow.add_node(name, RunnableLambda(func, afunc=afunc))
+    workflow.set_entry_point(entry)
+    for source, edge in edges.items():
+        if isinstance(edge, tuple):
+            router, targets = edge
+            workflow.add_conditional_edges(source, router, targets)
+        else:
+            workflow.add_edge(source, edge or END)
     
     app = workflow.compile()
     
+    # Plain invoke/ainvoke skip LangGraph's step machinery (GRAPH_FAST_PATH=false turns it off).
+    # LangSmith tracing wants the graph's own run tree, so it keeps the full graph
+    if fast_path is None:
+        fast_path = os.getenv("GRAPH_FAST_PATH", "true").lower() == "true" and not langsmith_tracing()
+    if fast_path:
+        return FastPathAgent(app, entry, nodes, edges)
     return app
 
 
 _agent_app = None
+_agent_lock = threading.Lock()
 
 def get_agent(gemini_api_key: str = None, model_name: str = None):
+    # The warmup thread and the first request may both get here; only one builds the graph
     global _agent_app
     if _agent_app is None:
-        _agent_app = create_agent_graph(gemini_api_key, model_name)
+        with _agent_lock:
+            if _agent_app is None:
+                _agent_app = create_agent_graph(gemini_api_key, model_name)
     return _agent_app
@@ -1,186 +1,414 @@
-from typing import Dict, Any
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+import time
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
+from langchain_core.messages import HumanMessage, SystemMessage
 
 from agent.state import AgentState
-from utils.intent import classify_intent
-from rag.retriever import get_retriever
-from tools.lead_capture import mock_lead_capture, validate_lead_data
+from agent.templates import ResponseTemplates
+from utils.intent import classify_intent, aclassify_intent
+from rag.tenants import DEFAULT_TENANT, get_tenant, get_tenant_registry
+from rag.response_cache import context_hash
+from tools.lead_capture import validate_lead_data
+from leads import get_lead_sink
+from session.record import compact_message, message_text, to_langchain_messages
+from utils.matcher import find_email, find_platform
+from rag.context import estimate_tokens
+from utils.tracing import count_cache, count_prompt_tokens
+from utils.extraction import (
+    aextract_turn,
+    extract_turn,
+    lead_field_updates,
+    local_turn_analysis,
+    merge_extraction
+)
 
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
-def classify_intent_node(state: AgentState, llm: ChatGoogleGenerativeAI) -> Dict[str, Any]:
-    messages = state["messages"]
-    if not messages:
-        return {"intent": "greeting"}
-    
+
+def _last_user_text(messages: List) -> str:
+    return message_text(messages[-1])
+
+
+def _sticky_high_intent(state: AgentState) -> bool:
     # If we're already in high-intent mode and haven't captured lead yet, stay in high-intent
-    from tools.lead_capture import validate_lead_data
     if state.get("intent") == "high_intent_lead" and not state.get("lead_captured", False):
         validation = validate_lead_data(
             state.get("user_name"),
             state.get("user_email"),
             state.get("user_platform")
         )
-        if not validation["is_complete"]:
-            return {"intent": "high_intent_lead"}
-    
-    last_message = messages[-1]
-    user_text = last_message.content if hasattr(last_message, 'content') else str(last_message)
+        return not validation["is_complete"]
+    return False
+
+
+def _platform_hint(state: AgentState, user_text: str) -> Dict[str, Any]:
+    # Scan only the new message; earlier mentions are already carried in platform_hint
+    if state.get("user_platform"):
+        return {}
+    platform = find_platform(user_text)
+    if platform:
+        return {"platform_hint": platform}
+    return {}
+
+
+def classify_intent_node(state: AgentState, llm: "ChatGoogleGenerativeAI") -> Dict[str, Any]:
+    messages = state["messages"]
+    if not messages:
+        return {"intent": "greeting"}
+
+    user_text = _last_user_text(messages)
+    updates = _platform_hint(state, user_text)
+
+    if _sticky_high_intent(state):
+        return {"intent": "high_intent_lead", **updates}
+
     intent = classify_intent(user_text, llm)
-    
-    return {"intent": intent}
+
+    return {"intent": intent, **updates}
+
+
+async def aclassify_intent_node(state: AgentState, llm: "ChatGoogleGenerativeAI") -> Dict[str, Any]:
+    messages = state["messages"]
+    if not messages:
+        return {"intent": "greeting"}
+
+    user_text = _last_user_text(messages)
+    updates = _platform_hint(state, user_text)
+
+    if _sticky_high_intent(state):
+        return {"intent": "high_intent_lead", **updates}
+
+    intent = await aclassify_intent(user_text, llm)
+
+    return {"intent": intent, **updates}
 
 
 def rag_retrieval_node(state: AgentState) -> Dict[str, Any]:
     messages = state["messages"]
     if not messages:
         return {"context": ""}
-    
-    last_message = messages[-1]
-    query = last_message.content if hasattr(last_message, 'content') else str(last_message)
-    
-    retriever = get_retriever()
-    context = retriever.get_context(query)
-    
-    return {"context": context}
 
+    query = _last_user_text(messages)
+
+    # Index and caches of the brand this conversation belongs to
+    tenant = get_tenant(state.get("tenant_id"))
+    retriever = tenant.retriever
+    # While the embedding model is still warming up, answer from BM25 and skip the semantic cache
+    query_vector = retriever.embed_query(query) if retriever.embeddings_ready else None
+    # Token budget and relevance cutoff for this intent (rag/context.py)
+    context = tenant.context(query, query_vector, state.get("intent"))
 
-def generate_response_node(state: AgentState, llm: ChatGoogleGenerativeAI) -> Dict[str, Any]:
+    # Repeated inquiries against the same retrieved context reuse the stored answer
+    cached_response = None
+    cache = tenant.response_cache
+    if cache is not None and query_vector is not None:
+        cached_response = cache.lookup(query_vector, context_hash(context), retriever.kb_hash)
+        count_cache("response", cached_response is not None)
+
+    return {"context": context, "cached_response": cached_response}
+
+
+async def arag_retrieval_node(state: AgentState) -> Dict[str, Any]:
+    # Embedding + FAISS search are CPU bound; keep them off the event loop
+    return await asyncio.to_thread(rag_retrieval_node, state)
+
+
+def _response_key(state: AgentState) -> str:
     intent = state.get("intent", "inquiry")
+
+    if intent == "greeting":
+        return "greeting"
+    elif intent == "inquiry":
+        return "inquiry"
+
+    validation = validate_lead_data(
+        state.get("user_name"),
+        state.get("user_email"),
+        state.get("user_platform")
+    )
+    if validation["is_complete"]:
+        return "confirm"
+    return f"ask_{validation['missing_fields'][0]}"
+
+
+def _template_response(state: AgentState, templates: Optional[ResponseTemplates]) -> Optional[str]:
+    key = _response_key(state)
+    if templates is None or key not in templates:
+        return None
+    # The message window stops growing after HISTORY_WINDOW, so variants rotate on the session's
+    # turn counter; callers without a session store fall back to the window length
+    turn = state.get("turns") or len(state["messages"])
+    return templates.render(key, turn, {
+        "name": state.get("user_name"),
+        "email": state.get("user_email"),
+        "platform": state.get("user_platform")
+    })
+
+
+def _build_response_prompt(state: AgentState) -> List:
     context = state.get("context", "")
     messages = state["messages"]
-    
-    last_message = messages[-1]
-    user_text = last_message.content if hasattr(last_message, 'content') else str(last_message)
-    
-    if intent == "greeting":
+    key = _response_key(state)
+
+    if key == "greeting":
         system_prompt = "AutoStream AI. Greet, ask how to help. Brief."
-    
-    elif intent == "inquiry":
+
+    elif key == "inquiry":
         system_prompt = f"""Answer using:
 {context}
 Concise, max 60 words."""
-    
+
+    elif key == "ask_name":
+        system_prompt = "Ask name. Friendly."
+    elif key == "ask_email":
+        system_prompt = f"Name: {state.get('user_name')}. Ask email."
+    elif key == "ask_platform":
+        system_prompt = f"Have {state.get('user_name')}, {state.get('user_email')}. Ask platform."
     else:
-        validation = validate_lead_data(
-            state.get("user_name"),
-            state.get("user_email"),
-            state.get("user_platform")
-        )
-        
-        if not validation["is_complete"]:
-            missing = validation["missing_fields"]
-            if "name" in missing:
-                system_prompt = "Ask name. Friendly."
-            elif "email" in missing:
-                system_prompt = f"Name: {state.get('user_name')}. Ask email."
-            else:
-                system_prompt = f"Have {state.get('user_name')}, {state.get('user_email')}. Ask platform."
-        else:
-            system_prompt = "Confirm setup. Thank them."
-    
-    # Build prompt with minimal conversation history
-    prompt_messages = [SystemMessage(content=system_prompt)]
-    
-    # Add only last 2 messages for context (optimized for token efficiency)
-    recent_messages = messages[-2:] if len(messages) > 2 else messages
-    for msg in recent_messages:
-        if isinstance(msg, (HumanMessage, AIMessage)):
-            prompt_messages.append(msg)
-    
-    response = llm.invoke(prompt_messages)
-    ai_message = AIMessage(content=response.content)
-    
-    # Append to existing messages, don't replace
-    return {"messages": state["messages"] + [ai_message]}
-
-
-def extract_info_node(state: AgentState, llm: ChatGoogleGenerativeAI) -> Dict[str, Any]:
-    messages = state["messages"]
-    if len(messages) < 2:
-        return {}
-    
-    last_message = messages[-1]
-    user_text = last_message.content if hasattr(last_message, 'content') else str(last_message)
-    
-    updates = {}
-    
+        system_prompt = "Confirm setup. Thank them."
+
+    # Only the last 2 messages go into the prompt (token efficiency); this is the one place the
+    # compact state messages become LangChain objects
+    history = to_langchain_messages(messages[-2:])
+    context_tokens = estimate_tokens(context) if key == "inquiry" else 0
+    count_prompt_tokens(
+        "respond",
+        context=context_tokens,
+        instructions=estimate_tokens(system_prompt) - context_tokens,
+        history=sum(estimate_tokens(str(message.content)) for message in history)
+    )
+    return [SystemMessage(content=system_prompt)] + history
+
+
+def _remember_answer(state: AgentState, answer: str, generation_seconds: float) -> None:
+    if state.get("intent") != "inquiry" or not state.get("context"):
+        return
+    # The retrieve node loaded this tenant for the turn; never load one (FAISS, embedder) just to cache
+    tenant = get_tenant_registry().loaded(state.get("tenant_id") or DEFAULT_TENANT)
+    if tenant is None or tenant.response_cache is None:
+        return
+    cache = tenant.response_cache
+    retriever = tenant.retriever
+    if not retriever.embeddings_ready:
+        return
+    query_vector = retriever.embed_query(_last_user_text(state["messages"]))
+    cache.put(query_vector, context_hash(state["context"]), retriever.kb_hash, answer, generation_seconds)
+
+
+def generate_response_node(state: AgentState, llm: "ChatGoogleGenerativeAI",
+                           templates: Optional[ResponseTemplates] = None) -> Dict[str, Any]:
+    if state.get("intent") == "inquiry" and state.get("cached_response"):
+        return {"messages": [compact_message("ai", state["cached_response"])]}
+
+    # Greetings and lead-funnel prompts are predictable; render them without the LLM
+    templated = _template_response(state, templates)
+    if templated is not None:
+        return {"messages": [compact_message("ai", templated)]}
+
+    start = time.perf_counter()
+    response = llm.invoke(_build_response_prompt(state))
+    _remember_answer(state, response.content, time.perf_counter() - start)
+    # append_messages reducer appends the delta to the conversation
+    return {"messages": [compact_message("ai", response.content)]}
+
+
+async def agenerate_response_node(state: AgentState, llm: "ChatGoogleGenerativeAI",
+                                  templates: Optional[ResponseTemplates] = None) -> Dict[str, Any]:
+    if state.get("intent") == "inquiry" and state.get("cached_response"):
+        return {"messages": [compact_message("ai", state["cached_response"])]}
+
+    templated = _template_response(state, templates)
+    if templated is not None:
+        return {"messages": [compact_message("ai", templated)]}
+
+    start = time.perf_counter()
+    response = await llm.ainvoke(_build_response_prompt(state))
+    await asyncio.to_thread(_remember_answer, state, response.content, time.perf_counter() - start)
+    return {"messages": [compact_message("ai", response.content)]}
+
+
+def _missing_lead_field(state: AgentState) -> Optional[str]:
     validation = validate_lead_data(
         state.get("user_name"),
         state.get("user_email"),
         state.get("user_platform")
     )
-    
-    if not validation["is_complete"]:
-        missing = validation["missing_fields"]
-        
-        if "name" in missing:
-            extract_prompt = f"""Extract name from: "{user_text}"
+    if validation["is_complete"]:
+        return None
+    return validation["missing_fields"][0]
+
+
+def _name_prompt(user_text: str) -> List:
+    extract_prompt = f"""Extract name from: "{user_text}"
 Respond with name only or "NONE"."""
-            
-            response = llm.invoke([HumanMessage(content=extract_prompt)])
-            extracted = response.content.strip()
-            if extracted != "NONE" and len(extracted) > 0 and len(extracted) < 50:
-                updates["user_name"] = extracted
-        
-        elif "email" in missing:
-            import re
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            emails = re.findall(email_pattern, user_text)
-            if emails:
-                updates["user_email"] = emails[0]
-        
-        elif "platform" in missing:
-            # Check the entire conversation for platform mentions
-            platforms = ["youtube", "instagram", "tiktok", "facebook", "twitter", "linkedin", "twitch"]
-            
-            # Check all user messages for platform keywords
-            for msg in messages:
-                if hasattr(msg, 'content'):
-                    msg_lower = msg.content.lower()
-                    for platform in platforms:
-                        if platform in msg_lower:
-                            updates["user_platform"] = platform.capitalize()
-                            break
-                if "user_platform" in updates:
-                    break
-            
-            # If still not found, try LLM extraction on current message
-            if "user_platform" not in updates:
-                extract_prompt = f"""Extract platform from: "{user_text}"
+    return [HumanMessage(content=extract_prompt)]
+
+
+def _platform_prompt(user_text: str) -> List:
+    extract_prompt = f"""Extract platform from: "{user_text}"
 YouTube/Instagram/TikTok/Facebook/Twitter/LinkedIn/Twitch
 Platform name only or "NONE"."""
-                
-                response = llm.invoke([HumanMessage(content=extract_prompt)])
-                extracted = response.content.strip()
-                if extracted != "NONE":
-                    updates["user_platform"] = extracted
-    
+    return [HumanMessage(content=extract_prompt)]
+
+
+def _parse_name(raw: str) -> Dict[str, Any]:
+    extracted = raw.strip()
+    if extracted != "NONE" and len(extracted) > 0 and len(extracted) < 50:
+        return {"user_name": extracted}
+    return {}
+
+
+def _parse_platform(raw: str) -> Dict[str, Any]:
+    extracted = raw.strip()
+    if extracted != "NONE":
+        return {"user_platform": extracted}
+    return {}
+
+
+def _extract_email(user_text: str) -> Dict[str, Any]:
+    email = find_email(user_text)
+    if email:
+        return {"user_email": email}
+    return {}
+
+
+def _known_platform(state: AgentState, user_text: str) -> Dict[str, Any]:
+    # Any platform mentioned earlier in the conversation was recorded by classify_intent_node
+    platform = state.get("platform_hint") or find_platform(user_text)
+    if platform:
+        return {"user_platform": platform}
+    return {}
+
+
+def extract_info_node(state: AgentState, llm: "ChatGoogleGenerativeAI") -> Dict[str, Any]:
+    messages = state["messages"]
+    if len(messages) < 2:
+        return {}
+
+    user_text = _last_user_text(messages)
+    missing = _missing_lead_field(state)
+
+    if missing == "name":
+        response = llm.invoke(_name_prompt(user_text))
+        return _parse_name(response.content)
+
+    elif missing == "email":
+        return _extract_email(user_text)
+
+    elif missing == "platform":
+        updates = _known_platform(state, user_text)
+
+        # If still not found, try LLM extraction on current message
+        if not updates:
+            response = llm.invoke(_platform_prompt(user_text))
+            updates = _parse_platform(response.content)
+        return updates
+
+    return {}
+
+
+async def aextract_info_node(state: AgentState, llm: "ChatGoogleGenerativeAI") -> Dict[str, Any]:
+    messages = state["messages"]
+    if len(messages) < 2:
+        return {}
+
+    user_text = _last_user_text(messages)
+    missing = _missing_lead_field(state)
+
+    if missing == "name":
+        response = await llm.ainvoke(_name_prompt(user_text))
+        return _parse_name(response.content)
+
+    elif missing == "email":
+        return _extract_email(user_text)
+
+    elif missing == "platform":
+        updates = _known_platform(state, user_text)
+
+        if not updates:
+            response = await llm.ainvoke(_platform_prompt(user_text))
+            updates = _parse_platform(response.content)
+        return updates
+
+    return {}
+
+
+def _analysis_updates(state: AgentState, intent: str, fields: Dict[str, Any],
+                      hint_updates: Dict[str, Any]) -> Dict[str, Any]:
+    updates = {"intent": intent, **hint_updates}
+    if intent == "high_intent_lead":
+        updates.update(lead_field_updates(state, fields))
     return updates
 
 
+def analyze_turn_node(state: AgentState, llm: "ChatGoogleGenerativeAI") -> Dict[str, Any]:
+    # Structured mode: intent and lead slots from at most one LLM call
+    messages = state["messages"]
+    if not messages:
+        return {"intent": "greeting"}
+
+    user_text = _last_user_text(messages)
+    hint_updates = _platform_hint(state, user_text)
+    intent, fields, needs_llm = local_turn_analysis(
+        user_text,
+        _sticky_high_intent(state),
+        _missing_lead_field(state),
+        hint_updates.get("platform_hint") or state.get("platform_hint")
+    )
+
+    if needs_llm:
+        intent, fields = merge_extraction(intent, fields, extract_turn(user_text, llm))
+
+    return _analysis_updates(state, intent, fields, hint_updates)
+
+
+async def aanalyze_turn_node(state: AgentState, llm: "ChatGoogleGenerativeAI") -> Dict[str, Any]:
+    messages = state["messages"]
+    if not messages:
+        return {"intent": "greeting"}
+
+    user_text = _last_user_text(messages)
+    hint_updates = _platform_hint(state, user_text)
+    intent, fields, needs_llm = await asyncio.to_thread(
+        local_turn_analysis,
+        user_text,
+        _sticky_high_intent(state),
+        _missing_lead_field(state),
+        hint_updates.get("platform_hint") or state.get("platform_hint")
+    )
+
+    if needs_llm:
+        intent, fields = merge_extraction(intent, fields, await aextract_turn(user_text, llm))
+
+    return _analysis_updates(state, intent, fields, hint_updates)
+
+
 def lead_capture_node(state: AgentState) -> Dict[str, Any]:
     validation = validate_lead_data(
         state.get("user_name"),
         state.get("user_email"),
         state.get("user_platform")
     )
-    
+
     if validation["is_complete"] and not state.get("lead_captured", False):
-        result = mock_lead_capture(
+        # Durable local enqueue only; the sink's worker delivers to the CRM off the request path
+        get_lead_sink().capture(
+            state.get("session_id") or "default",
             state["user_name"],
             state["user_email"],
-            state["user_platform"]
+            state["user_platform"],
+            tenant_id=state.get("tenant_id")
         )
-        
+
         return {"lead_captured": True}
-    
+
     return {}
 
 
 def route_by_intent(state: AgentState) -> str:
     intent = state.get("intent", "inquiry")
-    
+
     if intent == "greeting":
         return "respond"
     elif intent == "inquiry":
@@ -195,8 +423,19 @@ def route_after_extraction(state: AgentState) -> str:
         state.get("user_email"),
         state.get("user_platform")
     )
-    
+
     if validation["is_complete"]:
         return "capture_lead"
     else:
         return "respond"
+
+
+def route_after_analysis(state: AgentState) -> str:
+    intent = state.get("intent", "inquiry")
+
+    if intent == "greeting":
+        return "respond"
+    elif intent == "inquiry":
+        return "retrieve"
+    else:  # high_intent_lead; slots were already filled by analyze_turn_node
+        return route_after_extraction(state)
@@ -1,11 +1,27 @@
-from typing import TypedDict, Optional, List
+from typing import TypedDict, Optional, List, Annotated
+
+from session.record import CompactMessage, compact_messages
+
+
+def append_messages(left: List[CompactMessage], right: List) -> List[CompactMessage]:
+    # Nodes return only new messages; they are appended as compact role+UTF-8 entries.
+    # LangChain messages passed in by callers are compacted here, so none live in graph state.
+    return list(left or []) + compact_messages(right or [])
 
 
 class AgentState(TypedDict):
-    messages: List
+    messages: Annotated[List[CompactMessage], append_messages]
     intent: Optional[str]
     user_name: Optional[str]
     user_email: Optional[str]
     user_platform: Optional[str]
+    platform_hint: Optional[str]
     lead_captured: bool
+    # User turns in the session including this one, kept by the session record
+    turns: int
     context: Optional[str]
+    cached_response: Optional[str]
+    # Not persisted; set per turn so captured leads get a stable idempotency key
+    session_id: Optional[str]
+    # Not persisted; selects the knowledge base and caches (rag.tenants) for this turn
+    tenant_id: Optional[str]
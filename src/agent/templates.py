@@ -0,0 +1,65 @@
+import os
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+RESPONSE_TEMPLATES: Dict[str, List[str]] = {
+    "greeting": [
+        "Hi there! 👋 I'm the AutoStream assistant. How can I help you today?",
+        "Hello! Welcome to AutoStream. What can I help you with?",
+        "Hey! I'm here to help with anything about AutoStream. What would you like to know?",
+    ],
+    "ask_name": [
+        "Awesome, let's get you set up! What's your name?",
+        "Great choice! To get started, could you tell me your name?",
+        "Happy to help you get started! May I have your name?",
+    ],
+    "ask_email": [
+        "Thanks, {name}! What's the best email address for your account?",
+        "Nice to meet you, {name}! Which email should we use for your account?",
+        "Great, {name}. What email address would you like to sign up with?",
+    ],
+    "ask_platform": [
+        "Got it, {name}! Which platform do you create for (YouTube, Instagram, TikTok, ...)?",
+        "Thanks! Last thing, {name}: which platform will you use AutoStream for?",
+        "Perfect. Which platform do you mainly publish on, {name}?",
+    ],
+    "confirm": [
+        "You're all set, {name}! We'll send your AutoStream setup details for {platform} to {email}. Thanks for joining!",
+        "Done! Your AutoStream account for {platform} is being set up, {name}. Check {email} for next steps. Thank you!",
+        "Thanks, {name}! Your {platform} setup is on its way to {email}. Welcome to AutoStream!",
+    ],
+}
+
+
+def _compile(template: str) -> List[Tuple[str, Optional[str]]]:
+    # Parsed once so rendering is a join over literal/slot parts, no format-string parsing per turn
+    return [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+
+class ResponseTemplates:
+
+    def __init__(self, templates: Dict[str, List[str]] = None):    #type:ignore
+        templates = templates or RESPONSE_TEMPLATES
+        self._compiled = {key: [_compile(t) for t in variants] for key, variants in templates.items()}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._compiled
+
+    def render(self, key: str, turn: int, slots: Dict[str, Any]) -> str:
+        # Variants rotate with the turn number: deterministic per state, varied across a conversation
+        variants = self._compiled[key]
+        parts = variants[turn % len(variants)]
+        return "".join(
+            literal + (str(slots.get(field) or "") if field else "")
+            for literal, field in parts
+        )
+
+
+def get_response_templates(response_mode: str = None) -> Optional[ResponseTemplates]:    #type:ignore
+    # RESPONSE_MODE=llm keeps Gemini generation for every reply
+    if response_mode is None:
+        response_mode = os.getenv("RESPONSE_MODE", "template")
+    if response_mode.lower() == "llm":
+        return None
+    return ResponseTemplates()
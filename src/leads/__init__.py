@@ -0,0 +1,82 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Optional
+
+from .backends import PartialDeliveryError, LeadBackend, LogLeadBackend, FileLeadBackend, HttpLeadBackend, WebhookLeadBackend
+from .wal import LeadQueue, idempotency_key
+from .worker import LeadSink, logger
+from utils.log import log_event
+
+
+def create_lead_backend(backend: str = None) -> LeadBackend:    #type:ignore
+    backend = (backend or os.getenv("LEAD_SINK", "log")).lower()
+    timeout = float(os.getenv("LEAD_SINK_TIMEOUT_SECONDS", "5"))
+
+    if backend == "file":
+        return FileLeadBackend(os.getenv("LEAD_SINK_PATH", "leads.jsonl"))
+    if backend == "http":
+        return HttpLeadBackend(os.getenv("LEAD_SINK_URL", "http://127.0.0.1:8765/leads"), timeout=timeout)
+    if backend == "webhook":
+        return WebhookLeadBackend(os.environ["LEAD_WEBHOOK_URL"], secret=os.getenv("LEAD_WEBHOOK_SECRET"),
+                                  timeout=timeout)
+    return LogLeadBackend()
+
+
+def lead_queue_path() -> str:
+    # LEAD_QUEUE_PATH, else leads.db in the working directory, or in the temp dir when that is
+    # read-only (serverless: only /tmp is writable there, and it does not outlive the instance)
+    path = os.getenv("LEAD_QUEUE_PATH")
+    if path:
+        return path
+    if os.access(os.getcwd(), os.W_OK):
+        return "leads.db"
+    return os.path.join(tempfile.gettempdir(), "leads.db")
+
+
+def _open_queue(max_attempts: int) -> Optional[LeadQueue]:
+    path = lead_queue_path()
+    try:
+        return LeadQueue(path, max_attempts=max_attempts)
+    except (OSError, sqlite3.Error) as e:
+        log_event(logger, "lead_queue_unavailable", level=logging.ERROR, path=path, error=str(e),
+                  fallback="log")
+        return None
+
+
+_sink_instance: Optional[LeadSink] = None
+_sink_lock = threading.Lock()
+
+def loaded_lead_sink() -> Optional[LeadSink]:
+    return _sink_instance
+
+
+def get_lead_sink() -> LeadSink:
+    global _sink_instance
+    if _sink_instance is None:
+        with _sink_lock:
+            if _sink_instance is None:
+                max_attempts = int(os.getenv("LEAD_MAX_ATTEMPTS", "8"))
+                queue = _open_queue(max_attempts)
+                backend = create_lead_backend()
+                if queue is None:
+                    # No writable queue: capturing a lead must not fail the turn, so leads are only
+                    # logged, as before the queue existed
+                    queue = LeadQueue(":memory:", max_attempts=max_attempts)
+                    backend = LogLeadBackend()
+                _sink_instance = LeadSink(
+                    queue,
+                    backend,
+                    batch_size=int(os.getenv("LEAD_BATCH_SIZE", "100")),
+                    flush_interval=float(os.getenv("LEAD_FLUSH_INTERVAL_SECONDS", "0.5")),
+                    backoff_seconds=float(os.getenv("LEAD_BACKOFF_SECONDS", "1"))
+                )
+    return _sink_instance
+
+
+__all__ = [
+    'PartialDeliveryError', 'LeadBackend', 'LogLeadBackend', 'FileLeadBackend', 'HttpLeadBackend', 'WebhookLeadBackend',
+    'LeadQueue', 'LeadSink', 'idempotency_key', 'create_lead_backend', 'get_lead_sink', 'loaded_lead_sink', 'lead_queue_path'
+]
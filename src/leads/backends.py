@@ -0,0 +1,90 @@
+import hashlib
+import hmac
+import json
+import threading
+import urllib.request
+from typing import Any, Dict, List
+
+from tools.lead_capture import mock_lead_capture
+
+
+class PartialDeliveryError(Exception):
+    # Raised by per-lead backends so leads that did go through are not redelivered
+    def __init__(self, delivered_keys: List[str], cause: Exception):
+        super().__init__(str(cause))
+        self.delivered_keys = delivered_keys
+
+
+class LeadBackend:
+    name = "base"
+
+    def deliver(self, leads: List[Dict[str, Any]]) -> None:
+        # Raise on failure; the worker retries the whole batch with backoff.
+        # Every lead carries its idempotency_key so receivers can drop redeliveries.
+        raise NotImplementedError
+
+
+class LogLeadBackend(LeadBackend):
+    name = "log"
+
+    def deliver(self, leads: List[Dict[str, Any]]) -> None:
+        for lead in leads:
+            mock_lead_capture(lead["name"], lead["email"], lead["platform"])
+
+
+class FileLeadBackend(LeadBackend):
+    name = "file"
+
+    def __init__(self, path: str = "leads.jsonl"):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def deliver(self, leads: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(lead, separators=(",", ":")) + "\n" for lead in leads)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class HttpLeadBackend(LeadBackend):
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 5.0, headers: Dict[str, str] = None):    #type:ignore
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def _post(self, body: bytes, headers: Dict[str, str]) -> None:
+        request = urllib.request.Request(
+            self.url, data=body, method="POST",
+            headers={"Content-Type": "application/json", **self.headers, **headers}
+        )
+        # urlopen raises HTTPError for non-2xx responses
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def deliver(self, leads: List[Dict[str, Any]]) -> None:
+        body = json.dumps({"leads": leads}, separators=(",", ":")).encode("utf-8")
+        batch_key = hashlib.sha256("|".join(lead["idempotency_key"] for lead in leads).encode()).hexdigest()
+        self._post(body, {"Idempotency-Key": batch_key})
+
+
+class WebhookLeadBackend(HttpLeadBackend):
+    # One signed request per lead, the shape most CRM/Zapier-style webhooks expect
+    name = "webhook"
+
+    def __init__(self, url: str, secret: str = None, timeout: float = 5.0):    #type:ignore
+        super().__init__(url, timeout=timeout)
+        self.secret = secret
+
+    def deliver(self, leads: List[Dict[str, Any]]) -> None:
+        delivered = []
+        for lead in leads:
+            body = json.dumps(lead, separators=(",", ":")).encode("utf-8")
+            headers = {"Idempotency-Key": lead["idempotency_key"]}
+            if self.secret:
+                headers["X-Signature"] = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            try:
+                self._post(body, headers)
+            except Exception as e:
+                raise PartialDeliveryError(delivered, e)
+            delivered.append(lead["idempotency_key"])
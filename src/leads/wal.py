@@ -0,0 +1,90 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+
+def idempotency_key(session_id: str, email: str) -> str:
+    # Same session + email is the same lead, however many times the capture node fires
+    return hashlib.sha256(f"{session_id}|{email.strip().lower()}".encode("utf-8")).hexdigest()[:32]
+
+
+class LeadQueue:
+    # Append-only write-ahead log of captured leads; rows are only marked, never rewritten,
+    # so a crash between enqueue and delivery loses nothing
+
+    def __init__(self, path: str = "leads.db", max_attempts: int = 8):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lead_queue ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, idempotency_key TEXT NOT NULL UNIQUE, "
+            "payload TEXT NOT NULL, created_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt_at REAL NOT NULL, delivered_at REAL, last_error TEXT)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS lead_queue_pending ON lead_queue(delivered_at, next_attempt_at)"
+        )
+
+    def enqueue(self, key: str, lead: Dict[str, Any]) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO lead_queue (idempotency_key, payload, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(lead, separators=(",", ":")), now, now)
+            )
+            # False when this lead was already queued (duplicate capture)
+            return cursor.rowcount == 1
+
+    def claim(self, limit: int) -> List[Tuple[str, Dict[str, Any], int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, payload, attempts FROM lead_queue "
+                "WHERE delivered_at IS NULL AND attempts < ? AND next_attempt_at <= ? "
+                "ORDER BY seq LIMIT ?",
+                (self.max_attempts, time.time(), limit)
+            ).fetchall()
+        return [(key, json.loads(payload), attempts) for key, payload, attempts in rows]
+
+    def mark_delivered(self, keys: List[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE lead_queue SET delivered_at = ?, last_error = NULL WHERE idempotency_key = ?",
+                [(now, key) for key in keys]
+            )
+
+    def mark_failed(self, keys: List[str], error: str, retry_at: float) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE lead_queue SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? "
+                "WHERE idempotency_key = ?",
+                [(retry_at, error[:500], key) for key in keys]
+            )
+
+    def next_attempt_at(self) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM lead_queue WHERE delivered_at IS NULL AND attempts < ?",
+                (self.max_attempts,)
+            ).fetchone()
+        return row[0] if row and row[0] is not None else float("inf")
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            delivered, pending, dead = self._conn.execute(
+                "SELECT "
+                "COALESCE(SUM(delivered_at IS NOT NULL), 0), "
+                "COALESCE(SUM(delivered_at IS NULL AND attempts < ?), 0), "
+                "COALESCE(SUM(delivered_at IS NULL AND attempts >= ?), 0) "
+                "FROM lead_queue",
+                (self.max_attempts, self.max_attempts)
+            ).fetchone()
+        return {"pending": pending, "delivered": delivered, "dead_letter": dead}
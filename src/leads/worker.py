@@ -0,0 +1,111 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from leads.backends import LeadBackend, PartialDeliveryError
+from leads.wal import LeadQueue, idempotency_key
+from utils.log import get_logger, log_event
+
+logger = get_logger("sociolead.leads")
+
+
+class LeadSink:
+
+    def __init__(self, queue: LeadQueue, backend: LeadBackend, batch_size: int = 100,
+                 flush_interval: float = 0.5, backoff_seconds: float = 1.0, max_backoff_seconds: float = 300.0):
+        self.queue = queue
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.stats_counters = {"captured": 0, "duplicates": 0, "batches": 0, "delivered": 0, "failures": 0}
+
+    def capture(self, session_id: str, name: str, email: str, platform: str, tenant_id: str = None) -> str:    #type:ignore
+        # Only the local WAL insert happens on the request path; delivery is the worker's job
+        key = idempotency_key(session_id, email)
+        lead = {
+            "idempotency_key": key,
+            "session_id": session_id,
+            "name": name,
+            "email": email,
+            "platform": platform,
+            "captured_at": time.time()
+        }
+        if tenant_id is not None:
+            lead["tenant_id"] = tenant_id
+        if self.queue.enqueue(key, lead):
+            self.stats_counters["captured"] += 1
+        else:
+            self.stats_counters["duplicates"] += 1
+        self.start()
+        self._wake.set()
+        return key
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="lead-sink", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.flush()
+            # Sleep until new leads arrive or the earliest retry becomes due
+            wait = min(self.flush_interval, max(0.0, self.queue.next_attempt_at() - time.time()))
+            self._wake.wait(wait if wait > 0 else self.flush_interval)
+            self._wake.clear()
+        self.flush()
+
+    def flush(self) -> int:
+        delivered = 0
+        while True:
+            batch = self.queue.claim(self.batch_size)
+            if not batch:
+                return delivered
+            keys = [key for key, _, _ in batch]
+            try:
+                self.backend.deliver([lead for _, lead, _ in batch])
+            except Exception as e:
+                self.stats_counters["failures"] += 1
+                if isinstance(e, PartialDeliveryError) and e.delivered_keys:
+                    self.queue.mark_delivered(e.delivered_keys)
+                    self.stats_counters["delivered"] += len(e.delivered_keys)
+                    delivered += len(e.delivered_keys)
+                    done = set(e.delivered_keys)
+                    batch = [item for item in batch if item[0] not in done]
+                    keys = [key for key, _, _ in batch]
+                # Exponential backoff on the batch's attempt count, with jitter
+                attempts = max(attempts for _, _, attempts in batch)
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** attempts))
+                self.queue.mark_failed(keys, f"{type(e).__name__}: {e}", time.time() + delay * random.uniform(0.5, 1.0))
+                log_event(logger, "lead_delivery_failed", level=logging.WARNING, backend=self.backend.name,
+                          leads=len(keys), retry_in_seconds=round(delay, 1), error=f"{type(e).__name__}: {e}")
+                return delivered
+            self.queue.mark_delivered(keys)
+            self.stats_counters["batches"] += 1
+            self.stats_counters["delivered"] += len(keys)
+            delivered += len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            **self.stats_counters,
+            **self.queue.counts()
+        }
@@ -1,3 +1,10 @@
-from .retriever import KnowledgeBaseRetriever, get_retriever
-
+# Retriever pulls in FAISS and the embedding stack; resolve names lazily so light submodules
+# (e.g. rag.response_cache) can be imported without paying for it
 __all__ = ['KnowledgeBaseRetriever', 'get_retriever']
+
+
+def __getattr__(name):
+    if name in __all__:
+        from . import retriever
+        return getattr(retriever, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,76 @@
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# Keeps "720p", "4k", "$29", "24/7"-style fragments as single searchable terms
+TOKEN_RE = re.compile(r"\$?[a-z0-9]+(?:[./][0-9]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+
+    def __init__(self, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        self.size = len(texts)
+        doc_terms = [tokenize(text) for text in texts]
+        lengths = np.array([len(terms) for terms in doc_terms], dtype=np.float32)
+        avg_length = float(lengths.mean()) if self.size else 0.0
+
+        postings: Dict[str, Dict[int, int]] = {}
+        for doc_id, terms in enumerate(doc_terms):
+            for term in terms:
+                counts = postings.setdefault(term, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        # Documents never change after load, so each posting stores its final BM25 contribution
+        # and a query is just a scatter-add of a few precomputed slices (CSR layout)
+        self.vocabulary: Dict[str, int] = {}
+        offsets = [0]
+        doc_ids = []
+        weights = []
+        for term_id, (term, counts) in enumerate(postings.items()):
+            self.vocabulary[term] = term_id
+            ids = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            idf = np.log(1.0 + (self.size - len(counts) + 0.5) / (len(counts) + 0.5))
+            norm = k1 * (1.0 - b + b * lengths[ids] / max(avg_length, 1e-9))
+            doc_ids.append(ids)
+            weights.append(idf * tf * (k1 + 1.0) / (tf + norm))
+            offsets.append(offsets[-1] + len(counts))
+
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.doc_ids = np.concatenate(doc_ids) if doc_ids else np.zeros(0, dtype=np.int32)
+        self.weights = np.concatenate(weights).astype(np.float32) if weights else np.zeros(0, dtype=np.float32)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # A document appears at most once per posting list, so plain fancy-index add is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores > 0)
+        if matched.size == 0:
+            return []
+        if matched.size > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(i), float(scores[i])) for i in ranked]
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[int]:
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=lambda doc_id: (-fused[doc_id], doc_id))
@@ -0,0 +1,222 @@
+import os
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from rag.retriever import KnowledgeBaseRetriever
+
+
+# Tokens per intent for the retrieved context. The bundled graph only retrieves for inquiries;
+# the others apply to routes that retrieve for them. Intents not listed use "default"
+DEFAULT_TOKEN_BUDGETS = {"inquiry": 160, "high_intent_lead": 80, "default": 120}
+CONTEXT_HEADER = "AutoStream info:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose (Gemini's own rule of thumb); no tokenizer on the
+    # request path. Only used for budgets and accounting, which are relative anyway
+    return (len(text) + 3) // 4
+
+
+def parse_token_budgets(spec: Optional[str]) -> Dict[str, int]:
+    # "inquiry=160,high_intent_lead=80,default=120"; unlisted intents keep their defaults
+    budgets = dict(DEFAULT_TOKEN_BUDGETS)
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        intent, _, value = item.partition("=")
+        try:
+            budgets[intent.strip()] = int(value)
+        except ValueError:
+            raise ValueError(f"CONTEXT_TOKEN_BUDGETS entries look like intent=tokens, got {item!r}")
+    return budgets
+
+
+class AssembledContext:
+    __slots__ = ("text", "tokens", "chunks", "candidates", "below_cutoff", "over_budget", "merged")
+
+    def __init__(self, text: str, tokens: int, chunks: int, candidates: int,
+                 below_cutoff: int = 0, over_budget: int = 0, merged: int = 0):
+        self.text = text
+        self.tokens = tokens
+        self.chunks = chunks
+        self.candidates = candidates
+        self.below_cutoff = below_cutoff
+        self.over_budget = over_budget
+        self.merged = merged
+
+
+class ContextAssembler:
+    # Builds the respond prompt's context from scored candidates instead of a fixed k=2:
+    #   - candidates below min_relevance (relative to the best match) are dropped; the best one
+    #     is always kept, so an answerable question never gets less than before
+    #   - pieces of one knowledge base leaf that the splitter cut with overlap are stitched back
+    #     together, and exact duplicates are skipped
+    #   - leaves under the same parent path share one line, written once
+    #   - chunks are added in relevance order while the rendered context fits the intent's budget
+    # Lines are numbered like format_context, so prompts keep their shape.
+
+    def __init__(self, budgets: Dict[str, int] = None, min_relevance: float = 0.6,    #type:ignore
+                 max_chunks: int = 8, candidates: int = 10):
+        self.budgets = budgets if budgets is not None else dict(DEFAULT_TOKEN_BUDGETS)
+        self.min_relevance = min_relevance
+        self.max_chunks = max_chunks
+        self.candidates = candidates
+
+    def budget(self, intent: Optional[str]) -> int:
+        default = self.budgets.get("default", DEFAULT_TOKEN_BUDGETS["default"])
+        return self.budgets.get(intent or "inquiry", default)
+
+    def assemble(self, retriever: "KnowledgeBaseRetriever", query: str, intent: Optional[str] = None,
+                 query_vector: Optional[np.ndarray] = None) -> AssembledContext:
+        budget = self.budget(intent)
+        if budget <= 0:
+            return AssembledContext("", 0, 0, 0)
+        scored = retriever.retrieve_scored(query, k=self.candidates, query_vector=query_vector)
+        if not scored:
+            text = retriever.format_context([])
+            return AssembledContext(text, estimate_tokens(text), 0, 0)
+
+        selected: List["Document"] = []
+        lines: List[str] = []
+        below_cutoff = over_budget = 0
+        text = ""
+        seen = set()
+        for rank, (doc, relevance) in enumerate(scored):
+            if rank and relevance < self.min_relevance:
+                below_cutoff += 1
+                continue
+            if doc.page_content in seen:
+                continue
+            if len(selected) >= self.max_chunks:
+                over_budget += 1
+                continue
+            candidate_lines = group_lines(selected + [doc])
+            candidate_text = format_lines(candidate_lines)
+            if rank and estimate_tokens(candidate_text) > budget:
+                # A shorter, less relevant chunk may still fit
+                over_budget += 1
+                continue
+            seen.add(doc.page_content)
+            selected.append(doc)
+            lines, text = candidate_lines, candidate_text
+
+        if estimate_tokens(text) > budget:
+            # The best chunk alone is over budget: keep its head
+            text = truncate_to_tokens(text, budget)
+        return AssembledContext(text, estimate_tokens(text), len(selected), len(scored),
+                                below_cutoff=below_cutoff, over_budget=over_budget,
+                                merged=len(selected) - len(lines))
+
+
+def group_lines(docs: List["Document"]) -> List[str]:
+    # One entry per leaf (overlapping split pieces stitched back together); leaves under the same
+    # parent path share one line, so "pricing > basic_plan > " is written once:
+    #   pricing > basic_plan: price: $29/month; features: 720p resolution, Standard support
+    # A parent with a single key keeps the plain "path > key: value" form. Lines keep the order
+    # of their best chunk
+    leaves: Dict[str, List["Document"]] = {}
+    for doc in docs:
+        leaves.setdefault(doc.metadata.get("path") or doc.page_content, []).append(doc)
+
+    groups: Dict[str, Dict[str, List[str]]] = {}
+    lines: List[Tuple[str, Optional[Dict[str, List[str]]]]] = []
+    for pieces in leaves.values():
+        text = stitch_pieces(pieces)
+        parent, key = _leaf_key(pieces[0].metadata)
+        prefix = f"{parent} > {key}: " if parent else f"{key}: "
+        if key is None or not text.startswith(prefix):
+            lines.append((text, None))
+            continue
+        group = groups.get(parent)    #type:ignore
+        if group is None:
+            group = groups[parent] = {}    #type:ignore
+            lines.append((parent, group))    #type:ignore
+        group.setdefault(key, []).append(text[len(prefix):])
+
+    rendered = []
+    for text, group in lines:
+        if group is None:
+            rendered.append(text)
+        elif len(group) == 1:
+            key, values = next(iter(group.items()))
+            rendered.append(f"{text} > {key}: {', '.join(values)}" if text else f"{key}: {', '.join(values)}")
+        else:
+            entries = "; ".join(f"{key}: {', '.join(values)}" for key, values in group.items())
+            rendered.append(f"{text}: {entries}" if text else entries)
+    return rendered
+
+
+def _leaf_key(metadata: Dict) -> Tuple[str, Optional[str]]:
+    # (parent path, key) of a knowledge base leaf. Dict values carry their key; list items only
+    # their list's path, whose last element is the key
+    category = metadata.get("category")
+    if category is None:
+        return "", None
+    if "key" in metadata:
+        return category, str(metadata["key"])
+    if "index" in metadata and category:
+        parent, _, key = category.rpartition(" > ")
+        return parent, key
+    return "", None
+
+
+def stitch_pieces(pieces: List["Document"]) -> str:
+    # Pieces of one leaf in split order; consecutive pieces lose the overlap the splitter repeated
+    pieces = sorted(pieces, key=lambda doc: doc.metadata.get("id", 0))
+    text = pieces[0].page_content
+    for previous, piece in zip(pieces, pieces[1:]):
+        if piece.metadata.get("id") == previous.metadata.get("id", -2) + 1:
+            overlap = _overlap(text, piece.page_content)
+            if overlap:
+                text += piece.page_content[overlap:]
+            else:
+                # Whitespace at the cut was stripped; a piece starting at ". " needs none back
+                text += (" " if piece.page_content[:1].isalnum() else "") + piece.page_content
+        else:
+            text += " ... " + piece.page_content
+    return text
+
+
+def _overlap(left: str, right: str, limit: int = 64) -> int:
+    # Longest prefix of `right` that ends `left`, on word boundaries (the splitter overlaps whole
+    # splits). 0 when the pieces just abut, e.g. a piece starting at a ". " separator
+    for size in range(min(limit, len(left), len(right)), 3, -1):
+        if (left.endswith(right[:size])
+                and (size == len(left) or not left[-size - 1].isalnum())
+                and (size == len(right) or not right[size].isalnum())):
+            return size
+    return 0
+
+
+def format_lines(lines: List[str]) -> str:
+    if not lines:
+        return "No info found."
+    return CONTEXT_HEADER + "".join(f"{i}. {line}\n" for i, line in enumerate(lines, 1))
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit - 3)
+    return text[:cut if cut > 0 else limit - 3].rstrip() + "..."
+
+
+_assembler_instance = None
+
+def get_context_assembler() -> Optional[ContextAssembler]:
+    # None: CONTEXT_ASSEMBLY=false, the previous fixed k=2 context
+    global _assembler_instance
+    if os.getenv("CONTEXT_ASSEMBLY", "true").lower() != "true":
+        return None
+    if _assembler_instance is None:
+        _assembler_instance = ContextAssembler(
+            budgets=parse_token_budgets(os.getenv("CONTEXT_TOKEN_BUDGETS")),
+            min_relevance=float(os.getenv("CONTEXT_MIN_RELEVANCE", "0.6")),
+            max_chunks=int(os.getenv("CONTEXT_MAX_CHUNKS", "8")),
+            candidates=int(os.getenv("CONTEXT_CANDIDATES", "10"))
+        )
+    return _assembler_instance
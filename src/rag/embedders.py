@@ -0,0 +1,159 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+# Embedding backends. Each one has an id that goes into the knowledge base hash, so an index
+# built by one backend is never searched with query vectors from another: switching
+# EMBEDDING_BACKEND (or dropping in a different ONNX export) rebuilds the index on next load.
+#
+#   torch  sentence-transformers via HuggingFaceEmbeddings (fp32, pulls in the torch stack)
+#   onnx   an exported int8 MiniLM run by ONNX Runtime on CPU (scripts/export_onnx.py)
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+
+
+def embedding_backend() -> str:
+    backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"EMBEDDING_BACKEND must be one of {', '.join(EMBEDDING_BACKENDS)}, got {backend!r}")
+    return backend
+
+
+def default_onnx_dir() -> Path:
+    onnx_dir = os.getenv("EMBEDDING_ONNX_DIR")
+    if onnx_dir:
+        return Path(onnx_dir)
+    return Path(__file__).parent / "onnx"
+
+
+def embedder_id(backend: str, model_name: str) -> str:
+    if backend == "torch":
+        # Same id as before backends existed, so existing torch artifacts stay valid
+        return model_name
+    model_path = default_onnx_dir() / ONNX_MODEL_FILE
+    if not model_path.exists():
+        return f"{model_name}|onnx|missing"
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"{model_name}|onnx|{digest.hexdigest()[:16]}"
+
+
+def load_embedder(backend: str, model_name: str):
+    if backend == "onnx":
+        return OnnxEmbeddings(default_onnx_dir())
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+# One model per (backend, model) per process: every tenant's retriever embeds with the same instance
+_shared_embedders = {}
+_shared_lock = threading.Lock()
+
+def shared_embedder(backend: str, model_name: str):
+    key = (backend, model_name)
+    embedder = _shared_embedders.get(key)
+    if embedder is None:
+        with _shared_lock:
+            embedder = _shared_embedders.get(key)
+            if embedder is None:
+                embedder = _shared_embedders[key] = load_embedder(backend, model_name)
+    return embedder
+
+
+def loaded_embedder(backend: str, model_name: str):
+    # Never triggers a load
+    return _shared_embedders.get((backend, model_name))
+
+
+class OnnxEmbeddings:
+    # Same interface as the LangChain embeddings the retriever uses (embed_documents / embed_query).
+    # Mean pooling + L2 normalisation, matching all-MiniLM-L6-v2's sentence-transformers pipeline.
+    # Token buffers are allocated once at max_batch x max_length; each batch runs on a contiguous
+    # view sized to its longest text, so there is no per-call allocation for the model inputs
+
+    def __init__(self, model_dir, max_length: int = None, max_batch: int = None, threads: int = None):    #type:ignore
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / ONNX_MODEL_FILE
+        tokenizer_path = model_dir / ONNX_TOKENIZER_FILE
+        if not model_path.exists() or not tokenizer_path.exists():
+            raise FileNotFoundError(
+                f"No ONNX embedding model in {model_dir}; export one with scripts/export_onnx.py"
+            )
+
+        self.max_length = max_length or int(os.getenv("EMBEDDING_MAX_LENGTH", "256"))
+        self.max_batch = max_batch or int(os.getenv("EMBEDDING_ONNX_BATCH", "32"))
+        if threads is None:
+            threads = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(self.max_length)
+        # Padding happens in the preallocated buffers, per batch
+        self.tokenizer.no_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        outputs = [o.name for o in self.session.get_outputs()]
+        self._output = "last_hidden_state" if "last_hidden_state" in outputs else outputs[0]
+
+        size = self.max_batch * self.max_length
+        self._input_ids = np.zeros(size, dtype=np.int64)
+        self._attention_mask = np.zeros(size, dtype=np.int64)
+        self._token_type_ids = np.zeros(size, dtype=np.int64)
+        # The buffers are shared, so one batch runs at a time (ORT still uses its intra-op threads)
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        # Batching by length keeps padding (and wasted attention) small for documents
+        order = sorted(range(len(encodings)), key=lambda i: len(encodings[i].ids))
+        vectors: List[np.ndarray] = [None] * len(encodings)    #type:ignore
+        for start in range(0, len(order), self.max_batch):
+            batch = order[start:start + self.max_batch]
+            pooled = self._run([encodings[i] for i in batch])
+            for row, i in enumerate(batch):
+                vectors[i] = pooled[row]
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def _run(self, encodings) -> np.ndarray:
+        rows = len(encodings)
+        width = max(len(e.ids) for e in encodings)
+        with self._lock:
+            input_ids = self._input_ids[:rows * width].reshape(rows, width)
+            attention_mask = self._attention_mask[:rows * width].reshape(rows, width)
+            token_type_ids = self._token_type_ids[:rows * width].reshape(rows, width)
+            input_ids.fill(0)
+            attention_mask.fill(0)
+            token_type_ids.fill(0)
+            for row, encoding in enumerate(encodings):
+                length = len(encoding.ids)
+                input_ids[row, :length] = encoding.ids
+                attention_mask[row, :length] = encoding.attention_mask
+                token_type_ids[row, :length] = encoding.type_ids
+
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": token_type_ids}
+            hidden = self.session.run([self._output], {k: v for k, v in feeds.items() if k in self._input_names})[0]
+            mask = attention_mask[:, :, None].astype(np.float32)
+
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.maximum(norms, 1e-12)).astype(np.float32)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import faiss
+    from langchain_core.documents import Document
+
+
+# Bump whenever the on-disk layout or the chunking parameters change
+# v2: IndexIDMap2 with stable chunk ids; chunk metadata carries id, path and leaf_hash
+INDEX_FORMAT_VERSION = 2
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def default_index_dir() -> Path:
+    index_dir = os.getenv("KB_INDEX_DIR")
+    if index_dir:
+        return Path(index_dir)
+    return Path(__file__).parent / "index"
+
+
+def knowledge_base_hash(knowledge_base_path, model_name: str) -> str:
+    digest = hashlib.sha256()
+    with open(knowledge_base_path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(f"|{model_name}|v{INDEX_FORMAT_VERSION}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_faiss_index(vectors: np.ndarray, ids: np.ndarray) -> "faiss.Index":
+    # Addressed by chunk id rather than position, so hot reloads can remove/add single chunks
+    import faiss
+    index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+    index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    return index
+
+
+def save_index(index_dir: Path, kb_hash: str, model_name: str,
+               index: "faiss.Index", chunks: List["Document"]) -> None:
+    import faiss
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    # Stale until the new manifest lands, so a reader never pairs the old manifest with new files
+    (index_dir / MANIFEST_FILE).unlink(missing_ok=True)
+
+    # Write-then-rename: a running process may have the previous index memory-mapped, and
+    # truncating that file in place would pull the pages out from under it
+    faiss.write_index(index, str(index_dir / (INDEX_FILE + ".tmp")))
+    os.replace(index_dir / (INDEX_FILE + ".tmp"), index_dir / INDEX_FILE)
+
+    with open(index_dir / (CHUNKS_FILE + ".tmp"), 'w') as f:
+        # dumps + write uses the C encoder; json.dump to a file streams through the pure-Python one
+        f.write(json.dumps([{"text": doc.page_content, "metadata": doc.metadata} for doc in chunks]))
+    os.replace(index_dir / (CHUNKS_FILE + ".tmp"), index_dir / CHUNKS_FILE)
+
+    # Manifest is written last so a partially written artifact is never treated as fresh
+    manifest = {
+        "kb_hash": kb_hash,
+        "model_name": model_name,
+        "format_version": INDEX_FORMAT_VERSION,
+        "dimension": index.d,
+        "count": index.ntotal
+    }
+    with open(index_dir / (MANIFEST_FILE + ".tmp"), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(index_dir / (MANIFEST_FILE + ".tmp"), index_dir / MANIFEST_FILE)
+
+
+def load_index(index_dir: Path, kb_hash: str) -> Optional[Tuple["faiss.Index", List["Document"]]]:
+    import faiss
+    from langchain_core.documents import Document
+    index_dir = Path(index_dir)
+    manifest_path = index_dir / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("kb_hash") != kb_hash:
+        return None
+
+    try:
+        index = faiss.read_index(
+            str(index_dir / INDEX_FILE),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        )
+        with open(index_dir / CHUNKS_FILE, 'r') as f:
+            raw_chunks = json.load(f)
+    except (OSError, RuntimeError, ValueError):
+        return None
+
+    if index.ntotal != len(raw_chunks) or any("id" not in c["metadata"] for c in raw_chunks):
+        return None
+
+    chunks = [Document(page_content=c["text"], metadata=c["metadata"]) for c in raw_chunks]
+    return index, chunks
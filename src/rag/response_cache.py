@@ -0,0 +1,186 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def context_hash(context: str) -> str:
+    return hashlib.sha1(context.encode("utf-8")).hexdigest()
+
+
+class SemanticResponseCache:
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # entry id -> (vector, context_hash, answer, generation_seconds, expires_at); LRU ordered
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_id = 0
+        self._matrix = None
+        self._matrix_ids = []
+        self.kb_hash = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.seconds_saved = 0.0
+
+    def lookup(self, vector: np.ndarray, ctx_hash: str, kb_hash: str) -> Optional[str]:
+        with self._lock:
+            self._check_kb(kb_hash)
+            self._expire()
+            entry_id = self._nearest(_normalize(vector), ctx_hash)
+            if entry_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_id)
+            _, _, answer, generation_seconds, _ = self._entries[entry_id]
+            self.hits += 1
+            self.seconds_saved += generation_seconds
+            return answer
+
+    def put(self, vector: np.ndarray, ctx_hash: str, kb_hash: str, answer: str, generation_seconds: float) -> None:
+        with self._lock:
+            self._check_kb(kb_hash)
+            self._entries[self._next_id] = (
+                _normalize(vector), ctx_hash, answer, generation_seconds, time.monotonic() + self.ttl_seconds
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "seconds_saved": self.seconds_saved
+            }
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(entry[0].nbytes + len(entry[2]) + 250 for entry in self._entries.values())
+
+    def _check_kb(self, kb_hash: str) -> None:
+        # Answers are only valid for the knowledge base they were generated from
+        if kb_hash != self.kb_hash:
+            self._entries.clear()
+            self._matrix = None
+            self.kb_hash = kb_hash
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry[4] <= now]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            self.evictions += len(expired)
+            self._matrix = None
+
+    def _nearest(self, vector: np.ndarray, ctx_hash: str) -> Optional[int]:
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[i][0] for i in self._matrix_ids])
+
+        similarities = self._matrix @ vector
+        # Best match that was answered from the same retrieved context
+        for position in np.argsort(-similarities):
+            if similarities[position] < self.threshold:
+                return None
+            entry_id = self._matrix_ids[position]
+            if self._entries[entry_id][1] == ctx_hash:
+                return entry_id
+        return None
+
+
+class ContextCache:
+    # Formatted retrieval context per normalised query, valid for one knowledge base version
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self.kb_hash = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, kb_hash: str) -> Optional[str]:
+        with self._lock:
+            if kb_hash != self.kb_hash:
+                self._entries.clear()
+                self.kb_hash = kb_hash
+            context = self._entries.get(key)
+            if context is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return context
+
+    def put(self, key: str, kb_hash: str, context: str) -> None:
+        with self._lock:
+            if kb_hash != self.kb_hash:
+                return
+            self._entries[key] = context
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(len(key) + len(context) + 150 for key, context in self._entries.items())
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+def new_response_cache() -> Optional[SemanticResponseCache]:
+    if os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    return SemanticResponseCache(
+        threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92")),
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+        ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+    )
+
+
+_cache_instance = None
+
+def get_response_cache() -> Optional[SemanticResponseCache]:
+    # The default tenant's cache; other tenants get their own from the tenant registry
+    global _cache_instance
+    if os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _cache_instance is None:
+        _cache_instance = new_response_cache()
+    return _cache_instance
@@ -1,111 +1,542 @@
+import hashlib
 import json
+import logging
 import os
-from typing import List, Dict
+import threading
+import time
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 from pathlib import Path
 
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+import numpy as np
+
+from rag.bm25 import BM25Index, reciprocal_rank_fusion
+from rag.context import format_lines
+from rag.embedders import embedder_id, embedding_backend, loaded_embedder, shared_embedder
+from rag.embedding_cache import MicroBatchEmbedder, QueryEmbeddingCache, normalize_query
+from utils.log import get_logger, log_event
+from utils.tracing import count_cache, span
+from rag.index_store import (
+    build_faiss_index,
+    default_index_dir,
+    knowledge_base_hash,
+    load_index,
+    save_index
+)
+
+# FAISS, the text splitter and the embedding model are imported where they are first needed,
+# so importing this module (e.g. for the API's health endpoints) stays cheap
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+logger = get_logger("sociolead.rag")
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class IndexSnapshot:
+    # Everything retrieve() reads. A hot reload builds a new snapshot and swaps the reference,
+    # so in-flight searches finish on the one they started with and never wait on a lock
+
+    def __init__(self, kb_hash: str, index, chunks: List["Document"]):
+        self.kb_hash = kb_hash
+        self.index = index
+        self.chunks = chunks
+        self.bm25 = BM25Index([doc.page_content for doc in chunks])
+        # FAISS returns chunk ids; BM25 and fusion work on positions in `chunks`
+        self.positions = {doc.metadata["id"]: i for i, doc in enumerate(chunks)}
 
 
 class KnowledgeBaseRetriever:
     
-    def __init__(self, knowledge_base_path: str = None):    #type:ignore
+    def __init__(self, knowledge_base_path: str = None, index_dir: str = None,    #type:ignore
+                 use_prebuilt: bool = True, embeddings=None,
+                 query_cache_size: int = None, batch_window_ms: float = None,    #type:ignore
+                 mode: str = None, defer_embeddings: bool = False,    #type:ignore
+                 backend: str = None, query_cache: QueryEmbeddingCache = None):    #type:ignore
         if knowledge_base_path is None:
             # Default to knowledge_base.json in same directory
             current_dir = Path(__file__).parent
             knowledge_base_path = current_dir / "knowledge_base.json"
         
         self.knowledge_base_path = knowledge_base_path
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
-        self.vector_store = None
+        self.index_dir = Path(index_dir) if index_dir else default_index_dir()
+        self.use_prebuilt = use_prebuilt
+        self.model_name = DEFAULT_EMBEDDING_MODEL
+        # torch or onnx (EMBEDDING_BACKEND); the embedder id is part of kb_hash, so index and
+        # query vectors always come from the same backend
+        self.backend = backend or embedding_backend()
+        self.embedder_id = embedder_id(self.backend, self.model_name)
+        self.embeddings = None
+        self._snapshot: Optional[IndexSnapshot] = None
+        self.loaded_from_disk = False
+        # hybrid (dense + BM25 fused), dense, or lexical
+        self.mode = mode or os.getenv("RETRIEVAL_MODE", "hybrid")
+        self._reload_lock = threading.Lock()
+        self._watch_stop = threading.Event()
+        self._watch_thread = None
+        self.reloads = 0
+        self.last_reload: Optional[Dict] = None
+        
+        if query_cache_size is None:
+            query_cache_size = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+        if batch_window_ms is None:
+            batch_window_ms = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+        # Size 0 / window 0 disable the query cache / micro-batching respectively. Query vectors only
+        # depend on the model, so tenants of one registry pass in a shared cache
+        if query_cache is None and query_cache_size > 0:
+            query_cache = QueryEmbeddingCache(query_cache_size)
+        self.query_cache = query_cache
+        self.batch_window_ms = batch_window_ms
+        self.batcher = None
+        self._embeddings_lock = threading.Lock()
+        self._embeddings_thread = None
+        
+        if embeddings is not None:
+            self._attach_embeddings(embeddings)
+        elif not defer_embeddings:
+            self.load_embeddings()
+        else:
+            self._attach_loaded_embeddings()
+        
         self._load_knowledge_base()
     
 
+    @property
+    def kb_hash(self) -> Optional[str]:
+        return self._snapshot.kb_hash if self._snapshot else None
+    
+
+    @property
+    def index(self):
+        return self._snapshot.index if self._snapshot else None
+    
+
+    @property
+    def chunks(self) -> List["Document"]:
+        return self._snapshot.chunks if self._snapshot else []
+    
+
+    @property
+    def bm25(self) -> Optional[BM25Index]:
+        return self._snapshot.bm25 if self._snapshot else None
+    
+
+    @property
+    def embeddings_ready(self) -> bool:
+        return self.embeddings is not None
+    
+
+    def load_embeddings(self):
+        with self._embeddings_lock:
+            if self.embeddings is None:
+                self._attach_embeddings(shared_embedder(self.backend, self.model_name))
+        return self.embeddings
+    
+
+    def load_embeddings_in_background(self) -> None:
+        # Until the model is loaded, retrieve() serves lexical (BM25) results
+        if self._attach_loaded_embeddings():
+            return
+        with self._embeddings_lock:
+            if self.embeddings is not None or self._embeddings_thread is not None:
+                return
+            self._embeddings_thread = threading.Thread(
+                target=self._load_embeddings_quietly, name="embedding-model-loader", daemon=True
+            )
+            self._embeddings_thread.start()
+    
+
+    def _load_embeddings_quietly(self) -> None:
+        try:
+            self.load_embeddings()
+        except Exception as e:
+            # Stays lexical-only; the warmup status / stats() show embeddings_ready=False
+            log_event(logger, "embedding_model_unavailable", level=logging.WARNING, model=self.model_name,
+                      error=str(e))
+    
+
+    def _attach_loaded_embeddings(self) -> bool:
+        # Another retriever (tenant) may already have loaded the shared model
+        embeddings = loaded_embedder(self.backend, self.model_name)
+        if embeddings is not None and self.embeddings is None:
+            with self._embeddings_lock:
+                if self.embeddings is None:
+                    self._attach_embeddings(embeddings)
+        return self.embeddings is not None
+    
+
+    def _attach_embeddings(self, embeddings) -> None:
+        if self.batch_window_ms > 0:
+            self.batcher = _shared_batcher(embeddings, self.batch_window_ms)
+        self.embeddings = embeddings
+    
+
     def _load_knowledge_base(self):
+        kb_hash = knowledge_base_hash(self.knowledge_base_path, self.embedder_id)
+        
+        # Prebuilt artifact is only trusted when it was built from this exact JSON and model
+        if self.use_prebuilt:
+            loaded = load_index(self.index_dir, kb_hash)
+            if loaded is not None:
+                self._snapshot = IndexSnapshot(kb_hash, *loaded)
+                self.loaded_from_disk = True
+                return
+        
+        index, chunks = self.build_index()
+        self._snapshot = IndexSnapshot(kb_hash, index, chunks)
+        self._persist()
+    
+
+    def _persist(self) -> None:
+        if not self.use_prebuilt:
+            return
+        snapshot = self._snapshot
+        try:
+            save_index(self.index_dir, snapshot.kb_hash, self.embedder_id, snapshot.index, snapshot.chunks)
+        except OSError as e:
+            # Read-only filesystems (e.g. Lambda outside /tmp) just skip persisting
+            log_event(logger, "kb_index_not_persisted", level=logging.WARNING, index_dir=str(self.index_dir),
+                      error=str(e))
+    
+
+    def build_index(self):
+        # A stale or missing artifact has to be re-embedded, so the model is needed now
+        self.load_embeddings()
+        split_docs = self._split_documents()
+        for chunk_id, doc in enumerate(split_docs):
+            doc.metadata["id"] = chunk_id
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in split_docs])
+        index = build_faiss_index(np.asarray(vectors, dtype=np.float32), np.arange(len(split_docs)))
+        return index, split_docs
+    
+
+    def _split_documents(self) -> List["Document"]:
+        # Split documents for better retrieval (optimized for token efficiency)
+        return self._text_splitter().split_documents(self._leaf_documents())
+    
+
+    def _leaf_documents(self) -> List["Document"]:
         # Load JSON data
         with open(self.knowledge_base_path, 'r') as f:
             kb_data = json.load(f)
         
         # Convert to documents
-        documents = self._create_documents(kb_data)
-        
-        # Split documents for better retrieval (optimized for token efficiency)
-        text_splitter = RecursiveCharacterTextSplitter(
+        return self._create_documents(kb_data)
+    
+
+    @staticmethod
+    def _text_splitter():
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        return RecursiveCharacterTextSplitter(
             chunk_size=300,
             chunk_overlap=30,
             separators=["\n\n", "\n", ". ", " ", ""]
         )
-        split_docs = text_splitter.split_documents(documents)
-        
-        # Create vector store
-        self.vector_store = FAISS.from_documents(split_docs, self.embeddings)
     
 
-    def _create_documents(self, data: Dict, prefix: str = "") -> List[Document]:
+    def _create_documents(self, data: Dict, prefix: str = "", path: str = "") -> List["Document"]:
+        from langchain_core.documents import Document
+        
         documents = []
         
+        # `path` addresses each leaf (list positions included) so hot reloads can diff leaves
         if isinstance(data, dict):
             for key, value in data.items():
                 current_prefix = f"{prefix} > {key}" if prefix else key
+                current_path = f"{path}/{key}"
                 
                 if isinstance(value, (dict, list)):
                     # Recursively process nested structures
-                    documents.extend(self._create_documents(value, current_prefix)) #type:ignore
+                    documents.extend(self._create_documents(value, current_prefix, current_path)) #type:ignore
                 else:
                     # Create document for leaf values
                     content = f"{current_prefix}: {value}"
                     documents.append(Document(
                         page_content=content,
-                        metadata={"category": prefix, "key": key}
+                        metadata={"category": prefix, "key": key, **_leaf_metadata(current_path, content)}
                     ))
         
         elif isinstance(data, list):
             for i, item in enumerate(data):
                 if isinstance(item, (dict, list)):
-                    documents.extend(self._create_documents(item, prefix))
+                    documents.extend(self._create_documents(item, prefix, f"{path}/{i}"))
                 else:
                     content = f"{prefix}: {item}"
                     documents.append(Document(
                         page_content=content,
-                        metadata={"category": prefix, "index": i}
+                        metadata={"category": prefix, "index": i, **_leaf_metadata(f"{path}/{i}", content)}
                     ))
         
         return documents
     
 
-    def retrieve(self, query: str, k: int = 2) -> List[str]:
-        if self.vector_store is None:
-            return []
+    def reload(self) -> Dict:
+        # Incremental: leaves whose path and content hash are unchanged keep their chunks and
+        # vectors; only added/changed leaves are split and embedded. The FAISS changes go into a
+        # clone, and the new snapshot replaces the old one in a single assignment.
+        with self._reload_lock:
+            start = time.perf_counter()
+            snapshot = self._snapshot
+            kb_hash = knowledge_base_hash(self.knowledge_base_path, self.embedder_id)
+            if kb_hash == snapshot.kb_hash:
+                return {"changed": False}
+            
+            leaves = self._leaf_documents()
+            previous: Dict[tuple, List["Document"]] = {}
+            for doc in snapshot.chunks:
+                previous.setdefault((doc.metadata["path"], doc.metadata["leaf_hash"]), []).append(doc)
+            
+            splitter = None
+            next_id = max(snapshot.positions, default=-1) + 1
+            chunks: List["Document"] = []
+            added: List["Document"] = []
+            for leaf in leaves:
+                kept = previous.pop((leaf.metadata["path"], leaf.metadata["leaf_hash"]), None)
+                if kept is not None:
+                    chunks.extend(kept)
+                    continue
+                splitter = splitter or self._text_splitter()
+                for doc in splitter.split_documents([leaf]):
+                    doc.metadata["id"] = next_id
+                    next_id += 1
+                    chunks.append(doc)
+                    added.append(doc)
+            removed = [doc for docs in previous.values() for doc in docs]
+            
+            # A list insert shifts the paths of the items after it; their text (and vector) is unchanged
+            removed_vectors = {doc.page_content: doc.metadata["id"] for doc in removed}
+            reused = [doc for doc in added if doc.page_content in removed_vectors]
+            to_embed = [doc for doc in added if doc.page_content not in removed_vectors]
+            
+            import faiss
+            index = faiss.clone_index(snapshot.index)
+            if reused:
+                vectors = np.stack([snapshot.index.reconstruct(removed_vectors[doc.page_content]) for doc in reused])
+                index.add_with_ids(vectors, np.asarray([doc.metadata["id"] for doc in reused], dtype=np.int64))
+            if removed:
+                index.remove_ids(np.asarray([doc.metadata["id"] for doc in removed], dtype=np.int64))
+            if to_embed:
+                self.load_embeddings()
+                vectors = self.embeddings.embed_documents([doc.page_content for doc in to_embed])
+                index.add_with_ids(np.asarray(vectors, dtype=np.float32),
+                                   np.asarray([doc.metadata["id"] for doc in to_embed], dtype=np.int64))
+            
+            self._snapshot = IndexSnapshot(kb_hash, index, chunks)
+            self.reloads += 1
+            self.last_reload = {
+                "added": len(added),
+                "removed": len(removed),
+                "embedded": len(to_embed),
+                "kept": len(chunks) - len(added),
+                "seconds": round(time.perf_counter() - start, 4)
+            }
+            # Already serving the new snapshot; the artifact is refreshed for the next cold start
+            self._persist()
+            return {"changed": True, **self.last_reload}
+    
+
+    def watch(self, interval: float = 2.0) -> None:
+        # Polls the file's mtime/size (no watcher dependency); changes are reloaded off the request path
+        with self._reload_lock:
+            if self._watch_thread is not None:
+                return
+            self._watch_stop.clear()
+            self._watch_thread = threading.Thread(
+                target=self._watch_loop, args=(interval,), name="knowledge-base-watcher", daemon=True
+            )
+            self._watch_thread.start()
+    
+
+    def stop_watching(self) -> None:
+        self._watch_stop.set()
+        thread, self._watch_thread = self._watch_thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+    
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.knowledge_base_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+
+    def _watch_loop(self, interval: float) -> None:
+        last = self._file_signature()
+        while not self._watch_stop.wait(interval):
+            signature = self._file_signature()
+            if signature is None or signature == last:
+                continue
+            last = signature
+            try:
+                result = self.reload()
+            except Exception as e:
+                # e.g. invalid JSON mid-edit: keep serving the previous snapshot until the next change
+                log_event(logger, "kb_reload_failed", level=logging.WARNING, error=str(e))
+                continue
+            if result["changed"]:
+                log_event(logger, "kb_reloaded", sampled=False, added=result["added"], removed=result["removed"],
+                          embedded=result["embedded"], seconds=round(result["seconds"], 3))
+    
+
+    def embed_query(self, query: str) -> np.ndarray:
+        if self.embeddings is None:
+            self.load_embeddings()
+        key = normalize_query(query)
+        if self.query_cache is not None:
+            vector = self.query_cache.get(key)
+            count_cache("query_embedding", vector is not None)
+            if vector is not None:
+                return vector
         
-        # Perform similarity search
-        results = self.vector_store.similarity_search(query, k=k)
+        with span("op", "embed_query"):
+            if self.batcher is not None:
+                vector = self.batcher.embed(key)
+            else:
+                vector = np.asarray(self.embeddings.embed_query(key), dtype=np.float32)
         
-        # Extract content
-        return [doc.page_content for doc in results]
+        if self.query_cache is not None:
+            self.query_cache.put(key, vector)
+        return vector
     
 
-    def get_context(self, query: str) -> str:
-        relevant_docs = self.retrieve(query, k=2)
+    def retrieve(self, query: str, k: int = 2, query_vector: np.ndarray = None) -> List[str]:    #type:ignore
+        return [doc.page_content for doc, _ in self.retrieve_scored(query, k, query_vector)]
+    
+
+    def retrieve_scored(self, query: str, k: int = 2,
+                        query_vector: np.ndarray = None) -> List[Tuple["Document", float]]:    #type:ignore
+        # Ranked chunks with a relevance in [0, 1] relative to the best match of each signal, so a
+        # caller can cut off weak matches instead of always taking k. One snapshot for the whole
+        # call, even if a reload swaps in a new one meanwhile
+        snapshot = self._snapshot
+        if snapshot is None or not snapshot.chunks:
+            return []
         
-        if not relevant_docs:
-            return "No info found."
+        mode = self.mode
+        if (self.embeddings is None and query_vector is None) or snapshot.index is None:
+            # Pure lexical until the embedding model is available
+            self.load_embeddings_in_background()
+            mode = "lexical"
         
-        context = "AutoStream info:\n"
-        for i, doc in enumerate(relevant_docs, 1):
-            context += f"{i}. {doc}\n"
+        if mode == "lexical":
+            with span("op", "bm25_search"):
+                hits = snapshot.bm25.search(query, k)
+            return [(snapshot.chunks[i], relevance) for i, relevance in _relative(hits)]
         
-        return context
+        if query_vector is None:
+            query_vector = self.embed_query(query)
+        if mode == "dense":
+            hits = self._dense_search(snapshot, query_vector, k)
+            # Without a usable score every hit counts as relevant, i.e. plain top-k
+            scores = _relative(hits) or [(i, 1.0) for i, _ in hits]
+            return [(snapshot.chunks[i], relevance) for i, relevance in scores]
+        
+        # Fuse deeper candidate lists so exact-term hits ("720p") can outrank near-misses
+        depth = max(k * 5, 10)
+        dense = self._dense_search(snapshot, query_vector, depth)
+        with span("op", "bm25_search"):
+            lexical = snapshot.bm25.search(query, depth)
+        positions = reciprocal_rank_fusion([[i for i, _ in dense], [i for i, _ in lexical]])[:k]
+        
+        # RRF only ranks; relevance averages each signal's own score. A chunk missing from a full
+        # list scores at most that list's weakest entry. Uninformative signals (no term matches,
+        # vectors that are not unit length) are left out
+        signals = []
+        for hits, full in ((dense, len(dense) == depth), (lexical, len(lexical) == depth)):
+            scores = dict(_relative(hits))
+            if scores:
+                signals.append((scores, min(scores.values()) if full else 0.0))
+        return [
+            (snapshot.chunks[i],
+             sum(scores.get(i, floor) for scores, floor in signals) / len(signals) if signals else 1.0)
+            for i in positions
+        ]
+    
+
+    def _dense_search(self, snapshot: IndexSnapshot, query_vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        with span("op", "faiss_search"):
+            distances, ids = snapshot.index.search(query_vector.reshape(1, -1), min(k, len(snapshot.chunks)))
+        # Squared L2 between unit vectors: cosine = 1 - d / 2
+        return [(snapshot.positions[int(i)], 1.0 - float(d) / 2) for d, i in zip(distances[0], ids[0]) if i >= 0]
+    
+
+    def stats(self) -> Dict:
+        return {
+            "chunks": len(self.chunks),
+            "mode": self.mode,
+            "loaded_from_disk": self.loaded_from_disk,
+            "embeddings_ready": self.embeddings_ready,
+            "embedding_backend": self.backend,
+            "query_cache": self.query_cache.stats() if self.query_cache else None,
+            "embed_batches": self.batcher.batches if self.batcher else 0,
+            "embedded_queries": self.batcher.embedded if self.batcher else 0,
+            "reloads": self.reloads,
+            "last_reload": self.last_reload
+        }
+    
+
+    def nbytes(self) -> int:
+        # Approximate resident size of the current snapshot, for the tenant registry's memory budget.
+        # Counts the FAISS vectors even when memory-mapped: every page is touched by a flat search
+        snapshot = self._snapshot
+        if snapshot is None:
+            return 0
+        size = 0
+        if snapshot.index is not None:
+            size += snapshot.index.ntotal * (snapshot.index.d * 4 + 8)
+        size += sum(len(doc.page_content) + 200 for doc in snapshot.chunks)
+        bm25 = snapshot.bm25
+        size += bm25.offsets.nbytes + bm25.doc_ids.nbytes + bm25.weights.nbytes + len(bm25.vocabulary) * 100
+        return size
+    
+
+    def get_context(self, query: str) -> str:
+        return self.format_context(self.retrieve(query, k=2))
+    
+
+    @staticmethod
+    def format_context(relevant_docs: List[str]) -> str:
+        return format_lines(relevant_docs)
+
+
+def _relative(hits: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+    # Scores relative to the best hit; empty when the best is not positive (nothing to compare to)
+    if not hits or hits[0][1] <= 0:
+        return []
+    top = hits[0][1]
+    return [(i, max(score, 0.0) / top) for i, score in hits]
+
+
+def _leaf_metadata(path: str, content: str) -> Dict[str, str]:
+    return {"path": path, "leaf_hash": hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]}
+
+
+# Micro-batchers are per model, not per retriever: tenants sharing a model share its batch worker
+_batchers: Dict[tuple, MicroBatchEmbedder] = {}
+_batchers_lock = threading.Lock()
+
+def _shared_batcher(embeddings, window_ms: float) -> MicroBatchEmbedder:
+    key = (id(embeddings), window_ms)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None or batcher.embeddings is not embeddings:
+            batcher = _batchers[key] = MicroBatchEmbedder(
+                embeddings, window_ms=window_ms, max_batch=int(os.getenv("EMBED_MAX_BATCH", "32"))
+            )
+        return batcher
+
 
+def loaded_retriever() -> Optional[KnowledgeBaseRetriever]:
+    # For metrics: the default tenant's retriever, never triggers the (slow) first load
+    from rag.tenants import get_tenant_registry
+    tenant = get_tenant_registry().loaded()
+    return tenant.retriever if tenant else None
 
-# Singleton instance for reuse
-_retriever_instance = None
 
-def get_retriever() -> KnowledgeBaseRetriever:
-    global _retriever_instance
-    if _retriever_instance is None:
-        _retriever_instance = KnowledgeBaseRetriever()
-    return _retriever_instance
+def get_retriever(tenant_id: str = None) -> KnowledgeBaseRetriever:    #type:ignore
+    # Retrievers live in the tenant registry; without a tenant id this is the bundled knowledge base
+    from rag.tenants import get_tenant_registry
+    return get_tenant_registry().get(tenant_id).retriever
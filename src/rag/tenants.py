@@ -0,0 +1,217 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from rag.context import get_context_assembler
+from rag.embedding_cache import QueryEmbeddingCache, normalize_query
+from rag.response_cache import ContextCache, SemanticResponseCache, get_response_cache, new_response_cache
+from utils.tracing import span
+
+if TYPE_CHECKING:
+    from rag.retriever import KnowledgeBaseRetriever
+
+
+DEFAULT_TENANT = "default"
+KNOWLEDGE_BASE_FILE = "knowledge_base.json"
+# Tenant ids become directory names and session-key prefixes, so no separators or dots
+TENANT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class TenantError(Exception):
+    status_code = 400
+
+
+class UnknownTenantError(TenantError):
+    status_code = 404
+
+
+class Tenant:
+    # Everything that is per brand: its knowledge base index and the caches derived from it.
+    # The embedding model, micro-batcher and query-embedding cache are shared by all tenants
+
+    def __init__(self, tenant_id: str, retriever: "KnowledgeBaseRetriever",
+                 response_cache: Optional[SemanticResponseCache], context_cache: Optional[ContextCache]):
+        self.tenant_id = tenant_id
+        self.retriever = retriever
+        self.response_cache = response_cache
+        self.context_cache = context_cache
+
+    def context(self, query: str, query_vector: Optional[np.ndarray], intent: Optional[str] = None) -> str:
+        # Lexical fallback results (model still loading) are not cached
+        if self.context_cache is None or query_vector is None:
+            return self._assemble(query, query_vector, intent)
+        # The budget depends on the intent, so it is part of the key
+        key = f"{intent or ''}\x00{normalize_query(query)}"
+        kb_hash = self.retriever.kb_hash
+        context = self.context_cache.get(key, kb_hash)
+        if context is None:
+            context = self._assemble(query, query_vector, intent)
+            self.context_cache.put(key, kb_hash, context)
+        return context
+
+    def _assemble(self, query: str, query_vector: Optional[np.ndarray], intent: Optional[str]) -> str:
+        retriever = self.retriever
+        assembler = get_context_assembler()
+        if assembler is None:
+            return retriever.format_context(retriever.retrieve(query, k=2, query_vector=query_vector))
+        with span("op", "assemble_context") as attrs:
+            assembled = assembler.assemble(retriever, query, intent, query_vector)
+            attrs.update(tokens=assembled.tokens, chunks=assembled.chunks, candidates=assembled.candidates)
+        return assembled.text
+
+    def nbytes(self) -> int:
+        size = self.retriever.nbytes()
+        if self.response_cache is not None:
+            size += self.response_cache.nbytes()
+        if self.context_cache is not None:
+            size += self.context_cache.nbytes()
+        return size
+
+
+class TenantRegistry:
+    # Tenants are loaded on first use from <tenants_dir>/<tenant_id>/knowledge_base.json and kept
+    # in LRU order; after each load, least recently used tenants are dropped until the estimated
+    # total fits memory_budget_bytes. The bundled knowledge base is the "default" tenant.
+
+    def __init__(self, tenants_dir: str = None, index_dir: str = None, embeddings=None,    #type:ignore
+                 memory_budget_bytes: int = 1 << 30, query_cache_size: int = 1024, context_cache_size: int = 256):
+        self.tenants_dir = Path(tenants_dir) if tenants_dir else None
+        # Default tenant's index dir; other tenants go under <index_dir>/tenants/<id>
+        self.index_dir = Path(index_dir) if index_dir else None
+        # None: the shared model for EMBEDDING_BACKEND, loaded on first need
+        self.embeddings = embeddings
+        self.memory_budget_bytes = memory_budget_bytes
+        self.context_cache_size = context_cache_size
+        self.query_cache = QueryEmbeddingCache(query_cache_size) if query_cache_size > 0 else None
+        self._lock = threading.Lock()
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+        # One lock per tenant being loaded, so concurrent first requests load it once
+        self._loading: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    @property
+    def multi_tenant(self) -> bool:
+        return self.tenants_dir is not None
+
+    def resolve(self, tenant_id: Optional[str]) -> str:
+        if not tenant_id or tenant_id == DEFAULT_TENANT:
+            return DEFAULT_TENANT
+        if not TENANT_ID_RE.match(tenant_id):
+            raise TenantError(f"Invalid tenant id: {tenant_id!r}")
+        if self.tenants_dir is None or not (self.tenants_dir / tenant_id / KNOWLEDGE_BASE_FILE).exists():
+            raise UnknownTenantError(f"Unknown tenant: {tenant_id}")
+        return tenant_id
+
+    def get(self, tenant_id: Optional[str] = None) -> Tenant:
+        tenant_id = self.resolve(tenant_id)
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                self._tenants.move_to_end(tenant_id)
+                return tenant
+            load_lock = self._loading.setdefault(tenant_id, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                tenant = self._tenants.get(tenant_id)
+                if tenant is not None:
+                    self._tenants.move_to_end(tenant_id)
+                    return tenant
+
+            start = time.perf_counter()
+            tenant = self._load(tenant_id)
+            with self._lock:
+                self._tenants[tenant_id] = tenant
+                self._loading.pop(tenant_id, None)
+                self.loads += 1
+                self.load_seconds += time.perf_counter() - start
+                evicted = self._evict(keep=tenant_id)
+
+        # Requests still holding an evicted tenant finish on it; it is freed when they let go
+        for old in evicted:
+            old.retriever.stop_watching()
+        return tenant
+
+    def loaded(self, tenant_id: str = DEFAULT_TENANT) -> Optional[Tenant]:
+        # Never triggers a load
+        return self._tenants.get(tenant_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tenants = list(self._tenants.values())
+            stats = {
+                "loaded": len(tenants),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "load_seconds": self.load_seconds,
+                "memory_budget_bytes": self.memory_budget_bytes
+            }
+        stats["bytes"] = sum(tenant.nbytes() for tenant in tenants)
+        stats["query_cache"] = self.query_cache.stats() if self.query_cache else None
+        return stats
+
+    def _load(self, tenant_id: str) -> Tenant:
+        from rag.retriever import KnowledgeBaseRetriever
+        if tenant_id == DEFAULT_TENANT:
+            retriever = KnowledgeBaseRetriever(index_dir=self.index_dir, embeddings=self.embeddings,    #type:ignore
+                                               defer_embeddings=True, query_cache=self.query_cache)
+            response_cache = get_response_cache()
+        else:
+            retriever = KnowledgeBaseRetriever(
+                self.tenants_dir / tenant_id / KNOWLEDGE_BASE_FILE, index_dir=self._index_dir(tenant_id),    #type:ignore
+                embeddings=self.embeddings, defer_embeddings=True, query_cache=self.query_cache
+            )
+            response_cache = new_response_cache()
+        if os.getenv("KB_HOT_RELOAD", "false").lower() == "true":
+            retriever.watch(float(os.getenv("KB_RELOAD_INTERVAL_SECONDS", "2")))
+        context_cache = ContextCache(self.context_cache_size) if self.context_cache_size > 0 else None
+        return Tenant(tenant_id, retriever, response_cache, context_cache)
+
+    def _index_dir(self, tenant_id: str) -> Path:
+        root = self.index_dir or (Path(os.environ["KB_INDEX_DIR"]) if os.getenv("KB_INDEX_DIR") else None)
+        if root is not None:
+            return root / "tenants" / tenant_id
+        return self.tenants_dir / tenant_id / "index"    #type:ignore
+
+    def _evict(self, keep: str) -> List[Tenant]:
+        evicted = []
+        total = sum(tenant.nbytes() for tenant in self._tenants.values())
+        for tenant_id in list(self._tenants):
+            if total <= self.memory_budget_bytes:
+                break
+            if tenant_id == keep:
+                continue
+            tenant = self._tenants.pop(tenant_id)
+            total -= tenant.nbytes()
+            evicted.append(tenant)
+            self.evictions += 1
+        return evicted
+
+
+_registry_instance = None
+_registry_lock = threading.Lock()
+
+def get_tenant_registry() -> TenantRegistry:
+    global _registry_instance
+    if _registry_instance is None:
+        with _registry_lock:
+            if _registry_instance is None:
+                _registry_instance = TenantRegistry(
+                    tenants_dir=os.getenv("TENANTS_DIR") or None,    #type:ignore
+                    memory_budget_bytes=int(float(os.getenv("TENANT_MEMORY_BUDGET_MB", "1024")) * (1 << 20)),
+                    query_cache_size=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024")),
+                    context_cache_size=int(os.getenv("TENANT_CONTEXT_CACHE_SIZE", "256"))
+                )
+    return _registry_instance
+
+
+def get_tenant(tenant_id: str = None) -> Tenant:    #type:ignore
+    return get_tenant_registry().get(tenant_id)
@@ -0,0 +1,41 @@
+import os
+
+from .store import SessionStore, MemorySessionStore
+from .coordinator import SessionBusyError, SessionCoordinator
+from .sqlite_store import SQLiteSessionStore
+from .redis_store import RedisSessionStore
+from .record import SessionRecord, Intent, compact_message, message_text
+from .serialization import serialize_record, deserialize_record
+
+
+def get_session_store() -> SessionStore:
+    backend = os.getenv("SESSION_STORE", "memory").lower()
+    ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_DB_PATH", "sessions.db"), ttl_seconds=ttl_seconds)
+    if backend == "redis":
+        return RedisSessionStore(url=os.getenv("REDIS_URL", "redis://localhost:6379/0"), ttl_seconds=ttl_seconds)
+    return MemorySessionStore(
+        ttl_seconds=ttl_seconds,
+        max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "10000")),
+        max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+    )
+
+
+def create_session_coordinator(store: SessionStore) -> SessionCoordinator:
+    return SessionCoordinator(
+        store,
+        enabled=os.getenv("SESSION_LOCK_ENABLED", "true").lower() == "true",
+        lease_seconds=float(os.getenv("SESSION_LOCK_LEASE_SECONDS", "30")),
+        wait_seconds=float(os.getenv("SESSION_LOCK_WAIT_SECONDS", "30")),
+        result_ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "300")),
+        dedupe_in_flight=os.getenv("DEDUPE_IN_FLIGHT", "true").lower() == "true"
+    )
+
+
+__all__ = [
+    'SessionStore', 'MemorySessionStore', 'SQLiteSessionStore', 'RedisSessionStore',
+    'get_session_store', 'SessionCoordinator', 'SessionBusyError', 'create_session_coordinator',
+    'SessionRecord', 'Intent', 'compact_message', 'message_text', 'serialize_record', 'deserialize_record'
+]
@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from session.store import SessionStore
+
+TurnResult = Dict[str, Any]
+
+
+class SessionBusyError(Exception):
+    # Surfaced by the API as 409 with Retry-After: the session stayed locked for the whole wait
+    status_code = 409
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SessionCoordinator:
+    # Turns on one session run one at a time: an asyncio lock per session inside this process
+    # (waiters queue without polling), then a lease in the session store so other workers sharing
+    # the store wait too. Different sessions never wait on each other.
+    #
+    # Identical requests are answered once. The key is the client's Idempotency-Key, or else the
+    # message text itself. A copy arriving while the first is still running awaits it. Only explicit
+    # keys outlive the turn: their result is stored for result_ttl_seconds and replayed to retries.
+    # The same text sent after the turn finished is a new turn, since users do repeat "yes" and "ok".
+
+    def __init__(self, store: SessionStore, enabled: bool = True, lease_seconds: float = 30.0,
+                 wait_seconds: float = 30.0, result_ttl_seconds: float = 300.0,
+                 dedupe_in_flight: bool = True):
+        self.store = store
+        self.enabled = enabled
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.dedupe_in_flight = dedupe_in_flight
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.turns = 0
+        self.waits = 0
+        self.deduplicated = 0
+        self.replayed = 0
+        self.busy = 0
+        self.retried = 0
+
+    def idempotency_key(self, session_id: str, message: str, key: Optional[str] = None) -> Optional[str]:
+        # Scoped to the session (store key, so tenant too): clients pick keys, collisions across
+        # sessions must not leak answers
+        if key:
+            return hashlib.sha256(f"{session_id}\x00key\x00{key}".encode("utf-8")).hexdigest()[:32]
+        if not self.dedupe_in_flight:
+            return None
+        return hashlib.sha256(f"{session_id}\x00text\x00{message}".encode("utf-8")).hexdigest()[:32]
+
+    async def run(self, session_id: str, message: str, turn: Callable[[], Awaitable[TurnResult]],
+                  key: Optional[str] = None, dedupe: bool = True) -> Tuple[TurnResult, bool]:
+        # Returns (result, replayed); turn() must return something JSON-serializable
+        idempotency_key = self.idempotency_key(session_id, message, key) if dedupe else None
+        if idempotency_key is None:
+            async with self.session(session_id):
+                return await turn(), False
+
+        while True:
+            pending = self._inflight.get(idempotency_key)
+            if pending is None:
+                return await self._lead(session_id, idempotency_key, turn, stored=bool(key))
+            self.deduplicated += 1
+            try:
+                # shield: a cancelled duplicate must not cancel the original request's turn
+                return await asyncio.shield(pending), True
+            except asyncio.CancelledError:
+                # The original request was cancelled (client went away): this copy runs the turn
+                # itself. Its own cancellation still propagates
+                task = asyncio.current_task()
+                if not pending.cancelled() or (task is not None and task.cancelling()):
+                    raise
+                self.retried += 1
+
+    async def _lead(self, session_id: str, idempotency_key: str, turn: Callable[[], Awaitable[TurnResult]],
+                    stored: bool) -> Tuple[TurnResult, bool]:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[idempotency_key] = future
+        try:
+            async with self.session(session_id):
+                blob = self.store.get_result(idempotency_key) if stored else None
+                if blob is not None:
+                    self.replayed += 1
+                    result, replayed = json.loads(blob), True
+                else:
+                    result, replayed = await turn(), False
+                    if stored:
+                        self.store.set_result(idempotency_key, json.dumps(result).encode("utf-8"),
+                                              self.result_ttl_seconds)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved: there may be no duplicate waiting on it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, replayed
+        finally:
+            del self._inflight[idempotency_key]
+
+    @asynccontextmanager
+    async def session(self, session_id: str) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        self._users[session_id] = self._users.get(session_id, 0) + 1
+        try:
+            if lock.locked():
+                self.waits += 1
+            try:
+                await asyncio.wait_for(lock.acquire(), self.wait_seconds)
+            except asyncio.TimeoutError:
+                self.busy += 1
+                raise SessionBusyError(f"Session {session_id} is busy with another message", self.lease_seconds)
+            try:
+                owner = await self._lease(session_id)
+                renewal = asyncio.create_task(self._renew(session_id, owner))
+                try:
+                    self.turns += 1
+                    yield
+                finally:
+                    renewal.cancel()
+                    self.store.unlock(session_id, owner)
+            finally:
+                lock.release()
+        finally:
+            self._users[session_id] -= 1
+            if not self._users[session_id]:
+                del self._users[session_id]
+                del self._locks[session_id]
+
+    async def _lease(self, session_id: str) -> str:
+        # Held by another worker: poll with backoff. Within this process the asyncio lock already
+        # serialises, so this only waits when another process has the session
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_seconds
+        delay = 0.01
+        while not self.store.try_lock(session_id, owner, self.lease_seconds):
+            if time.monotonic() >= deadline:
+                self.busy += 1
+                raise SessionBusyError(f"Session {session_id} is busy on another worker", self.lease_seconds)
+            self.waits += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+        return owner
+
+    async def _renew(self, session_id: str, owner: str) -> None:
+        # Turns longer than the lease (slow LLM, retries) keep it instead of letting another worker in
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            self.store.try_lock(session_id, owner, self.lease_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "active_sessions": len(self._locks),
+            "in_flight": len(self._inflight),
+            "turns": self.turns,
+            "waits": self.waits,
+            "deduplicated": self.deduplicated,
+            "replayed": self.replayed,
+            "busy": self.busy,
+            "retried": self.retried
+        }
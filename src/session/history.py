@@ -0,0 +1,23 @@
+import os
+from collections import deque
+from typing import Iterable, List
+
+
+# Messages kept in live session state; generate_response_node only ever sends the last 2
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "4"))
+
+
+class ConversationHistory:
+
+    def __init__(self, recent: Iterable = (), maxlen: int = None):    #type:ignore
+        self.maxlen = maxlen or HISTORY_WINDOW
+        self._recent = deque(recent, maxlen=self.maxlen)
+
+    def extend(self, messages: Iterable) -> None:
+        self._recent.extend(messages)
+
+    def recent(self) -> List:
+        return list(self._recent)
+
+    def __len__(self) -> int:
+        return len(self._recent)
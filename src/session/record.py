@@ -0,0 +1,111 @@
+import sys
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class Intent(str, Enum):
+    GREETING = "greeting"
+    INQUIRY = "inquiry"
+    HIGH_INTENT_LEAD = "high_intent_lead"
+
+
+# A compact message is one bytes object: a role code byte followed by the UTF-8 text.
+# Graph state, session records and the transcript log all carry these; LangChain message
+# objects are only built at the prompt boundary (to_langchain_messages).
+_ROLE_CODES = {"human": b"h", "ai": b"a"}
+_CODE_ROLES = {ord("h"): "human", ord("a"): "ai"}
+
+CompactMessage = bytes
+
+
+def compact_message(role: str, text: str) -> CompactMessage:
+    return _ROLE_CODES[role] + text.encode("utf-8")
+
+
+def message_role(message: CompactMessage) -> str:
+    return _CODE_ROLES[message[0]]
+
+
+def message_text(message: CompactMessage) -> str:
+    return message[1:].decode("utf-8")
+
+
+def compact_messages(messages: Iterable) -> List[CompactMessage]:
+    # Accepts compact messages or LangChain messages (BaseMessage.type); system/tool messages are dropped
+    compact = []
+    for msg in messages:
+        if isinstance(msg, bytes):
+            compact.append(msg)
+            continue
+        code = _ROLE_CODES.get(getattr(msg, "type", None))
+        if code is not None:
+            compact.append(code + str(msg.content).encode("utf-8"))
+    return compact
+
+
+def to_langchain_messages(messages: Iterable[CompactMessage]) -> List:
+    from langchain_core.messages import AIMessage, HumanMessage
+    role_classes = {"human": HumanMessage, "ai": AIMessage}
+    return [role_classes[message_role(msg)](content=message_text(msg)) for msg in messages]
+
+
+def _intent(value: Any) -> Optional[Intent]:
+    try:
+        return Intent(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _interned(value: Optional[str]) -> Optional[str]:
+    # Platforms repeat across thousands of sessions; share one string per distinct value
+    return sys.intern(value) if value is not None else None
+
+
+@dataclass(slots=True, frozen=True)
+class SessionRecord:
+    # What survives between turns; retrieval context and cached answers are per-turn only.
+    # Frozen, so the memory store can hold the instance itself and recompute its size on eviction
+    intent: Optional[Intent] = None
+    user_name: Optional[str] = None
+    user_email: Optional[str] = None
+    user_platform: Optional[str] = None
+    platform_hint: Optional[str] = None
+    lead_captured: bool = False
+    # User turns so far; unlike the windowed messages it keeps counting (template rotation)
+    turns: int = 0
+    messages: Tuple[CompactMessage, ...] = ()
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], messages: Optional[Iterable] = None) -> "SessionRecord":
+        return cls(
+            intent=_intent(state.get("intent")),
+            user_name=state.get("user_name"),
+            user_email=state.get("user_email"),
+            user_platform=_interned(state.get("user_platform")),
+            platform_hint=_interned(state.get("platform_hint")),
+            lead_captured=bool(state.get("lead_captured")),
+            turns=int(state.get("turns") or 0),
+            messages=tuple(compact_messages(state.get("messages", []) if messages is None else messages))
+        )
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "messages": list(self.messages),
+            "intent": self.intent.value if self.intent is not None else None,
+            "user_name": self.user_name,
+            "user_email": self.user_email,
+            "user_platform": self.user_platform,
+            "platform_hint": self.platform_hint,
+            "lead_captured": self.lead_captured,
+            "turns": self.turns
+        }
+
+    def nbytes(self) -> int:
+        # Approximate retained size, for the memory store's byte cap
+        size = sys.getsizeof(self) + sys.getsizeof(self.messages)
+        size += sum(sys.getsizeof(msg) for msg in self.messages)
+        for value in (self.user_name, self.user_email):
+            if value is not None:
+                size += sys.getsizeof(value)
+        return size
@@ -0,0 +1,100 @@
+import time
+from typing import List, Optional
+
+from session.store import SessionStore
+
+# Compare-and-set on the owner, so only the lease holder can extend or release it
+_LOCK_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if owner == false or owner == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+_UNLOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisSessionStore(SessionStore):
+    backend = "redis"
+
+    def __init__(self, client=None, url: str = "redis://localhost:6379/0",
+                 ttl_seconds: float = 86400, prefix: str = "sociolead:"):
+        super().__init__(ttl_seconds)
+        if client is None:
+            # Optional dependency; any client speaking the redis-py API works (e.g. fakeredis)
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        # Session ids with their expiry time as score: size() without scanning the keyspace
+        self._index_key = f"{prefix}sessions"
+
+    # Each kind of key has its own namespace ahead of the client-chosen id, so an id such as
+    # "abc:log" can never address another session's keys
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}s:{session_id}"
+
+    def _log_key(self, session_id: str) -> str:
+        return f"{self.prefix}log:{session_id}"
+
+    def _lock_key(self, session_id: str) -> str:
+        return f"{self.prefix}lock:{session_id}"
+
+    def _result_key(self, key: str) -> str:
+        return f"{self.prefix}result:{key}"
+
+    def _ttl_ms(self) -> int:
+        # Milliseconds: int(ttl_seconds) would turn sub-second TTLs into an invalid 0
+        return max(1, int(self.ttl_seconds * 1000))
+
+    def _get_blob(self, session_id: str) -> Optional[bytes]:
+        return self.client.get(self._key(session_id))
+
+    def _set_blob(self, session_id: str, blob: bytes) -> None:
+        # Redis expires keys itself, so TTL evictions are not observable as a counter here
+        pipe = self.client.pipeline()
+        pipe.set(self._key(session_id), blob, px=self._ttl_ms())
+        pipe.zadd(self._index_key, {session_id: time.time() + self.ttl_seconds})
+        pipe.execute()
+
+    def _append_log_entries(self, session_id: str, entries: List[bytes]) -> None:
+        log_key = self._log_key(session_id)
+        pipe = self.client.pipeline()
+        pipe.rpush(log_key, *entries)
+        pipe.pexpire(log_key, self._ttl_ms())
+        pipe.execute()
+
+    def _get_log_entries(self, session_id: str) -> List[bytes]:
+        return self.client.lrange(self._log_key(session_id), 0, -1)
+
+    def delete(self, session_id: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(session_id), self._log_key(session_id))
+        pipe.zrem(self._index_key, session_id)
+        pipe.execute()
+
+    def try_lock(self, session_id: str, owner: str, lease_seconds: float) -> bool:
+        return bool(self.client.eval(_LOCK_SCRIPT, 1, self._lock_key(session_id), owner,
+                                     max(1, int(lease_seconds * 1000))))
+
+    def unlock(self, session_id: str, owner: str) -> None:
+        self.client.eval(_UNLOCK_SCRIPT, 1, self._lock_key(session_id), owner)
+
+    def get_result(self, key: str) -> Optional[bytes]:
+        return self.client.get(self._result_key(key))
+
+    def set_result(self, key: str, blob: bytes, ttl_seconds: float) -> None:
+        self.client.set(self._result_key(key), blob, px=max(1, int(ttl_seconds * 1000)))
+
+    def size(self) -> int:
+        # Expired sessions leave the index here, lazily; both calls are O(log n) per removed entry
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(self._index_key, "-inf", time.time())
+        pipe.zcard(self._index_key)
+        return int(pipe.execute()[1])
@@ -0,0 +1,48 @@
+import json
+from typing import List
+
+from session.record import CompactMessage, SessionRecord, _intent
+
+
+# Bump when the blob layout changes; older blobs are dropped rather than misread
+SERIALIZATION_VERSION = 1
+
+STATE_FIELDS = ["intent", "user_name", "user_email", "user_platform", "platform_hint", "lead_captured", "turns"]
+
+
+def encode_messages(messages: List[CompactMessage]) -> List[List[str]]:
+    # [role_code, text] pairs, the same layout the blobs have always used
+    return [[chr(msg[0]), msg[1:].decode("utf-8")] for msg in messages]
+
+
+def decode_messages(encoded: List[List[str]]) -> List[CompactMessage]:
+    return [role.encode("ascii") + text.encode("utf-8") for role, text in encoded]
+
+
+def serialize_record(record: SessionRecord) -> bytes:
+    payload = {"v": SERIALIZATION_VERSION, "messages": encode_messages(record.messages)}
+    for field in STATE_FIELDS:
+        value = getattr(record, field)
+        if value is not None:
+            payload[field] = value.value if field == "intent" else value
+
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def deserialize_record(blob: bytes) -> SessionRecord:
+    payload = json.loads(blob)
+    if payload.get("v") != SERIALIZATION_VERSION:
+        raise ValueError(f"Unsupported session blob version: {payload.get('v')}")
+
+    # Blobs written before records may still carry a "context" field; it is ignored
+    return SessionRecord(
+        intent=_intent(payload.get("intent")),
+        user_name=payload.get("user_name"),
+        user_email=payload.get("user_email"),
+        user_platform=payload.get("user_platform"),
+        platform_hint=payload.get("platform_hint"),
+        lead_captured=bool(payload.get("lead_captured")),
+        # Absent from blobs written before the counter existed
+        turns=int(payload.get("turns", 0)),
+        messages=tuple(decode_messages(payload["messages"]))
+    )
@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from session.store import SessionStore
+
+
+class SQLiteSessionStore(SessionStore):
+    backend = "sqlite"
+
+    # Expired rows are purged in bulk every N writes instead of on every request
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str = "sessions.db", ttl_seconds: float = 86400):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions(expires_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_log ("
+            "session_id TEXT NOT NULL, seq INTEGER PRIMARY KEY AUTOINCREMENT, entry BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS session_log_session ON session_log(session_id, seq)")
+        # Shared by every process using this file, so leases hold across workers
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_locks ("
+            "session_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS turn_results ("
+            "key TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _get_blob(self, session_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._delete(session_id)
+                self._count("evictions")
+                return None
+            return bytes(row[0])
+
+    def _set_blob(self, session_id: str, blob: bytes) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, blob, time.time() + self.ttl_seconds)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._purge_expired()
+
+    def _append_log_entries(self, session_id: str, entries: List[bytes]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO session_log (session_id, entry) VALUES (?, ?)",
+                [(session_id, entry) for entry in entries]
+            )
+
+    def _get_log_entries(self, session_id: str) -> List[bytes]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT entry FROM session_log WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+            return [bytes(row[0]) for row in rows]
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._delete(session_id)
+
+    def _delete(self, session_id: str) -> None:
+        self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM session_log WHERE session_id = ?", (session_id,))
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def try_lock(self, session_id: str, owner: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO session_locks (session_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE session_locks.owner = excluded.owner OR session_locks.expires_at <= ?",
+                (session_id, owner, now + lease_seconds, now)
+            )
+            return cursor.rowcount == 1
+
+    def unlock(self, session_id: str, owner: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM session_locks WHERE session_id = ? AND owner = ?", (session_id, owner))
+
+    def get_result(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM turn_results WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            return bytes(row[0]) if row is not None else None
+
+    def set_result(self, key: str, blob: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO turn_results (key, data, expires_at) VALUES (?, ?, ?)",
+                (key, blob, time.time() + ttl_seconds)
+            )
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        self._conn.execute(
+            "DELETE FROM session_log WHERE session_id IN (SELECT session_id FROM sessions WHERE expires_at <= ?)",
+            (now,)
+        )
+        cursor = self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+        if cursor.rowcount:
+            self._count("evictions", cursor.rowcount)
+        self._conn.execute("DELETE FROM turn_results WHERE expires_at <= ?", (now,))
+        self._conn.execute("DELETE FROM session_locks WHERE expires_at <= ?", (now,))
@@ -0,0 +1,218 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from session.record import CompactMessage, SessionRecord, compact_messages
+from session.serialization import decode_messages, deserialize_record, encode_messages, serialize_record
+
+
+class SessionStore:
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        try:
+            record = self._load(session_id)
+        except ValueError:
+            self.delete(session_id)
+            self._count("misses")
+            return None
+        self._count("hits" if record is not None else "misses")
+        return record
+
+    def set(self, session_id: str, record: SessionRecord) -> None:
+        self._store(session_id, record)
+
+    def append_log(self, session_id: str, messages: List) -> None:
+        # Full transcript is append-only and kept out of the live state that every turn loads
+        entries = [json.dumps(entry, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+                   for entry in encode_messages(compact_messages(messages))]
+        if entries:
+            self._append_log_entries(session_id, entries)
+
+    def get_log(self, session_id: str) -> List[CompactMessage]:
+        return decode_messages([json.loads(entry) for entry in self._get_log_entries(session_id)])
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    # Cross-worker coordination (session.coordinator): one lease per session, so a turn's
+    # read-run-write is never interleaved with another turn on the same session, and short-lived
+    # results of finished turns, so a retried/duplicate request gets the same answer
+
+    def try_lock(self, session_id: str, owner: str, lease_seconds: float) -> bool:
+        # Acquires a free or expired lease, or extends one `owner` already holds
+        raise NotImplementedError
+
+    def unlock(self, session_id: str, owner: str) -> None:
+        raise NotImplementedError
+
+    def get_result(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set_result(self, key: str, blob: bytes, ttl_seconds: float) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend,
+                "size": self.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _load(self, session_id: str) -> Optional[SessionRecord]:
+        blob = self._get_blob(session_id)
+        return deserialize_record(blob) if blob is not None else None
+
+    def _store(self, session_id: str, record: SessionRecord) -> None:
+        self._set_blob(session_id, serialize_record(record))
+
+    def _get_blob(self, session_id: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def _set_blob(self, session_id: str, blob: bytes) -> None:
+        raise NotImplementedError
+
+    def _append_log_entries(self, session_id: str, entries: List[bytes]) -> None:
+        raise NotImplementedError
+
+    def _get_log_entries(self, session_id: str) -> List[bytes]:
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: float = 86400, max_sessions: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(ttl_seconds)
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # session_id -> (expires_at, record); ordered from least to most recently used.
+        # Records are kept as objects: no JSON round trip per turn, and they are compact by design
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._logs: Dict[str, List[bytes]] = {}
+        self._bytes = 0
+        # session_id -> (owner, expires_at); key -> (expires_at, blob), oldest first
+        self._leases: Dict[str, tuple] = {}
+        self._results: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _load(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            expires_at, record = entry
+            if expires_at <= time.monotonic():
+                self._remove(session_id)
+                self._count("evictions")
+                return None
+            self._entries.move_to_end(session_id)
+            return record
+
+    def _store(self, session_id: str, record: SessionRecord) -> None:
+        with self._lock:
+            if session_id in self._entries:
+                _, previous = self._entries.pop(session_id)
+                self._bytes -= previous.nbytes()
+            self._entries[session_id] = (time.monotonic() + self.ttl_seconds, record)
+            self._bytes += record.nbytes()
+            self._evict()
+
+    def _append_log_entries(self, session_id: str, entries: List[bytes]) -> None:
+        with self._lock:
+            self._logs.setdefault(session_id, []).extend(entries)
+            self._bytes += sum(len(entry) for entry in entries)
+            self._evict()
+
+    def _get_log_entries(self, session_id: str) -> List[bytes]:
+        with self._lock:
+            return list(self._logs.get(session_id, []))
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+            else:
+                self._remove_log(session_id)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def try_lock(self, session_id: str, owner: str, lease_seconds: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            lease = self._leases.get(session_id)
+            if lease is not None and lease[0] != owner and lease[1] > now:
+                return False
+            self._leases[session_id] = (owner, now + lease_seconds)
+            return True
+
+    def unlock(self, session_id: str, owner: str) -> None:
+        with self._lock:
+            lease = self._leases.get(session_id)
+            if lease is not None and lease[0] == owner:
+                del self._leases[session_id]
+
+    def get_result(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._results.get(key)
+            return entry[1] if entry is not None and entry[0] > time.monotonic() else None
+
+    def set_result(self, key: str, blob: bytes, ttl_seconds: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._results.pop(key, None)
+            self._results[key] = (now + ttl_seconds, blob)
+            # Mostly one TTL, so insertion order is close to expiry order; the cap bounds the rest
+            while self._results and (next(iter(self._results.values()))[0] <= now
+                                     or len(self._results) > self.max_sessions):
+                self._results.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["bytes"] = self._bytes
+        return stats
+
+    def _remove(self, session_id: str) -> None:
+        _, record = self._entries.pop(session_id)
+        self._bytes -= record.nbytes()
+        self._remove_log(session_id)
+
+    def _remove_log(self, session_id: str) -> None:
+        entries = self._logs.pop(session_id, None)
+        if entries:
+            self._bytes -= sum(len(entry) for entry in entries)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        evicted = 0
+        # Expired entries first (oldest first), then LRU until both caps are satisfied
+        while self._entries:
+            oldest_id, (expires_at, _) = next(iter(self._entries.items()))
+            over_cap = len(self._entries) > self.max_sessions or self._bytes > self.max_bytes
+            if expires_at > now and not over_cap:
+                break
+            self._remove(oldest_id)
+            evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
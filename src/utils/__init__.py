@@ -1,3 +1,3 @@
-from .intent import classify_intent, detect_high_intent_keywords, IntentType
+from .intent import classify_intent, aclassify_intent, detect_high_intent_keywords, IntentType
 
-__all__ = ['classify_intent', 'detect_high_intent_keywords', 'IntentType']
+__all__ = ['classify_intent', 'aclassify_intent', 'detect_high_intent_keywords', 'IntentType']
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from rag.tenants import TenantError
+from session import SessionBusyError
+from utils.llm_gateway import LLMUnavailableError
+
+# (session_id, message, tenant_id)
+TurnHandler = Callable[[str, str, Optional[str]], Awaitable[Dict[str, Any]]]
+
+
+async def read_jsonl(chunks: AsyncIterable[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    # Incremental JSONL parsing, so a large file starts processing before it has all been read
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_item(line)
+    if buffer.strip():
+        yield _parse_item(buffer)
+
+
+def _parse_item(line: bytes) -> Dict[str, Any]:
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        return {"error": f"Invalid JSON: {e}"}
+    if not isinstance(item, dict) or not isinstance(item.get("message"), str):
+        return {"error": "Each line needs a string 'message' (and optionally 'session_id', 'tenant_id', 'id')"}
+    if not isinstance(item.get("tenant_id", ""), str):
+        return {"error": "'tenant_id' must be a string"}
+    return item
+
+
+async def run_batch(items: AsyncIterable[Dict[str, Any]], handle: TurnHandler, concurrency: int = 16,
+                    max_pending: int = 1000, tenant_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    # Lines without their own tenant_id belong to `tenant_id` (None: the default tenant).
+    # Items of one session run in input order on that session's lane; lanes run concurrently,
+    # at most `concurrency` turns at a time. Results are yielded as they complete, tagged with the
+    # input line index. At most `max_pending` items are buffered, so input is read as results drain.
+    results: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    lanes: Dict[Tuple[Optional[str], str], Deque[Tuple[int, Dict[str, Any]]]] = {}
+    running = asyncio.Semaphore(concurrency)
+    pending = asyncio.Semaphore(max_pending)
+    tasks = set()
+    submitted = 0
+    reading_done = False
+
+    def lane_key(item: Dict[str, Any]) -> Tuple[Optional[str], str]:
+        return item.get("tenant_id") or tenant_id, str(item.get("session_id") or "default")
+
+    async def process(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        item_tenant, session_id = lane_key(item)
+        output = {"index": index, "session_id": session_id}
+        if item_tenant is not None:
+            output["tenant_id"] = item_tenant
+        if "id" in item:
+            output["id"] = item["id"]
+        try:
+            async with running:
+                result = await handle(session_id, item["message"], item_tenant)
+            output.update(result)
+        except (LLMUnavailableError, SessionBusyError) as e:
+            output.update(error=str(e), status=e.status_code, retry_after=max(1, round(e.retry_after)))
+        except TenantError as e:
+            output.update(error=str(e), status=e.status_code)
+        except Exception as e:
+            output.update(error=f"Error processing request: {str(e)}", status=500)
+        return output
+
+    async def drain(key: Tuple[Optional[str], str]) -> None:
+        lane = lanes[key]
+        while lane:
+            index, item = lane[0]
+            output = await process(index, item)
+            lane.popleft()
+            await results.put(output)
+        # No await between the final check and the delete, so no item can slip in unnoticed
+        del lanes[key]
+
+    async def read() -> None:
+        nonlocal submitted, reading_done
+        index = 0
+        try:
+            async for item in items:
+                await pending.acquire()
+                submitted += 1
+                if "error" in item:
+                    await results.put({"index": index, "error": item["error"], "status": 400})
+                else:
+                    key = lane_key(item)
+                    lane = lanes.get(key)
+                    if lane is not None:
+                        lane.append((index, item))
+                    else:
+                        lanes[key] = deque([(index, item)])
+                        task = asyncio.create_task(drain(key))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                index += 1
+        finally:
+            reading_done = True
+            # Wake the consumer in case everything already completed
+            await results.put({})
+
+    reader = asyncio.create_task(read())
+    emitted = 0
+    try:
+        while True:
+            output = await results.get()
+            if output:
+                emitted += 1
+                pending.release()
+                yield output
+            if reading_done and emitted == submitted:
+                break
+        await reader
+    finally:
+        reader.cancel()
+        for task in list(tasks):
+            task.cancel()
@@ -0,0 +1,114 @@
+import json
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, ValidationError
+
+from utils.intent import IntentType, classify_locally
+from utils.local_intent import intent_stats
+from utils.matcher import find_email, find_platform, has_high_intent
+
+
+EXTRACT_SYSTEM_PROMPT = """Extract JSON from the user message:
+{"intent": "greeting|inquiry|high_intent_lead", "name": null, "email": null, "platform": null}
+greeting - Hi/Hello
+inquiry - Questions
+high_intent_lead - Wants to try/signup/mentions channel
+Fill name/email/platform only if the user states them. JSON only."""
+
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+class TurnExtraction(BaseModel):
+    intent: IntentType
+    name: Optional[str] = None
+    email: Optional[str] = None
+    platform: Optional[str] = None
+
+
+def local_turn_analysis(message: str, sticky: bool, missing: Optional[str],
+                        platform_hint: Optional[str]) -> Tuple[Optional[IntentType], Dict[str, Any], bool]:
+    # Zero-cost pre-pass: regex slots plus the keyword/local intent tiers
+    fields = {"email": find_email(message), "platform": find_platform(message) or platform_hint}
+
+    if sticky:
+        intent = "high_intent_lead"
+    elif has_high_intent(message):
+        intent_stats.record("keyword", 0.0)
+        intent = "high_intent_lead"
+    else:
+        intent = classify_locally(message)
+
+    if intent is None:
+        return None, fields, True
+
+    # Only the name (and a platform regex could not find) needs the model once intent is known
+    needs_llm = intent == "high_intent_lead" and (
+        missing == "name" or (missing == "platform" and not fields["platform"])
+    )
+    return intent, fields, needs_llm
+
+
+def extraction_messages(message: str) -> list:
+    return [
+        SystemMessage(content=EXTRACT_SYSTEM_PROMPT),
+        HumanMessage(content=f"'{message}'")
+    ]
+
+
+def parse_extraction(raw: str) -> TurnExtraction:
+    match = _JSON_OBJECT_RE.search(raw)
+    if match:
+        try:
+            extraction = TurnExtraction.model_validate_json(match.group(0))
+        except ValidationError:
+            extraction = None
+        if extraction is not None:
+            return extraction
+    # Unparseable output degrades to the same default as the one-word classifier
+    return TurnExtraction(intent="inquiry")
+
+
+def extract_turn(message: str, llm) -> TurnExtraction:
+    start = time.perf_counter()
+    response = llm.invoke(extraction_messages(message))
+    intent_stats.record("llm", time.perf_counter() - start)
+    return parse_extraction(response.content)
+
+
+async def aextract_turn(message: str, llm) -> TurnExtraction:
+    start = time.perf_counter()
+    response = await llm.ainvoke(extraction_messages(message))
+    intent_stats.record("llm", time.perf_counter() - start)
+    return parse_extraction(response.content)
+
+
+def merge_extraction(intent: Optional[IntentType], fields: Dict[str, Any],
+                     extraction: TurnExtraction) -> Tuple[IntentType, Dict[str, Any]]:
+    # Locally decided intent and regex matches take precedence over the model
+    merged = {
+        "name": extraction.name,
+        "email": fields.get("email") or find_email(extraction.email or ""),
+        "platform": fields.get("platform") or extraction.platform
+    }
+    return intent or extraction.intent, merged
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value or value.upper() in ("NONE", "NULL") or len(value) >= 50:
+        return None
+    return value
+
+
+def lead_field_updates(state: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+    updates = {}
+    for field, key in (("name", "user_name"), ("email", "user_email"), ("platform", "user_platform")):
+        value = _clean(fields.get(field))
+        if value and not state.get(key):
+            updates[key] = value
+    return updates
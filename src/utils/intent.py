@@ -1,30 +1,79 @@
-from typing import Literal
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
+import asyncio
+import time
+from typing import Literal, Optional, TYPE_CHECKING
 import os
 
+from utils.local_intent import get_local_classifier, intent_stats
+from utils.matcher import has_high_intent
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
 IntentType = Literal["greeting", "inquiry", "high_intent_lead"]
 
-def classify_intent(message: str, llm: ChatGoogleGenerativeAI) -> IntentType:
+CLASSIFY_SYSTEM_PROMPT = """Classify as ONE word:
+greeting - Hi/Hello
+inquiry - Questions
+high_intent_lead - Wants to try/signup/mentions channel
+Reply: greeting, inquiry, or high_intent_lead"""
+
+
+def classify_intent(message: str, llm: "ChatGoogleGenerativeAI") -> IntentType:
 
     # First check keywords for high intent
     if detect_high_intent_keywords(message):
+        intent_stats.record("keyword", 0.0)
         return "high_intent_lead"
     
+    # Then the local embedding classifier; only low-confidence messages reach Gemini
+    intent = classify_locally(message)
+    if intent is not None:
+        return intent
     
-    system_prompt = """Classify as ONE word:
-greeting - Hi/Hello
-inquiry - Questions
-high_intent_lead - Wants to try/signup/mentions channel
-Reply: greeting, inquiry, or high_intent_lead"""
+    start = time.perf_counter()
+    response = llm.invoke(_classification_messages(message))
+    intent_stats.record("llm", time.perf_counter() - start)
+    return _parse_intent(response.content)
 
-    messages = [
-        SystemMessage(content=system_prompt),
+
+async def aclassify_intent(message: str, llm: "ChatGoogleGenerativeAI") -> IntentType:
+
+    if detect_high_intent_keywords(message):
+        intent_stats.record("keyword", 0.0)
+        return "high_intent_lead"
+    
+    intent = await asyncio.to_thread(classify_locally, message)
+    if intent is not None:
+        return intent
+    
+    start = time.perf_counter()
+    response = await llm.ainvoke(_classification_messages(message))
+    intent_stats.record("llm", time.perf_counter() - start)
+    return _parse_intent(response.content)
+
+
+def classify_locally(message: str) -> Optional[IntentType]:
+    classifier = get_local_classifier()
+    if classifier is None:
+        return None
+    
+    start = time.perf_counter()
+    intent = classifier.predict(message)
+    if intent is not None:
+        intent_stats.record("local", time.perf_counter() - start)
+    return intent
+
+
+def _classification_messages(message: str) -> list:
+    from langchain_core.messages import SystemMessage, HumanMessage
+    return [
+        SystemMessage(content=CLASSIFY_SYSTEM_PROMPT),
         HumanMessage(content=f"'{message}'")
     ]
-    
-    response = llm.invoke(messages)
-    intent = response.content.strip().lower()
+
+
+def _parse_intent(raw: str) -> IntentType:
+    intent = raw.strip().lower()
     
     if intent not in ["greeting", "inquiry", "high_intent_lead"]:
         if "greeting" in intent:
@@ -38,13 +87,4 @@ Reply: greeting, inquiry, or high_intent_lead"""
 
 
 def detect_high_intent_keywords(message: str) -> bool:
-    high_intent_keywords = [
-        "sign up", "signup", "register", "try", "start", "interested",
-        "want to", "i'd like", "i would like", "get started", "purchase",
-        "buy", "subscribe", "join", "my channel", "my youtube", "my instagram",
-        "for my", "i need", "ready to", "make a video", "create a video",
-        "video for", "content for", "i want", "looking to"
-    ]
-    
-    message_lower = message.lower()
-    return any(keyword in message_lower for keyword in high_intent_keywords)
+    return has_high_intent(message)
@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.tracing import event, metrics
+
+metrics.describe("agent_llm_gateway_total", "LLM gateway outcomes: coalesced, rate_limited, circuit_open, error")
+
+
+class LLMUnavailableError(Exception):
+    # Surfaced by the API as 429 (rate limited) or 503 (circuit open), with Retry-After
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMRateLimitedError(LLMUnavailableError):
+    status_code = 429
+
+
+class TokenBucket:
+    # Reservation-style bucket: a caller takes a token even when the bucket is empty and
+    # sleeps until it would have refilled. The negative balance is the queue of waiting calls,
+    # which is bounded by max_queue; beyond that, calls are rejected immediately.
+
+    def __init__(self, rate: float, burst: int, max_queue: int = 100, max_wait: float = 10.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if wait > 0 and (-self._tokens >= self.max_queue or wait > self.max_wait):
+                self.rejected += 1
+                raise LLMRateLimitedError("LLM request queue is full", retry_after=wait)
+            self._tokens -= 1
+            return wait
+
+    def refund(self) -> None:
+        # A reservation that was never used (the circuit turned the call away)
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def queued(self) -> int:
+        with self._lock:
+            return max(0, int(-self._tokens))
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        # True when this call is the half-open probe
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return False
+            # Half-open lets a single probe through; its outcome closes or re-opens the circuit
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            retry_after = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            raise LLMUnavailableError("LLM circuit is open", retry_after=retry_after or 1.0)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        # The probe ended without a verdict on the model (cancelled, interrupted): the next call probes again
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probe_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._probe_in_flight:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+def _prompt_key(model: str, args: tuple, kwargs: Dict[str, Any]) -> str:
+    messages = args[0] if args else kwargs.get("input")
+    if isinstance(messages, list):
+        payload = [(getattr(m, "type", ""), getattr(m, "content", m)) for m in messages]
+    else:
+        payload = str(messages)
+    extra = sorted((k, repr(v)) for k, v in kwargs.items() if k not in ("input", "config"))
+    return hashlib.sha1(json.dumps([model, payload, extra], default=str).encode("utf-8")).hexdigest()
+
+
+_gateways: "weakref.WeakSet[LLMGateway]" = weakref.WeakSet()
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(model: str) -> CircuitBreaker:
+    # One breaker per model, shared by every gateway (and graph) calling it
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = _breakers[model] = CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+            )
+        return breaker
+
+
+class LLMGateway:
+    # Sits between the nodes and the chat model: identical in-flight prompts share one call,
+    # a token bucket bounds the request rate, and a per-model breaker stops calling a failing model
+
+    def __init__(self, llm, model: str, limiter: Optional[TokenBucket] = None,
+                 breaker: Optional[CircuitBreaker] = None, singleflight: bool = True):
+        self.llm = llm
+        self.model = model
+        self.limiter = limiter
+        self.breaker = breaker or get_circuit_breaker(model)
+        self.singleflight = singleflight
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+        _gateways.add(self)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def _count(self, result: str) -> None:
+        metrics.inc("agent_llm_gateway_total", model=self.model, result=result)
+        event("llm_gateway", result=result)
+
+    def _admit(self) -> Tuple[float, bool]:
+        # Rate limit first: a rejected reservation must not leave a half-open probe taken
+        wait = 0.0
+        if self.limiter is not None:
+            try:
+                wait = self.limiter.reserve()
+            except LLMRateLimitedError:
+                self._count("rate_limited")
+                raise
+        try:
+            probe = self.breaker.before_call()
+        except LLMUnavailableError:
+            if self.limiter is not None:
+                self.limiter.refund()
+            self._count("circuit_open")
+            raise
+        return wait, probe
+
+    def _record(self, error: Optional[BaseException]) -> None:
+        if error is None:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+            self._count("error")
+
+    def invoke(self, *args, **kwargs):
+        if not self.singleflight:
+            return self._invoke(*args, **kwargs)
+
+        key = _prompt_key(self.model, args, kwargs)
+        with self._lock:
+            leader = self._inflight.get(key)
+            if leader is None:
+                future = self._inflight[key] = Future()
+        if leader is not None:
+            self.coalesced += 1
+            self._count("coalesced")
+            return leader.result()
+
+        try:
+            response = self._invoke(*args, **kwargs)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _invoke(self, *args, **kwargs):
+        wait, probe = self._admit()
+        try:
+            if wait:
+                time.sleep(wait)
+            self.calls += 1
+            response = self.llm.invoke(*args, **kwargs)
+        except Exception as e:
+            self._record(e)
+            raise
+        except BaseException:
+            if probe:
+                self.breaker.release_probe()
+            raise
+        self._record(None)
+        return response
+
+    async def ainvoke(self, *args, **kwargs):
+        if not self.singleflight:
+            return await self._ainvoke(*args, **kwargs)
+
+        # Futures belong to one event loop, so the loop is part of the key
+        key = f"{id(asyncio.get_running_loop())}:{_prompt_key(self.model, args, kwargs)}"
+        while True:
+            leader = self._ainflight.get(key)
+            if leader is None:
+                break
+            self.coalesced += 1
+            self._count("coalesced")
+            try:
+                # shield: a cancelled follower must not cancel the leader's call
+                return await asyncio.shield(leader)
+            except asyncio.CancelledError:
+                # The leader was cancelled (its client went away), not this request: take over the
+                # call, or follow whoever already did. Our own cancellation still propagates
+                task = asyncio.current_task()
+                if not leader.cancelled() or (task is not None and task.cancelling()):
+                    raise
+
+        future = self._ainflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            response = await self._ainvoke(*args, **kwargs)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            # Tells followers to take over rather than fail with this request
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Followers re-raise it; mark retrieved so a leader-only failure isn't logged as unhandled
+            future.exception()
+            raise
+        finally:
+            self._ainflight.pop(key, None)
+
+    async def _ainvoke(self, *args, **kwargs):
+        wait, probe = self._admit()
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            self.calls += 1
+            response = await self.llm.ainvoke(*args, **kwargs)
+        except Exception as e:
+            self._record(e)
+            raise
+        except BaseException:
+            # Cancelled (client gone, turn timeout) while waiting or mid-call
+            if probe:
+                self.breaker.release_probe()
+            raise
+        self._record(None)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "rate_limited": self.limiter.rejected if self.limiter else 0,
+            "queued": self.limiter.queued() if self.limiter else 0,
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips
+        }
+
+
+def gateway_stats() -> List[Dict[str, Any]]:
+    # One entry per model: gateways of several graphs on one model add up (they share its breaker)
+    per_model: Dict[str, Dict[str, Any]] = {}
+    for gateway in list(_gateways):
+        stats = gateway.stats()
+        total = per_model.get(gateway.model)
+        if total is None:
+            per_model[gateway.model] = stats
+            continue
+        for key in ("calls", "coalesced", "rate_limited", "queued"):
+            total[key] += stats[key]
+    return list(per_model.values())
+
+
+def pooled_client_args() -> Dict[str, Any]:
+    # httpx kwargs for the Gemini SDK: one keep-alive pool per process instead of a fresh
+    # TCP/TLS handshake whenever the pool runs dry under concurrent turns
+    import httpx
+    size = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+    return {
+        "limits": httpx.Limits(max_connections=size, max_keepalive_connections=size,
+                               keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE_SECONDS", "60")))
+    }
+
+
+def create_llm_gateway(llm, model: str) -> Optional[LLMGateway]:
+    if os.getenv("LLM_GATEWAY_ENABLED", "true").lower() != "true":
+        return None
+    rate = float(os.getenv("LLM_RATE_PER_SECOND", "0"))
+    limiter = None
+    if rate > 0:
+        limiter = TokenBucket(
+            rate=rate,
+            burst=int(os.getenv("LLM_BURST", str(max(1, int(rate))))),
+            max_queue=int(os.getenv("LLM_MAX_QUEUE", "100")),
+            max_wait=float(os.getenv("LLM_MAX_WAIT_SECONDS", "10"))
+        )
+    return LLMGateway(llm, model, limiter=limiter,
+                      singleflight=os.getenv("LLM_SINGLEFLIGHT", "true").lower() == "true")
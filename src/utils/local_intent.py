@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.log import get_logger, log_event
+
+logger = get_logger("sociolead.intent")
+
+DEFAULT_EXAMPLES_PATH = Path(__file__).parent / "intent_examples.json"
+
+# Cosine similarities are sharpened before the softmax so a clear nearest centroid reads as confident
+SIMILARITY_SCALE = 20.0
+
+
+class LocalIntentClassifier:
+
+    def __init__(self, embeddings, examples_path: str = None, threshold: float = None):    #type:ignore
+        if examples_path is None:
+            examples_path = DEFAULT_EXAMPLES_PATH
+        if threshold is None:
+            threshold = float(os.getenv("LOCAL_INTENT_THRESHOLD", "0.6"))
+
+        self.embeddings = embeddings
+        self.threshold = threshold
+
+        with open(examples_path, 'r') as f:
+            examples: Dict[str, List[str]] = json.load(f)
+
+        self.labels = list(examples.keys())
+        centroids = []
+        for label in self.labels:
+            vectors = _normalize(np.asarray(self.embeddings.embed_documents(examples[label]), dtype=np.float32))
+            centroids.append(vectors.mean(axis=0))
+        self.centroids = _normalize(np.stack(centroids))
+
+    def scores(self, message: str) -> Tuple[str, float]:
+        query = _normalize(np.asarray([self.embeddings.embed_query(message)], dtype=np.float32))[0]
+        logits = (self.centroids @ query) * SIMILARITY_SCALE
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
+
+    def predict(self, message: str) -> Optional[str]:
+        label, confidence = self.scores(message)
+        if confidence >= self.threshold:
+            return label
+        return None
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class IntentStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.by_source = {"keyword": 0, "local": 0, "llm": 0}
+        self.local_seconds = 0.0
+        self.llm_seconds = 0.0
+
+    def record(self, source: str, seconds: float) -> None:
+        with self._lock:
+            self.turns += 1
+            self.by_source[source] += 1
+            if source == "local":
+                self.local_seconds += seconds
+            elif source == "llm":
+                self.llm_seconds += seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            llm_calls = self.by_source["llm"]
+            avg_llm = self.llm_seconds / llm_calls if llm_calls else 0.0
+            resolved_locally = self.by_source["keyword"] + self.by_source["local"]
+            # Saved latency is estimated from the observed average Gemini classification round trip
+            saved = resolved_locally * avg_llm - self.local_seconds
+            return {
+                "turns": self.turns,
+                "keyword": self.by_source["keyword"],
+                "local": self.by_source["local"],
+                "llm": llm_calls,
+                "local_fraction": resolved_locally / self.turns if self.turns else 0.0,
+                "avg_llm_seconds": avg_llm,
+                "estimated_seconds_saved": max(saved, 0.0)
+            }
+
+
+intent_stats = IntentStats()
+
+
+_classifier_instance = None
+_classifier_lock = threading.Lock()
+_classifier_failed = False
+
+def get_local_classifier() -> Optional[LocalIntentClassifier]:
+    global _classifier_instance, _classifier_failed
+    if _classifier_instance is not None or _classifier_failed:
+        return _classifier_instance
+    if os.getenv("LOCAL_INTENT_ENABLED", "true").lower() != "true":
+        return None
+
+    # Reuse the MiniLM embedder the retriever already holds; until it has loaded,
+    # callers fall back to keyword/LLM classification
+    from rag.retriever import get_retriever
+    retriever = get_retriever()
+    if not retriever.embeddings_ready:
+        retriever.load_embeddings_in_background()
+        return None
+
+    with _classifier_lock:
+        if _classifier_instance is None and not _classifier_failed:
+            try:
+                _classifier_instance = LocalIntentClassifier(retriever.embeddings)
+            except Exception as e:
+                log_event(logger, "local_intent_disabled", level=logging.WARNING, error=str(e))
+                _classifier_failed = True
+    return _classifier_instance
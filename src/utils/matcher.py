@@ -0,0 +1,45 @@
+import re
+from typing import List, Optional
+
+
+HIGH_INTENT_KEYWORDS = [
+    "sign up", "signup", "register", "try", "start", "interested",
+    "want to", "i'd like", "i would like", "get started", "purchase",
+    "buy", "subscribe", "join", "my channel", "my youtube", "my instagram",
+    "for my", "i need", "ready to", "make a video", "create a video",
+    "video for", "content for", "i want", "looking to"
+]
+
+PLATFORMS = ["youtube", "instagram", "tiktok", "facebook", "twitter", "linkedin", "twitch"]
+
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+
+
+def _compile_alternation(phrases: List[str], suffixes: str = "") -> re.Pattern:
+    # Longest phrases first so overlapping alternatives ("sign up" / "signup") resolve deterministically
+    alternation = "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation}){suffixes}\b", re.IGNORECASE)
+
+
+# Compiled once at import; keywords also accept common inflections ("trying", "started", "subscribed")
+HIGH_INTENT_RE = _compile_alternation(HIGH_INTENT_KEYWORDS, suffixes="(?:s|es|ed|ing)?")
+PLATFORM_RE = _compile_alternation(PLATFORMS)
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+
+
+def has_high_intent(text: str) -> bool:
+    return HIGH_INTENT_RE.search(text) is not None
+
+
+def find_platform(text: str) -> Optional[str]:
+    match = PLATFORM_RE.search(text)
+    if match:
+        return match.group(0).lower().capitalize()
+    return None
+
+
+def find_email(text: str) -> Optional[str]:
+    match = EMAIL_RE.search(text)
+    if match:
+        return match.group(0)
+    return None
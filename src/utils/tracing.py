@@ -0,0 +1,323 @@
+import contextvars
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+
+class LatencyHistogram:
+    # HDR-style log-linear buckets: SUB_BUCKETS per power of two, so relative error stays bounded
+    # from 100us up to two minutes with a fixed 325 counters. With 16 sub-buckets edges are 2^(1/16)
+    # apart: a reported quantile is at most ~4.4% off, interpolation usually brings it under 1%
+    # (bench/histogram.py checks it against exact percentiles). Prometheus gets every
+    # EXPORT_EVERY-th edge, 4 per octave; cumulative counts at those edges are still exact
+    SUB_BUCKETS = 16
+    EXPORT_EVERY = 4
+
+    def __init__(self, lowest: float = 1e-4, highest: float = 120.0):
+        ratio = 2 ** (1 / self.SUB_BUCKETS)
+        self.bounds: List[float] = []
+        bound = lowest
+        while bound < highest:
+            self.bounds.append(bound)
+            bound *= ratio
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                # Interpolate within the bucket instead of always reporting its upper bound
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, Dict[LabelKey, LatencyHistogram]] = {}
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.help: Dict[str, str] = {}
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def describe(self, name: str, text: str) -> None:
+        self.help[name] = text
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        # p50/p90/p99 per series, for the JSON /api/metrics view
+        with self._lock:
+            return {
+                name: {
+                    ",".join(f"{k}={v}" for k, v in key) or "all": {
+                        "count": h.count,
+                        "p50_ms": h.quantile(0.5) * 1000,
+                        "p90_ms": h.quantile(0.9) * 1000,
+                        "p95_ms": h.quantile(0.95) * 1000,
+                        "p99_ms": h.quantile(0.99) * 1000
+                    }
+                    for key, h in series.items()
+                }
+                for name, series in self.histograms.items()
+            }
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self.histograms.items()):
+                self._header(lines, name, "histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for i, (bound, n) in enumerate(zip(h.bounds, h.counts)):
+                        cumulative += n
+                        if i % h.EXPORT_EVERY == 0:
+                            lines.append(f"{name}_bucket{_labels(key, le=f'{bound:.6g}')} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(key, le='+Inf')} {h.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {h.count}")
+            for name, series in sorted(self.counters.items()):
+                self._header(lines, name, "counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, kind: str) -> None:
+        if name in self.help:
+            lines.append(f"# HELP {name} {self.help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _metric_name(part: Any) -> str:
+    # Stats keys become metric name parts: only [a-zA-Z0-9_] is valid (tenant ids, "p99.9", ...)
+    return _INVALID_NAME_CHARS.sub("_", str(part))
+
+
+def render_gauges(prefix: str, stats: Union[Dict[str, Any], List[Dict[str, Any]], None],
+                  label: Optional[str] = None) -> str:
+    # Flattens the existing JSON stats() dicts into Prometheus gauges (numbers only). A list of
+    # dicts (one per model, ...) becomes one family per number, told apart by the `label` key
+    families: Dict[str, List[Tuple[str, float]]] = {}
+
+    def walk(path: str, value: Any, labels: str) -> None:
+        if isinstance(value, dict):
+            for k, v in value.items():
+                walk(f"{path}_{_metric_name(k)}", v, labels)
+        elif isinstance(value, (int, float)):
+            families.setdefault(path, []).append((labels, float(value)))
+
+    for entry in (stats if isinstance(stats, list) else [stats] if stats else []):
+        labels = ""
+        if label is not None:
+            entry = dict(entry)
+            labels = _labels(((label, str(entry.pop(label, ""))),))
+        walk(_metric_name(prefix), entry, labels)
+
+    lines: List[str] = []
+    for path, samples in families.items():
+        lines.append(f"# TYPE {path} gauge")
+        lines.extend(f"{path}{labels} {value:g}" for labels, value in samples)
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+metrics = MetricsRegistry()
+metrics.describe("agent_request_seconds", "End-to-end chat turn latency")
+metrics.describe("agent_node_seconds", "Wall time per LangGraph node")
+metrics.describe("agent_op_seconds", "Wall time of retrieval/embedding operations")
+metrics.describe("agent_llm_seconds", "Wall time per LLM call, labelled by calling node")
+metrics.describe("agent_llm_tokens_total", "LLM tokens reported in usage metadata")
+metrics.describe("agent_route_total", "Conditional edges taken")
+metrics.describe("agent_cache_total", "Cache lookups by cache and result")
+metrics.describe("agent_prompts_total", "Prompts sent to the LLM by the respond node")
+metrics.describe("agent_prompt_tokens_total", "Estimated prompt tokens by part (context, instructions, history)")
+
+
+class Trace:
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, kind: str, name: str, start: float, seconds: float, **attrs: Any) -> None:
+        self.spans.append({
+            "kind": kind,
+            "name": name,
+            "start_ms": round((start - self.start) * 1000, 3),
+            "duration_ms": round(seconds * 1000, 3),
+            **attrs
+        })
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"total_ms": round((time.perf_counter() - self.start) * 1000, 3), "spans": self.spans}
+
+
+# Per-request trace (only when the debug header asks for it) and the node currently running,
+# so LLM calls and retrieval ops are attributed to their node. LangGraph copies the context
+# into each node's task/thread, so both are visible inside nodes.
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_current_node: contextvars.ContextVar[str] = contextvars.ContextVar("node", default="")
+
+
+def start_trace() -> Trace:
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_node() -> str:
+    return _current_node.get()
+
+
+def record(kind: str, name: str, start: float, seconds: float, **attrs: Any) -> None:
+    if kind == "node":
+        metrics.observe("agent_node_seconds", seconds, node=name)
+    elif kind == "llm":
+        metrics.observe("agent_llm_seconds", seconds, node=name)
+    else:
+        metrics.observe("agent_op_seconds", seconds, op=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(kind, name, start, seconds, **attrs)
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    # Yields a dict callers can add attributes to (cache hit, result counts, ...)
+    token = _current_node.set(name) if kind == "node" else None
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record(kind, name, start, time.perf_counter() - start, **attrs)
+        if token is not None:
+            _current_node.reset(token)
+
+
+def event(name: str, **attrs: Any) -> None:
+    # Zero-duration trace entry (routes, cache results)
+    trace = _current_trace.get()
+    if trace is not None:
+        now = time.perf_counter()
+        trace.add("event", name, now, 0.0, **attrs)
+
+
+def traced_node(name: str, func, afunc=None):
+    def run(state):
+        with span("node", name):
+            return func(state)
+
+    async def arun(state):
+        with span("node", name):
+            return await afunc(state)
+
+    return run, arun
+
+
+def traced_route(source: str, router):
+    def route(state):
+        target = router(state)
+        metrics.inc("agent_route_total", source=source, target=target)
+        event("route", source=source, target=target)
+        return target
+    return route
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    result = "hit" if hit else "miss"
+    metrics.inc("agent_cache_total", cache=cache, result=result)
+    event("cache", cache=cache, result=result)
+
+
+def count_prompt_tokens(node: str, **parts: int) -> None:
+    # Estimated before the call, so turns answered from cache or templates send nothing. The model's
+    # own count (when it reports usage) is agent_llm_tokens_total
+    metrics.inc("agent_prompts_total", node=node)
+    for part, tokens in parts.items():
+        metrics.inc("agent_prompt_tokens_total", tokens, node=node, part=part)
+    event("prompt", node=node, **parts)
+
+
+class TracedLLM:
+    # Thin proxy over the chat model: times every invoke/ainvoke and records token usage.
+    # Callbacks (and therefore LangGraph's token streaming) still flow to the wrapped model.
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def invoke(self, *args, **kwargs):
+        start = time.perf_counter()
+        response = self.llm.invoke(*args, **kwargs)
+        self._record(start, response)
+        return response
+
+    async def ainvoke(self, *args, **kwargs):
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(*args, **kwargs)
+        self._record(start, response)
+        return response
+
+    def _record(self, start: float, response: Any) -> None:
+        node = current_node() or "unknown"
+        usage = getattr(response, "usage_metadata", None) or {}
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+        if prompt_tokens:
+            metrics.inc("agent_llm_tokens_total", prompt_tokens, node=node, type="prompt")
+        if completion_tokens:
+            metrics.inc("agent_llm_tokens_total", completion_tokens, node=node, type="completion")
+        record("llm", node, start, time.perf_counter() - start,
+               prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
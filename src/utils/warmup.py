@@ -0,0 +1,54 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from utils.log import get_logger, log_event
+
+logger = get_logger("sociolead.warmup")
+
+
+class Warmup:
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], Any], bool]]):
+        # (name, callable, required) - a failed optional step still leaves the service ready
+        self.steps = steps
+        self._status: Dict[str, Dict[str, Any]] = {
+            name: {"state": "pending"} for name, _, _ in steps
+        }
+        self._lock = threading.Lock()
+        self._thread = None
+        self._finished = False
+
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+
+    def run(self) -> None:
+        for name, step, _ in self.steps:
+            self._status[name] = {"state": "running"}
+            start = time.perf_counter()
+            try:
+                step()
+                self._status[name] = {"state": "done", "seconds": round(time.perf_counter() - start, 3)}
+            except Exception as e:
+                log_event(logger, "warmup_step_failed", level=logging.WARNING, step=name, error=str(e))
+                self._status[name] = {"state": "failed", "error": str(e)}
+        self._finished = True
+
+
+    @property
+    def ready(self) -> bool:
+        return all(
+            self._status[name]["state"] == "done"
+            for name, _, required in self.steps if required
+        ) and self._finished
+
+
+    def status(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "steps": dict(self._status)}